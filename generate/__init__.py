@@ -1,9 +1,53 @@
-from .bucket import clean_bucket, upload_to_bucket  # noqa
-from .site import (  # noqa
-    clean_site,
-    copy_misc,
-    copy_statics,
-    generate_css,
-    generate_pages,
-    update_all_data_files,
-)
+from typing import Any, Dict, List
+
+# Submodules are only imported when one of their names is first used, so that
+# the CLI entry points don't load the analysis, rendering and cloud stacks for
+# commands that don't need them
+_EXPORTS: Dict[str, str] = {
+    "serve_artifact_cache": "artifacts",
+    "clean_bucket": "bucket",
+    "upload_to_bucket": "bucket",
+    "generate_dynamic_pages": "dynamic_pages",
+    "generate_predefined_pages": "predefined_pages",
+    "merge_shards": "sharding",
+    "parse_shard": "sharding",
+    "run_daemon": "daemon",
+    "send_daemon_command": "daemon",
+    "diff_snapshots": "snapshots",
+    "restore_snapshot": "snapshots",
+    "write_data_changes": "snapshots",
+    "clean_site": "site",
+    "copy_misc": "site",
+    "copy_statics": "site",
+    "generate_css": "site",
+    "generate_pages": "site",
+    "update_all_data_files": "site",
+    "create_staging_directory": "staging",
+    "publish_staging_directory": "staging",
+    "staged_output": "staging",
+    "default_worker_policy": "workers",
+}
+
+__all__: List[str] = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+
+    if name not in _EXPORTS:
+
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # Through __import__ rather than importlib, for import times to be recorded
+    value: Any = getattr(
+        __import__(f"{__name__}.{_EXPORTS[name]}", fromlist=[name]), name
+    )
+
+    # Later accesses don't go through this function anymore
+    globals()[name] = value
+
+    return value
+
+
+def __dir__() -> List[str]:
+
+    return sorted(list(globals()) + __all__)
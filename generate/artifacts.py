@@ -0,0 +1,433 @@
+import os
+import re
+import urllib.error
+import urllib.request
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+from .constants import ARTIFACT_CACHE_DIRECTORY, ARTIFACT_CACHE_SIZE
+
+# Inherited by worker processes, so that they all share the same backend
+ARTIFACT_CACHE_ENVVAR: str = "SITE_ARTIFACT_CACHE"
+
+ARTIFACT_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+HTTP_TIMEOUT: float = 30.0
+
+
+class ArtifactCache(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+
+        pass
+
+    @abstractmethod
+    def put(self, key: str, content: bytes):
+
+        pass
+
+
+class LocalArtifactCache(ArtifactCache):
+    def __init__(
+        self,
+        directory: str = ARTIFACT_CACHE_DIRECTORY,
+        max_size: int = ARTIFACT_CACHE_SIZE,
+    ):
+
+        self.directory: Path = Path(directory)
+        self.max_size: int = max_size
+
+        # Written since the last eviction, by this process only
+        self._written: int = 0
+
+    def _path(self, key: str) -> Path:
+
+        return self.directory.joinpath(key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+
+        path: Path = self._path(key)
+
+        try:
+
+            content: bytes = path.read_bytes()
+
+            # Modification times order artifacts by last use, for eviction
+            os.utime(path)
+
+        # Missing, or evicted by another process meanwhile
+        except FileNotFoundError:
+
+            return None
+
+        return content
+
+    def put(self, key: str, content: bytes):
+
+        path: Path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Other workers may be writing the same artifact, each to its own file
+        tmp_path: Path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+        tmp_path.write_bytes(content)
+
+        os.replace(tmp_path, path)
+
+        self._written += len(content)
+
+        # Directory scans are amortized over a tenth of the cache size
+        if self._written > self.max_size // 10:
+
+            self.evict()
+
+    def evict(self) -> int:
+
+        self._written = 0
+
+        entries: List[Tuple[float, int, Path]] = []
+
+        path: Path
+        for path in self.directory.glob("*/*"):
+
+            if path.name.startswith("."):
+
+                continue
+
+            try:
+
+                stat: os.stat_result = path.stat()
+
+            except FileNotFoundError:
+
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size: int = sum(e[1] for e in entries)
+        evicted: int = 0
+
+        entry_size: int
+        for _, entry_size, path in sorted(entries):
+
+            if size <= self.max_size:
+
+                break
+
+            try:
+
+                path.unlink()
+
+            except FileNotFoundError:
+
+                pass
+
+            size -= entry_size
+            evicted += 1
+
+        return evicted
+
+
+class HTTPArtifactCache(ArtifactCache):
+    def __init__(self, url: str, timeout: float = HTTP_TIMEOUT):
+
+        self.url: str = url.rstrip("/")
+        self.timeout: float = timeout
+
+    def get(self, key: str) -> Optional[bytes]:
+
+        try:
+
+            with urllib.request.urlopen(
+                f"{self.url}/{key}", timeout=self.timeout
+            ) as response:
+
+                return response.read()
+
+        except urllib.error.HTTPError as e:
+
+            if e.code == 404:
+
+                return None
+
+            raise
+
+    def put(self, key: str, content: bytes):
+
+        request: urllib.request.Request = urllib.request.Request(
+            f"{self.url}/{key}",
+            data=content,
+            method="PUT",
+            headers={"Content-Type": "application/octet-stream"},
+        )
+
+        with urllib.request.urlopen(request, timeout=self.timeout):
+
+            pass
+
+
+class BucketArtifactCache(ArtifactCache):
+    def __init__(self, bucket_name: str, prefix: str = ""):
+
+        self.bucket_name: str = bucket_name
+        self.prefix: str = prefix
+
+        self._bucket: Any = None
+
+    def _blob_name(self, key: str) -> str:
+
+        return f"{self.prefix.rstrip('/')}/{key}" if self.prefix else key
+
+    def bucket(self) -> Any:
+
+        # Cloud client only loaded and authenticated when this backend is used
+        if self._bucket is None:
+
+            from .bucket import get_bucket
+
+            self._bucket = get_bucket(self.bucket_name)
+
+        return self._bucket
+
+    def get(self, key: str) -> Optional[bytes]:
+
+        blob: Any = self.bucket().get_blob(self._blob_name(key))
+
+        if blob is None:
+
+            return None
+
+        return blob.download_as_bytes()
+
+    def put(self, key: str, content: bytes):
+
+        self.bucket().blob(self._blob_name(key)).upload_from_string(
+            content, content_type="application/octet-stream"
+        )
+
+
+class LayeredArtifactCache(ArtifactCache):
+    def __init__(self, local: ArtifactCache, remote: ArtifactCache):
+
+        self.local: ArtifactCache = local
+        self.remote: ArtifactCache = remote
+
+        # Cleared once the remote cannot be reached, for the rest of the process
+        self.remote_enabled: bool = True
+
+    def _remote_failed(self, error: Exception):
+
+        print(f"Artifact cache unavailable: {error}")
+
+        # Every later request would wait for its own timeout too; a remote that
+        # answered with an error is still tried again
+        if isinstance(error, OSError) and not isinstance(error, urllib.error.HTTPError):
+
+            print("Artifact cache disabled for this process")
+
+            self.remote_enabled = False
+
+    def get(self, key: str) -> Optional[bytes]:
+
+        content: Optional[bytes] = self.local.get(key)
+
+        if content is not None or not self.remote_enabled:
+
+            return content
+
+        # The remote cache only saves time, it never fails the build
+        try:
+
+            content = self.remote.get(key)
+
+        except Exception as e:
+
+            self._remote_failed(e)
+
+            return None
+
+        if content is not None:
+
+            self.local.put(key, content)
+
+        return content
+
+    def put(self, key: str, content: bytes):
+
+        self.local.put(key, content)
+
+        if not self.remote_enabled:
+
+            return
+
+        try:
+
+            self.remote.put(key, content)
+
+        except Exception as e:
+
+            self._remote_failed(e)
+
+
+def create_artifact_cache(url: Optional[str] = None) -> ArtifactCache:
+
+    local: LocalArtifactCache = LocalArtifactCache()
+
+    # Shared caches are layered over the local one, which keeps what is used here
+    if not url:
+
+        return local
+
+    elif url.startswith(("http://", "https://")):
+
+        return LayeredArtifactCache(local=local, remote=HTTPArtifactCache(url))
+
+    elif url.startswith("gs://"):
+
+        bucket_name: str
+        prefix: str
+        bucket_name, _, prefix = url[len("gs://") :].partition("/")
+
+        return LayeredArtifactCache(
+            local=local, remote=BucketArtifactCache(bucket_name, prefix=prefix)
+        )
+
+    return LocalArtifactCache(directory=url)
+
+
+_artifact_cache: Optional[ArtifactCache] = None
+
+
+def artifact_cache() -> ArtifactCache:
+
+    global _artifact_cache
+
+    if _artifact_cache is None:
+
+        _artifact_cache = create_artifact_cache(os.environ.get(ARTIFACT_CACHE_ENVVAR))
+
+    return _artifact_cache
+
+
+def cached_artifact(key: str, produce: Callable[[], bytes]) -> bytes:
+
+    cache: ArtifactCache = artifact_cache()
+
+    content: Optional[bytes] = cache.get(key)
+
+    if content is None:
+
+        content = produce()
+
+        cache.put(key, content)
+
+    return content
+
+
+def evict_artifacts() -> int:
+
+    cache: ArtifactCache = artifact_cache()
+
+    if isinstance(cache, LayeredArtifactCache):
+
+        cache = cache.local
+
+    return cache.evict() if isinstance(cache, LocalArtifactCache) else 0
+
+
+class _ArtifactRequestHandler(BaseHTTPRequestHandler):
+    def _key(self) -> Optional[str]:
+
+        key: str = self.path.strip("/")
+
+        # Keys are hashes, never paths outside of the cache directory
+        if not ARTIFACT_KEY_PATTERN.match(key):
+
+            self.send_error(400)
+
+            return None
+
+        return key
+
+    def do_GET(self):
+
+        key: Optional[str] = self._key()
+
+        if key is None:
+
+            return
+
+        content: Optional[bytes] = self.server.cache.get(key)  # type: ignore
+
+        if content is None:
+
+            self.send_error(404)
+
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+
+        self.wfile.write(content)
+
+    def do_PUT(self):
+
+        key: Optional[str] = self._key()
+
+        if key is None:
+
+            return
+
+        content: bytes = self.rfile.read(int(self.headers["Content-Length"]))
+
+        self.server.cache.put(key, content)  # type: ignore
+
+        self.send_response(204)
+        self.end_headers()
+
+
+def artifact_cache_server(
+    port: int,
+    host: str = "127.0.0.1",
+    directory: str = ARTIFACT_CACHE_DIRECTORY,
+    max_size: int = ARTIFACT_CACHE_SIZE,
+) -> ThreadingHTTPServer:
+
+    server: ThreadingHTTPServer = ThreadingHTTPServer(
+        (host, port), _ArtifactRequestHandler
+    )
+    server.cache = LocalArtifactCache(  # type: ignore
+        directory=directory, max_size=max_size
+    )
+
+    return server
+
+
+def serve_artifact_cache(
+    port: int,
+    host: str = "127.0.0.1",
+    directory: str = ARTIFACT_CACHE_DIRECTORY,
+    max_size: int = ARTIFACT_CACHE_SIZE,
+):
+
+    server: ThreadingHTTPServer = artifact_cache_server(
+        port=port, host=host, directory=directory, max_size=max_size
+    )
+
+    print(f"Serving {directory} artifact cache on http://{host}:{port}")
+
+    try:
+
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+
+        pass
+
+    finally:
+
+        server.server_close()
@@ -1,20 +1,38 @@
 import gzip
+import re
 from io import BytesIO
 from multiprocessing import Pool
 from pathlib import Path
-from typing import Iterable, List
+from typing import List
 
 from google.cloud import storage
 
-from .constants import SITE_DIRECTORY, SUFFIX_CONTENT_TYPE
+from .constants import (
+    CONTENT_HASH_LENGTH,
+    IMAGE_SUFFIX_CONTENT_TYPE,
+    IMMUTABLE_CACHE_CONTROL,
+    SITE_DIRECTORY,
+    SUFFIX_CONTENT_TYPE,
+)
+from .progress import progress_stage, progress_task
+
+CONTENT_ADDRESSED_FILENAME_PATTERN = re.compile(
+    rf"\.[0-9a-f]{{{CONTENT_HASH_LENGTH}}}\.[a-z]+$"
+)
+
+
+def get_bucket(bucket_name: str) -> storage.Bucket:
+
+    client: storage.Client = storage.Client()
+
+    return client.get_bucket(bucket_name)
 
 
 def clean_bucket(bucket_name: str):
 
     print(f"Cleaning {bucket_name} bucket")
 
-    client: storage.Client = storage.Client()
-    bucket: storage.Bucket = client.get_bucket(bucket_name)
+    bucket: storage.Bucket = get_bucket(bucket_name)
 
     blob: storage.Blob
     for blob in bucket.list_blobs():
@@ -29,21 +47,25 @@ def upload_to_bucket(bucket_name: str, prefix: str = "", processes: int = 10):
     print(f"Uploading files to {bucket_name} bucket")
 
     pool = Pool(processes)
-    file_paths: Iterable[Path] = filter(
-        lambda x: (
-            not x.is_dir()
-            and str(x).startswith(str(Path(SITE_DIRECTORY).joinpath(prefix)))
-        ),
-        Path(SITE_DIRECTORY).rglob("*"),
+    file_paths: List[Path] = list(
+        filter(
+            lambda x: (
+                not x.is_dir()
+                and str(x).startswith(str(Path(SITE_DIRECTORY).joinpath(prefix)))
+            ),
+            Path(SITE_DIRECTORY).rglob("*"),
+        )
     )
 
-    pool.starmap(_upload_file_to_bucket, ((bucket_name, fp) for fp in file_paths))
+    # Uploads are counted up front for the progress display
+    with progress_stage("upload", total=len(file_paths)):
+
+        pool.starmap(_upload_file_to_bucket, ((bucket_name, fp) for fp in file_paths))
 
 
 def _upload_file_to_bucket(bucket_name: str, file_path: Path):
 
-    client: storage.Client = storage.Client()
-    bucket: storage.Bucket = client.get_bucket(bucket_name)
+    bucket: storage.Bucket = get_bucket(bucket_name)
 
     file_dirs: List[str]
     file_filename: str
@@ -51,14 +73,24 @@ def _upload_file_to_bucket(bucket_name: str, file_path: Path):
 
     destination_path = Path(*file_dirs, file_filename)
 
+    print(f"Uploading {destination_path}")
+
+    with progress_task("upload", str(destination_path)):
+
+        _upload_blob(bucket.blob(str(destination_path)), file_path)
+
+
+def _upload_blob(blob: storage.Blob, file_path: Path):
+
+    file_filename: str = file_path.name
     suffix: str = file_path.suffix
 
-    print(f"Uploading {destination_path}")
+    if CONTENT_ADDRESSED_FILENAME_PATTERN.search(file_filename):
 
-    blob: storage.Blob = bucket.blob(str(destination_path))
+        blob.cache_control = IMMUTABLE_CACHE_CONTROL
 
     # Compress files that can be compressed
-    if suffix in {".html", ".css", ".js"}:
+    if suffix in SUFFIX_CONTENT_TYPE:
 
         content_type: str = SUFFIX_CONTENT_TYPE[suffix]
 
@@ -73,4 +105,6 @@ def _upload_file_to_bucket(bucket_name: str, file_path: Path):
     # Otherwise just upload
     else:
 
-        blob.upload_from_filename(str(file_path))
+        blob.upload_from_filename(
+            str(file_path), content_type=IMAGE_SUFFIX_CONTENT_TYPE.get(suffix)
+        )
@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    def __init__(self, max_size: int, sizeof: Callable[[V], int] = lambda _: 1):
+
+        self.max_size: int = max_size
+        self.sizeof: Callable[[V], int] = sizeof
+        self.size: int = 0
+
+        self._entries: "OrderedDict[Hashable, V]" = OrderedDict()
+        self._lock: Lock = Lock()
+
+    def __len__(self) -> int:
+
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[V]:
+
+        with self._lock:
+
+            if key not in self._entries:
+
+                return None
+
+            self._entries.move_to_end(key)
+
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: V):
+
+        value_size: int = self.sizeof(value)
+
+        with self._lock:
+
+            if key in self._entries:
+
+                self.size -= self.sizeof(self._entries.pop(key))
+
+            # Values larger than the whole cache are not worth evicting everything
+            if value_size > self.max_size:
+
+                return
+
+            self._entries[key] = value
+            self.size += value_size
+
+            while self.size > self.max_size:
+
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= self.sizeof(evicted)
+
+    def clear(self):
+
+        with self._lock:
+
+            self._entries.clear()
+            self.size = 0
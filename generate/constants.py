@@ -1,14 +1,17 @@
-from typing import Dict
+from typing import Dict, Tuple
 
-from ps2_census.enums import Faction
+# Standard library only, imported by the CLI entry points before anything else
 
 SITE_DIRECTORY: str = "site"
+SITE_BUILDS_DIRECTORY: str = ".site"
 TEMPLATES_DIRECTORY: str = "templates"
 PAGES_DIRECTORY: str = "pages"
 STATICS_DIRECTORY: str = "statics"
 DATA_FILES_DIRECTORY: str = "datafiles"
 SIMULATIONS_DIRECTORY: str = "simulations"
 MISC_DIRECTORY: str = "misc"
+SEARCH_DIRECTORY: str = "search"
+DATASETS_DIRECTORY: str = "datasets"
 
 TEMPLATE_EXTENSION: str = "html.jinja"
 
@@ -16,13 +19,15 @@ INFANTRY_WEAPON_STATS_TEMPLATE_PATH: str = "stats/weapons/infantry.html.jinja"
 VEHICLE_WEAPON_STATS_TEMPLATE_PATH: str = "stats/weapons/vehicle.html.jinja"
 CHART_TEMPLATE_PATH: str = "chart.html.jinja"
 
-FACTION_BACKGROUND_COLOR_CLASSES: Dict[Faction, str] = {
-    Faction.NONE: "has-background-no-faction",
-    Faction.VANU_SOVEREIGNTY: "has-background-vs",
-    Faction.NEW_CONGLOMERATE: "has-background-nc",
-    Faction.TERRAN_REPUBLIC: "has-background-tr",
-    Faction.NS_OPERATIVES: "has-background-no-faction",
-}
+MAGDUMP: str = "magdump"
+STKR: str = "stkr"
+SWEEP: str = "sweep"
+STANCES: str = "stances"
+SUSTAINED: str = "sustained"
+
+# Simulated for each fire group, in the order they appear on weapon pages
+SIMULATIONS: Tuple[str, ...] = (MAGDUMP, STANCES, STKR, SWEEP)
+VEHICLE_SIMULATIONS: Tuple[str, ...] = (SUSTAINED,)
 
 CURSOR: str = "cursor"
 PELLET: str = "pellet"
@@ -31,7 +36,85 @@ SUFFIX_CONTENT_TYPE: Dict[str, str] = {
     ".html": "text/html",
     ".css": "text/css",
     ".js": "text/javascript",
+    ".json": "application/json",
 }
 
+# Uploaded as they are, already compressed
+IMAGE_SUFFIX_CONTENT_TYPE: Dict[str, str] = {
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+}
+
+# Simulation images are also rendered at these widths when narrower than the chart
+SIMULATION_IMAGE_WIDTHS: Tuple[int, ...] = (320, 640)
+SIMULATION_IMAGE_FORMATS: Tuple[str, ...] = ("avif", "webp")
+
+
+# Content-addressed files never change under the same name
+CONTENT_HASH_LENGTH: int = 16
+IMMUTABLE_CACHE_CONTROL: str = "public, max-age=31536000, immutable"
 
 PRECISION_DECIMALS: int = 3
+
+SEARCH_INDEX_DOCUMENTS_SHARD_SIZE: int = 128
+SEARCH_INDEX_PREFIX_MARKER: str = "^"
+
+TIME_TO_KILL_MAX_RANGE: int = 100
+TIME_TO_KILL_RANGE_STEP: int = 5
+TIME_TO_KILL_MAX_SHOTS: int = 100
+
+# Outside of the site directory, which gets cleaned and uploaded
+BUILD_JOURNAL_PATH: str = ".build/journal.ndjson"
+BUILD_REPORT_PATH: str = ".build/report.json"
+BUILD_IMPORTS_REPORT_PATH: str = ".build/imports.json"
+BUILD_FRAGMENTS_DIRECTORY: str = ".build/fragments"
+BUILD_PROGRESS_PATH: str = ".build/progress.ndjson"
+DATA_SNAPSHOTS_DIRECTORY: str = ".build/snapshots"
+DATA_CHANGES_PATH: str = ".build/changes.json"
+ARTIFACT_CACHE_DIRECTORY: str = ".build/artifacts"
+DAEMON_SOCKET_PATH: str = ".build/daemon.sock"
+SHARDS_DIRECTORY: str = ".shards"
+SHARD_MANIFEST_FILENAME: str = "manifest.json"
+BUILD_TASK_RETRIES: int = 3
+BUILD_TASK_BACKOFF: float = 1.0
+
+# Workers are recycled to give memory back, and their count bounded by memory
+BUILD_WORKER_MAX_TASKS: int = 50
+BUILD_WORKER_MAX_RSS: int = 2 * 1024 ** 3
+BUILD_TASK_MEMORY: int = 1024 ** 3
+
+# Tasks running this many times longer than expected are flagged as slow, past a
+# minimum duration in seconds; the display is refreshed every interval in seconds
+PROGRESS_SLOW_TASK_FACTOR: float = 4.0
+PROGRESS_SLOW_TASK_MIN_DURATION: float = 30.0
+PROGRESS_REFRESH_INTERVAL: float = 0.5
+
+# Items waiting in each queue of the weapon pages pipeline, before the stage
+# feeding it is held back
+PIPELINE_QUEUE_SIZE: int = 32
+WEAPON_PAGES_STAGES: Tuple[str, ...] = (
+    "simulate",
+    "spec",
+    "rasterize",
+    "render",
+    "write",
+)
+
+# Uploads running along the build, and pending before the build is held back
+STREAMING_UPLOAD_THREADS: int = 16
+STREAMING_UPLOAD_MAX_PENDING: int = 256
+
+# Seconds between two scans of the sources watched by the build daemon
+DAEMON_POLL_INTERVAL: float = 1.0
+
+# Seconds between two scans of the sources of pages rendered by the preview server
+PREVIEW_REFRESH_INTERVAL: float = 1.0
+
+# Rendered macros kept in memory by each worker, in characters
+FRAGMENT_CACHE_SIZE: int = 64 * 1024 ** 2
+# Rendered macros kept on disk, least recently used evicted first
+FRAGMENT_STORE_SIZE: int = 1024 ** 3
+
+# Simulation charts and images kept on disk, least recently used evicted first
+ARTIFACT_CACHE_SIZE: int = 4 * 1024 ** 3
@@ -0,0 +1,379 @@
+import os
+import socket
+import socketserver
+import time
+import traceback
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Collection, Dict, List, Optional, Set, Tuple
+
+from ps2_analysis.weapons.infantry.infantry_weapon import InfantryWeapon
+from ps2_analysis.weapons.vehicle.vehicle_weapon import VehicleWeapon
+
+from .constants import (
+    CHART_TEMPLATE_PATH,
+    DAEMON_POLL_INTERVAL,
+    DAEMON_SOCKET_PATH,
+    DATA_FILES_DIRECTORY,
+    INFANTRY_WEAPON_STATS_TEMPLATE_PATH,
+    PAGES_DIRECTORY,
+    STATICS_DIRECTORY,
+    TEMPLATES_DIRECTORY,
+    VEHICLE_WEAPON_STATS_TEMPLATE_PATH,
+)
+from .dynamic_pages import BuildData, generate_dynamic_pages, load_build_data
+from .environment import shared_j2_environment
+from .fragments import templates_version
+from .predefined_pages import (
+    generate_weapons_data_outputs,
+    load_all_weapons,
+    render_predefined_pages,
+)
+from .site import copy_statics
+from .workers import WorkerPolicy
+
+WATCHED_DIRECTORIES: Tuple[str, ...] = (
+    DATA_FILES_DIRECTORY,
+    TEMPLATES_DIRECTORY,
+    PAGES_DIRECTORY,
+    STATICS_DIRECTORY,
+)
+
+
+def _snapshot(directory: str) -> Dict[str, float]:
+
+    snapshot: Dict[str, float] = {}
+
+    root: str
+    filenames: List[str]
+    for root, _, filenames in os.walk(directory):
+
+        filename: str
+        for filename in filenames:
+
+            path: str = os.path.join(root, filename)
+
+            try:
+
+                snapshot[path] = os.stat(path).st_mtime
+
+            # Removed while walking, seen as removed by the next scan
+            except FileNotFoundError:
+
+                pass
+
+    return snapshot
+
+
+class BuildDaemon:
+    def __init__(
+        self,
+        bucket_name: str,
+        worker_policy: WorkerPolicy,
+        update_simulations: bool = True,
+        upload_prefix: str = "",
+    ):
+
+        self.bucket_name: str = bucket_name
+        self.worker_policy: WorkerPolicy = worker_policy
+        self.update_simulations: bool = update_simulations
+        self.upload_prefix: str = upload_prefix
+
+        self.builds: int = 0
+        self.last_build: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+        self._snapshots: Dict[str, Dict[str, float]] = {}
+        self._data: Optional[BuildData] = None
+        self._infantry_weapons: List[InfantryWeapon] = []
+        self._vehicle_weapons: List[VehicleWeapon] = []
+
+        self._lock: Lock = Lock()
+        self._stopped: Event = Event()
+
+    def warm(self):
+
+        # Workers are forked from the daemon for each build, starting with these
+        # modules imported and templates compiled
+        if self.update_simulations:
+
+            import altair_saver  # noqa: F401
+
+        path: str
+        for path in (
+            INFANTRY_WEAPON_STATS_TEMPLATE_PATH,
+            VEHICLE_WEAPON_STATS_TEMPLATE_PATH,
+            CHART_TEMPLATE_PATH,
+        ):
+
+            shared_j2_environment().get_template(path)
+
+    def changed_directories(self) -> Set[str]:
+
+        changed: Set[str] = set()
+
+        directory: str
+        for directory in WATCHED_DIRECTORIES:
+
+            snapshot: Dict[str, float] = _snapshot(directory)
+
+            if snapshot != self._snapshots.get(directory):
+
+                changed.add(directory)
+
+            self._snapshots[directory] = snapshot
+
+        return changed
+
+    def build(self, directories: Collection[str] = WATCHED_DIRECTORIES):
+
+        with self._lock:
+
+            start: float = time.perf_counter()
+
+            print(f"Building for changes in {', '.join(sorted(directories))}")
+
+            data_changed: bool = (
+                DATA_FILES_DIRECTORY in directories or self._data is None
+            )
+
+            if data_changed:
+
+                print("Loading data files")
+
+                self._data = load_build_data()
+                self._infantry_weapons, self._vehicle_weapons = load_all_weapons()
+
+            if TEMPLATES_DIRECTORY in directories:
+
+                templates_version.cache_clear()
+
+            try:
+
+                # Unchanged weapons are skipped through the build journal
+                if data_changed or TEMPLATES_DIRECTORY in directories:
+
+                    generate_dynamic_pages(
+                        update_simulations=self.update_simulations,
+                        worker_policy=self.worker_policy,
+                        data=self._data,
+                    )
+
+                if data_changed:
+
+                    generate_weapons_data_outputs(
+                        infantry_weapons=self._infantry_weapons,
+                        vehicle_weapons=self._vehicle_weapons,
+                    )
+
+                if (
+                    data_changed
+                    or TEMPLATES_DIRECTORY in directories
+                    or PAGES_DIRECTORY in directories
+                ):
+
+                    render_predefined_pages(
+                        infantry_weapons=self._infantry_weapons,
+                        vehicle_weapons=self._vehicle_weapons,
+                    )
+
+                if STATICS_DIRECTORY in directories:
+
+                    copy_statics()
+
+                self.last_error = None
+
+            except Exception:
+
+                self.last_error = traceback.format_exc()
+
+                raise
+
+            finally:
+
+                self.builds += 1
+                self.last_build = time.time()
+
+            print(f"Built in {time.perf_counter() - start:.1f}s")
+
+    def upload(self, prefix: Optional[str] = None):
+
+        from .bucket import upload_to_bucket
+
+        # Never while the site is being written
+        with self._lock:
+
+            upload_to_bucket(
+                bucket_name=self.bucket_name,
+                prefix=self.upload_prefix if prefix is None else prefix,
+            )
+
+    def status(self) -> str:
+
+        return (
+            f"{self.builds} builds, last at "
+            + (time.ctime(self.last_build) if self.last_build else "never")
+            + (", failed" if self.last_error else "")
+        )
+
+    def watch(self, interval: float = DAEMON_POLL_INTERVAL):
+
+        while not self._stopped.wait(interval):
+
+            changed: Set[str] = self.changed_directories()
+
+            if not changed:
+
+                continue
+
+            # Failures are reported, the next change triggering another build
+            try:
+
+                self.build(changed)
+
+            except Exception:
+
+                print(f"Build failed:\n{self.last_error}")
+
+    def stop(self):
+
+        self._stopped.set()
+
+    def handle(self, command: str) -> str:
+
+        name: str
+        name, _, argument = command.strip().partition(" ")
+
+        if name == "build":
+
+            # Everything, as after a data files update
+            self.changed_directories()
+            self.build()
+
+            return f"Built, {self.status()}"
+
+        elif name == "upload":
+
+            self.upload(prefix=argument or None)
+
+            return "Uploaded"
+
+        elif name == "status":
+
+            return self.status() + (f"\n{self.last_error}" if self.last_error else "")
+
+        elif name == "stop":
+
+            self.stop()
+
+            return "Stopping"
+
+        raise ValueError(f"Unknown command {name!r}")
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+
+        daemon: BuildDaemon = self.server.daemon  # type: ignore
+
+        command: str = self.rfile.readline().decode()
+
+        response: str
+
+        try:
+
+            response = daemon.handle(command)
+
+        except Exception:
+
+            response = f"Error:\n{traceback.format_exc()}"
+
+        self.wfile.write(response.encode())
+
+
+class _CommandServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, daemon: BuildDaemon):
+
+        self.daemon: BuildDaemon = daemon
+
+        super().__init__(path, _CommandHandler)
+
+
+def run_daemon(
+    bucket_name: str,
+    worker_policy: WorkerPolicy,
+    update_simulations: bool = True,
+    upload_prefix: str = "",
+    socket_path: str = DAEMON_SOCKET_PATH,
+    interval: float = DAEMON_POLL_INTERVAL,
+):
+
+    daemon: BuildDaemon = BuildDaemon(
+        bucket_name=bucket_name,
+        worker_policy=worker_policy,
+        update_simulations=update_simulations,
+        upload_prefix=upload_prefix,
+    )
+
+    daemon.warm()
+
+    # The first build brings the site up to date with all sources
+    daemon.changed_directories()
+
+    try:
+
+        daemon.build()
+
+    except Exception:
+
+        print(f"Build failed:\n{daemon.last_error}")
+
+    Path(socket_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(socket_path).unlink(missing_ok=True)
+
+    server: _CommandServer = _CommandServer(socket_path, daemon)
+
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"Watching for changes, commands on {socket_path}")
+
+    try:
+
+        daemon.watch(interval=interval)
+
+    except KeyboardInterrupt:
+
+        pass
+
+    finally:
+
+        server.shutdown()
+        server.server_close()
+
+        Path(socket_path).unlink(missing_ok=True)
+
+
+def send_daemon_command(command: str, socket_path: str = DAEMON_SOCKET_PATH) -> str:
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+
+        client.connect(socket_path)
+        client.sendall(f"{command}\n".encode())
+
+        client.shutdown(socket.SHUT_WR)
+
+        chunks: List[bytes] = []
+
+        while True:
+
+            chunk: bytes = client.recv(65536)
+
+            if not chunk:
+
+                break
+
+            chunks.append(chunk)
+
+    return b"".join(chunks).decode()
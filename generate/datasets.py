@@ -0,0 +1,346 @@
+import hashlib
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from ps2_analysis.fire_groups.cone_of_fire import ConeOfFire
+from ps2_analysis.fire_groups.fire_group import FireGroup
+from ps2_analysis.fire_groups.fire_mode import FireMode
+from ps2_analysis.utils import fastround
+from ps2_analysis.weapons.infantry.infantry_weapon import InfantryWeapon
+from ps2_analysis.weapons.vehicle.vehicle_weapon import VehicleWeapon
+from ps2_census.enums import PlayerState
+
+from .constants import (
+    CONTENT_HASH_LENGTH,
+    DATASETS_DIRECTORY,
+    PRECISION_DECIMALS,
+    TIME_TO_KILL_MAX_RANGE,
+    TIME_TO_KILL_RANGE_STEP,
+)
+from .enum_resolvers import (
+    faction_resolver,
+    fire_mode_type_resolver,
+    item_category_resolver,
+)
+from .staging import atomic_write, output_directory
+from .ttk import TimeToKillMatrix, compute_time_to_kill_matrix
+
+Weapon = Union[InfantryWeapon, VehicleWeapon]
+FireModeRow = Tuple[str, Weapon, FireGroup, FireMode]
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+
+    if value is None:
+
+        return None
+
+    return fastround(value, PRECISION_DECIMALS)
+
+
+def _standing_cone_of_fire_value(
+    fm: FireMode, value: Callable[[ConeOfFire], float]
+) -> Optional[float]:
+
+    # Null columns for fire modes without a cone of fire when standing
+    cof: Optional[ConeOfFire] = fm.player_state_cone_of_fire.get(PlayerState.STANDING)
+
+    if cof is None:
+
+        return None
+
+    return _rounded(value(cof))
+
+
+# Column name, extractor and whether values are dictionary-encoded
+FIRE_MODE_COLUMNS: List[Tuple[str, Callable[[FireModeRow], Any], bool]] = [
+    ("type", lambda r: r[0], True),
+    ("item_id", lambda r: r[1].item_id, False),
+    ("name", lambda r: r[1].name, False),
+    ("slug", lambda r: r[1].slug, False),
+    ("faction", lambda r: faction_resolver.get(r[1].faction, r[1].faction.name), True,),
+    (
+        "category",
+        lambda r: item_category_resolver.get(r[1].category, r[1].category.name),
+        True,
+    ),
+    ("fire_group_id", lambda r: r[2].fire_group_id, False),
+    ("fire_group", lambda r: r[2].description, True),
+    ("fire_mode_id", lambda r: r[3].fire_mode_id, False),
+    (
+        "fire_mode_type",
+        lambda r: fire_mode_type_resolver.get(
+            r[3].fire_mode_type, r[3].fire_mode_type.name
+        ),
+        True,
+    ),
+    ("is_ads", lambda r: r[3].is_ads, False),
+    (
+        "max_damage",
+        lambda r: r[3].direct_damage_profile.max_damage
+        if r[3].direct_damage_profile
+        else None,
+        False,
+    ),
+    (
+        "max_damage_range",
+        lambda r: r[3].direct_damage_profile.max_damage_range
+        if r[3].direct_damage_profile
+        else None,
+        False,
+    ),
+    (
+        "min_damage",
+        lambda r: r[3].direct_damage_profile.min_damage
+        if r[3].direct_damage_profile
+        else None,
+        False,
+    ),
+    (
+        "min_damage_range",
+        lambda r: r[3].direct_damage_profile.min_damage_range
+        if r[3].direct_damage_profile
+        else None,
+        False,
+    ),
+    (
+        "pellets_count",
+        lambda r: r[3].direct_damage_profile.pellets_count
+        if r[3].direct_damage_profile
+        else None,
+        False,
+    ),
+    (
+        "indirect_max_damage",
+        lambda r: r[3].indirect_damage_profile.max_damage
+        if r[3].indirect_damage_profile
+        else None,
+        False,
+    ),
+    ("shots_per_minute", lambda r: r[3].fire_timing.shots_per_minute, False),
+    ("refire_time", lambda r: r[3].fire_timing.refire_time, False),
+    ("is_automatic", lambda r: r[3].fire_timing.is_automatic, False),
+    ("max_consecutive_shots", lambda r: r[3].max_consecutive_shots, False),
+    ("clip_size", lambda r: r[3].ammo.clip_size if r[3].ammo else None, False),
+    (
+        "short_reload_time",
+        lambda r: r[3].ammo.short_reload_time if r[3].ammo else None,
+        False,
+    ),
+    ("reload_time", lambda r: r[3].reload_time, False),
+    ("speed", lambda r: r[3].projectile.speed if r[3].projectile else None, False),
+    (
+        "cof_min",
+        lambda r: _standing_cone_of_fire_value(r[3], lambda c: c.min_cof_angle()),
+        False,
+    ),
+    (
+        "cof_max",
+        lambda r: _standing_cone_of_fire_value(r[3], lambda c: c.max_cof_angle()),
+        False,
+    ),
+    (
+        "cof_bloom",
+        lambda r: _standing_cone_of_fire_value(r[3], lambda c: c.bloom),
+        False,
+    ),
+    ("recoil_min_vertical", lambda r: _rounded(r[3].recoil.min_vertical), False),
+    ("recoil_max_vertical", lambda r: _rounded(r[3].recoil.max_vertical), False),
+    ("recoil_min_horizontal", lambda r: _rounded(r[3].recoil.min_horizontal), False),
+    ("recoil_max_horizontal", lambda r: _rounded(r[3].recoil.max_horizontal), False),
+    ("recoil_min_angle", lambda r: _rounded(r[3].recoil.min_angle), False),
+    ("recoil_max_angle", lambda r: _rounded(r[3].recoil.max_angle), False),
+    (
+        "recoil_first_shot_multiplier",
+        lambda r: _rounded(r[3].recoil.first_shot_multiplier),
+        False,
+    ),
+]
+
+
+def _fire_mode_rows(
+    infantry_weapons: List[InfantryWeapon], vehicle_weapons: List[VehicleWeapon]
+) -> Iterator[FireModeRow]:
+
+    weapon_type: str
+    weapons: List[Weapon]
+    for weapon_type, weapons in (
+        ("infantry", infantry_weapons),
+        ("vehicle", vehicle_weapons),
+    ):
+
+        weapon: Weapon
+        for weapon in weapons:
+
+            fg: FireGroup
+            for fg in weapon.fire_groups:
+
+                fm: FireMode
+                for fm in fg.fire_modes:
+
+                    yield (weapon_type, weapon, fg, fm)
+
+
+def fire_modes_columns(
+    infantry_weapons: List[InfantryWeapon], vehicle_weapons: List[VehicleWeapon]
+) -> Dict[str, list]:
+
+    columns: Dict[str, list] = {name: [] for name, _, _ in FIRE_MODE_COLUMNS}
+
+    # Single pass over all fire modes, filling every column at once
+    row: FireModeRow
+    for row in _fire_mode_rows(infantry_weapons, vehicle_weapons):
+
+        name: str
+        extractor: Callable[[FireModeRow], Any]
+        for name, extractor, _ in FIRE_MODE_COLUMNS:
+
+            columns[name].append(extractor(row))
+
+    return columns
+
+
+def encode_columns(columns: Dict[str, list], rows: List[int]) -> dict:
+
+    encoded: Dict[str, list] = {}
+    dictionaries: Dict[str, list] = {}
+
+    name: str
+    dictionary_encoded: bool
+    for name, _, dictionary_encoded in FIRE_MODE_COLUMNS:
+
+        values: list = [columns[name][i] for i in rows]
+
+        if dictionary_encoded:
+
+            dictionary: List[Any] = sorted(set(values), key=str)
+            codes: Dict[Any, int] = {v: i for i, v in enumerate(dictionary)}
+
+            encoded[name] = [codes[v] for v in values]
+            dictionaries[name] = dictionary
+
+        else:
+
+            encoded[name] = values
+
+    return {"length": len(rows), "columns": encoded, "dictionaries": dictionaries}
+
+
+def write_content_addressed_json(directory: Path, name: str, data: Any) -> str:
+
+    content: bytes = json.dumps(data, separators=(",", ":")).encode()
+    digest: str = hashlib.sha256(content).hexdigest()[:CONTENT_HASH_LENGTH]
+
+    filename: str = f"{name}.{digest}.json"
+    output_path: Path = directory.joinpath(filename)
+
+    print(f"Creating {output_path}")
+
+    atomic_write(output_path, content)
+
+    return filename
+
+
+def _category_slug(category: str) -> str:
+
+    return re.sub(r"[^a-z0-9]+", "-", category.lower())
+
+
+def time_to_kill_data(matrix: TimeToKillMatrix, rows: List[int]) -> dict:
+
+    # Nested (fire mode, range, target, location) arrays
+    return {
+        "fire_mode_id": [matrix.fire_modes[i].fire_mode_id for i in rows],
+        "ranges": matrix.ranges.tolist(),
+        "targets": [t.value for t in matrix.damage_target_types],
+        "locations": [loc.value for loc in matrix.damage_locations],
+        "damage_per_shot": matrix.damage_per_shot[rows].tolist(),
+        "shots_to_kill": matrix.shots_to_kill[rows].tolist(),
+        "time_to_kill": matrix.time_to_kill[rows].tolist(),
+        "sustained_damage_per_second": np.round(
+            matrix.sustained_damage_per_second[rows], 1
+        ).tolist(),
+    }
+
+
+def generate_weapons_stats_datasets(
+    infantry_weapons: List[InfantryWeapon], vehicle_weapons: List[VehicleWeapon]
+):
+
+    output_dir: Path = Path(output_directory(), DATASETS_DIRECTORY, "weapons")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    columns: Dict[str, list] = fire_modes_columns(
+        infantry_weapons=infantry_weapons, vehicle_weapons=vehicle_weapons
+    )
+
+    category_rows: Dict[str, List[int]] = defaultdict(list)
+
+    i: int
+    category: str
+    for i, category in enumerate(columns["category"]):
+
+        category_rows[category].append(i)
+
+    shards: Dict[str, str] = {
+        category: write_content_addressed_json(
+            directory=output_dir,
+            name=f"fire-modes-{_category_slug(category)}",
+            data=encode_columns(columns=columns, rows=rows),
+        )
+        for category, rows in sorted(category_rows.items())
+    }
+
+    all_filename: str = write_content_addressed_json(
+        directory=output_dir,
+        name="fire-modes",
+        data=encode_columns(columns=columns, rows=list(range(len(columns["type"])))),
+    )
+
+    # Single batched computation over every fire mode, in the same row order
+    print("Computing time to kill")
+
+    matrix: TimeToKillMatrix = compute_time_to_kill_matrix(
+        fire_modes=[
+            fm for _, _, _, fm in _fire_mode_rows(infantry_weapons, vehicle_weapons)
+        ],
+        ranges=np.arange(
+            0,
+            TIME_TO_KILL_MAX_RANGE + TIME_TO_KILL_RANGE_STEP,
+            TIME_TO_KILL_RANGE_STEP,
+            dtype=float,
+        ),
+    )
+
+    ttk_shards: Dict[str, str] = {
+        category: write_content_addressed_json(
+            directory=output_dir,
+            name=f"time-to-kill-{_category_slug(category)}",
+            data=time_to_kill_data(matrix=matrix, rows=rows),
+        )
+        for category, rows in sorted(category_rows.items())
+    }
+
+    # The manifest keeps a stable name and points to content-addressed files
+    output_path: Path = output_dir.joinpath("index.json")
+
+    print(f"Creating {output_path}")
+
+    atomic_write(
+        output_path,
+        json.dumps(
+            {
+                "fire_modes": {
+                    "columns": [name for name, _, _ in FIRE_MODE_COLUMNS],
+                    "all": all_filename,
+                    "categories": shards,
+                },
+                "time_to_kill": {"categories": ttk_shards},
+            },
+            separators=(",", ":"),
+        ).encode(),
+    )
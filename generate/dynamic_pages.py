@@ -1,14 +1,27 @@
 import itertools
+import json
 import math
+import time
 from datetime import datetime, timezone
-from multiprocessing import Pool, cpu_count
+from functools import lru_cache, partial
+from importlib.metadata import version
 from pathlib import Path
-from typing import Any, Dict, Iterator, List, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
-import altair
-import altair_saver
+import numpy as np
 from htmlmin import minify
-from jinja2 import Environment, FileSystemLoader, Template
+from jinja2 import Environment, Template
 from ps2_analysis.enums import DamageLocation, DamageTargetType
 from ps2_analysis.fire_groups.data_files import (
     load_data_files as load_fire_groups_data_files,
@@ -32,36 +45,96 @@ from ps2_analysis.weapons.vehicle.generate import (
 )
 from ps2_analysis.weapons.vehicle.generate import parse_vehicle_weapon_data
 from ps2_analysis.weapons.vehicle.vehicle_weapon import VehicleWeapon
-from ps2_census.enums import ItemCategory, PlayerState
+from ps2_census.enums import PlayerState
 
-from .altair_utils import (
-    SIMULATION_FIRE_MODE_COLOR,
-    SIMULATION_FIRE_MODE_OPACITY,
-    SIMULATION_FIRE_MODE_SELECTION,
-    SIMULATION_POINT_TYPE_COLOR,
-    SIMULATION_POINT_TYPE_OPACITY,
-    SIMULATION_POINT_TYPE_SELECTION,
-    SIMULATION_STK_COLOR,
-    SIMULATION_STK_OPACITY,
-    SIMULATION_STK_SELECTION,
-    X,
-    Y,
-)
+from .artifacts import artifact_cache, cached_artifact, evict_artifacts
 from .constants import (
+    BUILD_JOURNAL_PATH,
+    BUILD_REPORT_PATH,
     CHART_TEMPLATE_PATH,
     CURSOR,
     DATA_FILES_DIRECTORY,
     INFANTRY_WEAPON_STATS_TEMPLATE_PATH,
-    PAGES_DIRECTORY,
+    MAGDUMP,
     PELLET,
     PRECISION_DECIMALS,
+    SIMULATIONS,
     SIMULATIONS_DIRECTORY,
-    SITE_DIRECTORY,
+    STANCES,
+    STKR,
+    SUSTAINED,
+    SWEEP,
     TEMPLATES_DIRECTORY,
+    VEHICLE_SIMULATIONS,
     VEHICLE_WEAPON_STATS_TEMPLATE_PATH,
+    WEAPON_PAGES_STAGES,
 )
+from .enum_constants import INFANTRY_WEAPONS_NO_SIMULATION_CATEGORIES
 from .enum_resolvers import fire_mode_type_resolver
-from .jinja_filters import debug_filter, enum_name_filter, items_filter
+from .environment import shared_j2_environment
+from .fragments import content_hash, evict_fragments
+from .images import (
+    SimulationImage,
+    optimize_png,
+    optimize_simulation_image,
+    simulation_image,
+)
+from .journal import (
+    BuildJournal,
+    BuildTask,
+    BuildTaskResult,
+    hash_directories,
+    hash_files,
+    hash_inputs,
+    pending_tasks,
+    referenced_fire_group_ids,
+    run_journaled_tasks,
+    weapon_input_hash,
+    write_build_report,
+)
+from .pipeline import PipelineStage, run_pipeline
+from .progress import progress_stage, report_progress
+from .sharding import Shard, in_shard, write_shard_manifest
+from .staging import atomic_write, link_previous_outputs, output_directory
+from .stances import generate_stances_simulation
+from .streaming import stream_outputs
+from .sustained import generate_sustained_simulation, set_sustained_fire_tables
+from .sweeps import (
+    fire_mode_input_hash,
+    generate_sweep_simulation,
+    sweep_fire_mode_task,
+    sweep_point_key,
+    sweep_points,
+)
+from .ttk import ShotsToKillRanges, compute_shots_to_kill_ranges
+from .vega_compaction import compact_spec
+from .vega_utils import (
+    SIMULATION_FIRE_MODE_COLOR,
+    SIMULATION_FIRE_MODE_FIELD,
+    SIMULATION_FIRE_MODE_OPACITY,
+    SIMULATION_FIRE_MODE_SELECTION,
+    SIMULATION_POINT_TYPE_COLOR,
+    SIMULATION_POINT_TYPE_FIELD,
+    SIMULATION_POINT_TYPE_OPACITY,
+    SIMULATION_POINT_TYPE_SELECTION,
+    SIMULATION_STK_COLOR,
+    SIMULATION_STK_FIELD,
+    SIMULATION_STK_SELECTION,
+    X,
+    Y,
+    scatter_chart_spec,
+    step_chart_spec,
+    top_level_spec,
+    with_legend_spec,
+)
+from .view_models import weapon_view
+from .workers import (
+    TaskStats,
+    WorkerPolicy,
+    default_worker_policy,
+    imap_recycling,
+    timed,
+)
 
 
 def generate_magdump_simulation(
@@ -73,7 +146,7 @@ def generate_magdump_simulation(
     player_state: PlayerState = PlayerState.STANDING,
     width: Optional[int] = None,
     height: Optional[int] = None,
-) -> Tuple[Optional[altair.HConcatChart], Dict[int, altair.HConcatChart]]:
+) -> Tuple[Optional[dict], Dict[int, dict]]:
 
     assert (width or height) and not (width and height)
 
@@ -161,7 +234,7 @@ def generate_magdump_simulation(
         return (None, {})
 
     # Generate charts for fire group and individual fire groups
-    fire_modes_charts: Dict[int, altair.HConcatChart] = {}
+    fire_modes_charts: Dict[int, dict] = {}
 
     # Fire modes
     for fire_mode_id, datapoints in fire_modes_datapoints.items():
@@ -194,46 +267,24 @@ def generate_magdump_simulation(
             list(filter(lambda x: x["type"] == PELLET, datapoints))
         )
 
-        dataset: altair.Data = altair.Data(values=datapoints)
-
-        chart: altair.Chart = (
-            altair.Chart(dataset)
-            .mark_point()
-            .encode(
-                x=altair.X(
-                    f"{X}:Q",
-                    axis=altair.Axis(title="horizontal angle (degrees)"),
-                    scale=altair.Scale(domain=(min_x, max_x)),
-                ),
-                y=altair.Y(
-                    f"{Y}:Q",
-                    axis=altair.Axis(title="vertical angle (degrees)"),
-                    scale=altair.Scale(domain=(min_y, max_y)),
+        fire_modes_charts[fire_mode_id] = top_level_spec(
+            with_legend_spec(
+                chart=scatter_chart_spec(
+                    x_domain=(min_x, max_x),
+                    y_domain=(min_y, max_y),
+                    color=SIMULATION_POINT_TYPE_COLOR,
+                    opacity=SIMULATION_POINT_TYPE_OPACITY,
+                    width=chart_width,
+                    height=chart_height,
+                    title=f"{runs} magdumps, {total_shots} shots, {total_pellets} pellets",
                 ),
+                values=datapoints,
+                field=SIMULATION_POINT_TYPE_FIELD,
                 color=SIMULATION_POINT_TYPE_COLOR,
-                opacity=SIMULATION_POINT_TYPE_OPACITY,
-                tooltip=["time:Q", f"{X}:Q", f"{Y}:Q"],
-            )
-            .properties(
-                width=chart_width,
-                height=chart_height,
-                title=f"{runs} magdumps, {total_shots} shots, {total_pellets} pellets",
+                selection=SIMULATION_POINT_TYPE_SELECTION,
             )
-            .interactive()
         )
 
-        legend: altair.Chart = (
-            altair.Chart(dataset)
-            .mark_point()
-            .encode(
-                y=altair.Y("type:N", axis=altair.Axis(orient="right")),
-                color=SIMULATION_POINT_TYPE_COLOR,
-            )
-            .add_selection(SIMULATION_POINT_TYPE_SELECTION)
-        )
-
-        fire_modes_charts[fire_mode_id] = altair.hconcat(chart, legend)
-
     # Fire group
     all_datapoints: List[dict] = list(
         itertools.chain.from_iterable(fire_modes_datapoints.values())
@@ -278,45 +329,119 @@ def generate_magdump_simulation(
         filter(lambda x: x["type"] == PELLET, all_datapoints)
     )
 
-    fg_dataset: altair.Data = altair.Data(values=all_datapoints_pellets_only)
-
-    fg_chart: altair.Chart = (
-        altair.Chart(fg_dataset)
-        .mark_point()
-        .encode(
-            x=altair.X(
-                f"{X}:Q",
-                axis=altair.Axis(title="horizontal angle (degrees)"),
-                scale=altair.Scale(domain=(fg_min_x, fg_max_x)),
-            ),
-            y=altair.Y(
-                f"{Y}:Q",
-                axis=altair.Axis(title="vertical angle (degrees)"),
-                scale=altair.Scale(domain=(fg_min_y, fg_max_y)),
+    fg_chart: dict = top_level_spec(
+        with_legend_spec(
+            chart=scatter_chart_spec(
+                x_domain=(fg_min_x, fg_max_x),
+                y_domain=(fg_min_y, fg_max_y),
+                color=SIMULATION_FIRE_MODE_COLOR,
+                opacity=SIMULATION_FIRE_MODE_OPACITY,
+                width=fg_chart_width,
+                height=fg_chart_height,
+                title=f"{runs} magdumps, {all_total_shots} shots, {all_total_pellets} pellets",
             ),
+            values=all_datapoints_pellets_only,
+            field=SIMULATION_FIRE_MODE_FIELD,
             color=SIMULATION_FIRE_MODE_COLOR,
-            opacity=SIMULATION_FIRE_MODE_OPACITY,
-            tooltip=["time:Q", f"{X}:Q", f"{Y}:Q"],
+            selection=SIMULATION_FIRE_MODE_SELECTION,
         )
-        .properties(
-            width=fg_chart_width,
-            height=fg_chart_height,
-            title=f"{runs} magdumps, {all_total_shots} shots, {all_total_pellets} pellets",
-        )
-        .interactive()
     )
 
-    fg_legend: altair.Chart = (
-        altair.Chart(fg_dataset)
-        .mark_point()
-        .encode(
-            y=altair.Y("firemode:N", axis=altair.Axis(orient="right")),
-            color=SIMULATION_FIRE_MODE_COLOR,
-        )
-        .add_selection(SIMULATION_FIRE_MODE_SELECTION)
+    return (fg_chart, fire_modes_charts)
+
+
+def _stkr_chart(
+    stkr: ShotsToKillRanges,
+    fire_mode_index: int,
+    damage_location_index: int,
+    width: Optional[int],
+    height: Optional[int],
+    range_extension_factor: float,
+    zero_range_width: float,
+) -> Optional[dict]:
+
+    rows: np.ndarray = (stkr.fire_mode_index == fire_mode_index) & (
+        stkr.damage_location_index == damage_location_index
     )
 
-    return (altair.hconcat(fg_chart, fg_legend), fire_modes_charts)
+    baseline_index: int = stkr.damage_target_types.index(
+        DamageTargetType.INFANTRY_BASELINE
+    )
+    baseline_rows: np.ndarray = rows & (stkr.damage_target_type_index == baseline_index)
+
+    if not baseline_rows.any():
+
+        return None
+
+    # Other targets are only shown where they differ from the baseline
+    targets_rows: List[Tuple[DamageTargetType, np.ndarray]] = []
+
+    t: int
+    damage_target_type: DamageTargetType
+    target_rows: np.ndarray
+    for t, damage_target_type in enumerate(stkr.damage_target_types):
+
+        target_rows = rows & (stkr.damage_target_type_index == t)
+
+        if t == baseline_index or (
+            target_rows.any()
+            and not (
+                np.array_equal(stkr.distance[target_rows], stkr.distance[baseline_rows])
+                and np.array_equal(
+                    stkr.shots_to_kill[target_rows], stkr.shots_to_kill[baseline_rows]
+                )
+            )
+        ):
+
+            targets_rows.append((damage_target_type, target_rows))
+
+    shown: np.ndarray = np.logical_or.reduce([r for _, r in targets_rows])
+
+    min_x: float = float(stkr.distance[shown].min())
+    max_x: float = float(stkr.distance[shown].max()) * range_extension_factor
+    min_y: float = float(stkr.shots_to_kill[shown].min())
+    max_y: float = float(stkr.shots_to_kill[shown].max()) + 1.0
+
+    if min_y > 0.0:
+
+        min_y -= 1.0
+
+    if max_x == 0.0:
+
+        max_x = zero_range_width
+
+    datapoints: List[dict] = []
+
+    for damage_target_type, target_rows in targets_rows:
+
+        shots_to_kill: List[int] = stkr.shots_to_kill[target_rows].tolist()
+
+        datapoints.extend(
+            {X: distance, Y: stk, SIMULATION_STK_FIELD: damage_target_type}
+            for distance, stk in zip(stkr.distance[target_rows].tolist(), shots_to_kill)
+        )
+
+        # Last step extended to the end of the chart
+        datapoints.append(
+            {X: max_x, Y: shots_to_kill[-1], SIMULATION_STK_FIELD: damage_target_type}
+        )
+
+    damage_location: DamageLocation = stkr.damage_locations[damage_location_index]
+
+    return with_legend_spec(
+        chart=step_chart_spec(
+            x_domain=(min_x, max_x),
+            y_domain=(min_y, max_y),
+            title=damage_location,
+            name=damage_location.value,
+            width=width,
+            height=height,
+        ),
+        values=datapoints,
+        field=SIMULATION_STK_FIELD,
+        color=SIMULATION_STK_COLOR,
+        selection=SIMULATION_STK_SELECTION,
+    )
 
 
 def generate_stkr_simulation(
@@ -325,18 +450,41 @@ def generate_stkr_simulation(
     height: Optional[int] = None,
     range_extension_factor: float = 1.1,
     zero_range_width: float = 10,
-) -> Tuple[Optional[altair.VConcatChart], Dict[int, altair.VConcatChart]]:
+) -> Tuple[Optional[dict], Dict[int, dict]]:
     assert width or height
 
-    fire_group_chart: Optional[altair.VConcatChart] = None
-    fire_mode_charts: Dict[FireMode, altair.VConcatChart] = {}
-
     if not fire_group.fire_modes:
 
         return (None, {})
 
-    fire_group_hcharts: List[altair.HConcatChart] = []
+    # Step functions of all fire modes, targets and locations, computed at once
+    stkr: ShotsToKillRanges = compute_shots_to_kill_ranges(
+        fire_modes=fire_group.fire_modes,
+        damage_locations=(DamageLocation.TORSO, DamageLocation.HEAD),
+    )
+
+    def location_charts(fire_mode_index: int) -> List[dict]:
+
+        return [
+            chart
+            for chart in (
+                _stkr_chart(
+                    stkr=stkr,
+                    fire_mode_index=fire_mode_index,
+                    damage_location_index=damage_location_index,
+                    width=width,
+                    height=height,
+                    range_extension_factor=range_extension_factor,
+                    zero_range_width=zero_range_width,
+                )
+                for damage_location_index in range(len(stkr.damage_locations))
+            )
+            if chart is not None
+        ]
 
+    fire_group_chart: Optional[dict] = None
+
+    # Fire modes all dealing the same damage are shown once for the fire group
     if (
         (fire_group.direct_damage_profile and fire_group.indirect_damage_profile)
         or (
@@ -351,646 +499,721 @@ def generate_stkr_simulation(
         )
     ):
 
-        fm: FireMode = fire_group.fire_modes[0]
+        fire_group_hcharts: List[dict] = location_charts(0)
 
-        damage_location: DamageLocation
-        for damage_location in (DamageLocation.TORSO, DamageLocation.HEAD):
+        if fire_group_hcharts:
 
-            datapoints: List[dict] = []
+            fire_group_chart = top_level_spec({"vconcat": fire_group_hcharts})
 
-            baseline_stkr: List[Tuple[float, int]] = list(
-                fm.shots_to_kill_ranges(
-                    damage_target_type=DamageTargetType.INFANTRY_BASELINE,
-                    damage_location=damage_location,
-                )
+    fire_mode_charts: Dict[int, dict] = {}
+
+    i: int
+    fm: FireMode
+    for i, fm in enumerate(fire_group.fire_modes):
+
+        fire_mode_hcharts: List[dict] = location_charts(i)
+
+        if fire_mode_hcharts:
+
+            fire_mode_charts[fm.fire_mode_id] = top_level_spec(
+                {"vconcat": fire_mode_hcharts}
             )
 
-            if not baseline_stkr:
+    return (
+        fire_group_chart,
+        fire_mode_charts,
+    )
 
-                continue
 
-            b_distance: float
-            b_stk: int
-            for b_distance, b_stk in baseline_stkr:
-                datapoints.append(
-                    {
-                        X: b_distance,
-                        Y: b_stk,
-                        "target": DamageTargetType.INFANTRY_BASELINE,
-                    }
-                )
+class BuildData(NamedTuple):
+    fire_groups_data_id_idx: Dict[int, dict]
+    infantry_weapons_data: List[dict]
+    vehicle_weapons_data: List[dict]
 
-            damage_target_type: DamageTargetType
-            for damage_target_type in {
-                DamageTargetType.INFANTRY_AUXILIARY_SHIELD,
-                DamageTargetType.INFANTRY_INFILTRATOR,
-                DamageTargetType.INFANTRY_HEAVY_RESIST_SHIELD,
-                DamageTargetType.INFANTRY_HEAVY_HEALTH_SHIELD,
-                DamageTargetType.INFANTRY_NANOWEAVE,
-                DamageTargetType.INFANTRY_FLAK_ARMOR,
-            }:
-                stkr: List[Tuple[float, int]] = list(
-                    fm.shots_to_kill_ranges(
-                        damage_target_type=damage_target_type,
-                        damage_location=damage_location,
-                    )
-                )
 
-                if stkr and stkr != baseline_stkr:
-                    distance: float
-                    stk: int
-                    for distance, stk in stkr:
-                        datapoints.append(
-                            {X: distance, Y: stk, "target": damage_target_type}
-                        )
+SIMULATION_TITLE_SUFFIXES: Dict[str, str] = {
+    MAGDUMP: "magazine dump",
+    STANCES: "stances comparison",
+    STKR: "shots to kill ranges",
+    SWEEP: "control, burst and recoil compensation sweep",
+    SUSTAINED: "sustained fire",
+}
 
-            if not datapoints:
 
-                continue
+class SimulationChart(NamedTuple):
+    target: Union[FireGroup, FireMode]
+    base_filename: str
+    title: str
+    spec: dict
+    # Serialized once, embedded as is in the chart page
+    spec_json: str
 
-            min_x: float = min((d[X] for d in datapoints))
-            max_x: float = max((d[X] for d in datapoints)) * range_extension_factor
-            min_y: float = min((d[Y] for d in datapoints))
-            max_y: float = max((d[Y] for d in datapoints)) + 1.0
 
-            if min_y > 0.0:
+def has_simulations(weapon: InfantryWeapon) -> bool:
 
-                min_y -= 1.0
+    return weapon.category not in INFANTRY_WEAPONS_NO_SIMULATION_CATEGORIES
 
-            if max_x == 0.0:
 
-                max_x = zero_range_width
+def simulation_base_filename(
+    weapon: Union[InfantryWeapon, VehicleWeapon],
+    fire_group: FireGroup,
+    simulation: str,
+    fire_mode: Optional[FireMode] = None,
+) -> str:
 
-            target: str
-            target_dp_it: Iterator[dict]
-            for target, target_dp_it in itertools.groupby(
-                sorted(datapoints, key=lambda x: x["target"]), lambda x: x["target"]
-            ):
-                last_stk = sorted(target_dp_it, key=lambda x: x[X])[-1][Y]
+    if fire_mode is None:
 
-                datapoints.append({X: max_x, Y: last_stk, "target": target})
+        return (
+            f"{weapon.slug}-{weapon.item_id}-fg{fire_group.fire_group_id}-{simulation}"
+        )
 
-            size_properties: dict
+    return f"{weapon.slug}-{weapon.item_id}-fg{fire_group.fire_group_id}-fm{fire_mode.fire_mode_id}-{simulation}"
 
-            if width:
-                size_properties = {"width": width}
-            else:
-                size_properties = {"height": height}
-
-            dataset: altair.Data = altair.Data(values=datapoints)
-
-            chart: altair.Chart = (
-                altair.Chart(dataset)
-                .mark_line(interpolate="step-after", strokeOpacity=0.5, strokeWidth=10)
-                .encode(
-                    x=altair.X(
-                        f"{X}:Q",
-                        axis=altair.Axis(title="range (meters)"),
-                        scale=altair.Scale(domain=(min_x, max_x)),
-                    ),
-                    y=altair.Y(
-                        f"{Y}:Q",
-                        axis=altair.Axis(title="shots to kill"),
-                        scale=altair.Scale(domain=(min_y, max_y)),
-                    ),
-                    color=SIMULATION_STK_COLOR,
-                    opacity=SIMULATION_STK_OPACITY,
-                    tooltip=["target:N", f"{X}:Q", f"{Y}:Q"],
-                )
-                .properties(title=damage_location, **size_properties)
-                .interactive()
-            )
 
-            legend: altair.Chart = (
-                altair.Chart(dataset)
-                .mark_point()
-                .encode(
-                    y=altair.Y("target:N", axis=altair.Axis(orient="right")),
-                    color=SIMULATION_STK_COLOR,
+def set_simulation_base_path(
+    target: Union[FireGroup, FireMode],
+    simulation: str,
+    base_path: Path,
+    image: Optional[SimulationImage] = None,
+):
+
+    setattr(target, f"{simulation}_simulation_base_path", str(base_path))
+    setattr(
+        target,
+        f"{simulation}_simulation_image",
+        image or SimulationImage(base_path=str(base_path)),
+    )
+
+
+@lru_cache(maxsize=None)
+def simulations_version() -> str:
+
+    # Simulated charts only depend on the simulation and chart building code
+    return hash_inputs(
+        hash_files(
+            *(
+                str(Path(__file__).with_name(filename))
+                for filename in (
+                    "dynamic_pages.py",
+                    "stances.py",
+                    "sweeps.py",
+                    "sustained.py",
+                    "ttk.py",
+                    "vega_utils.py",
+                    "vega_compaction.py",
                 )
-                .add_selection(SIMULATION_STK_SELECTION)
             )
+        ),
+        version("ps2-analysis"),
+    )
 
-            fire_group_hcharts.append(altair.hconcat(chart, legend))
 
-        else:
+def _simulate_fire_group(
+    weapon: Union[InfantryWeapon, VehicleWeapon],
+    fire_group: FireGroup,
+    simulation: str,
+) -> bytes:
 
-            for fm in fire_group.fire_modes:
+    fg_chart: Optional[dict]
+    fm_charts: Dict[int, dict]
 
-                fire_mode_hcharts: List[altair.HConcatChart] = []
+    if simulation == MAGDUMP:
 
-                for damage_location in (DamageLocation.TORSO, DamageLocation.HEAD):
+        print(f"Simulating {weapon.slug} magdump")
 
-                    datapoints = []
+        fg_chart, fm_charts = generate_magdump_simulation(
+            fire_group=fire_group, runs=50, height=800,
+        )
 
-                    baseline_stkr = list(
-                        fm.shots_to_kill_ranges(
-                            damage_target_type=DamageTargetType.INFANTRY_BASELINE,
-                            damage_location=damage_location,
-                        )
-                    )
+    elif simulation == STANCES:
 
-                    if not baseline_stkr:
+        print(f"Simulating {weapon.slug} stances")
 
-                        continue
+        fg_chart, fm_charts = generate_stances_simulation(
+            fire_group=fire_group, runs=20, height=800,
+        )
 
-                    for b_distance, b_stk in baseline_stkr:
-                        datapoints.append(
-                            {
-                                X: b_distance,
-                                Y: b_stk,
-                                "target": DamageTargetType.INFANTRY_BASELINE,
-                            }
-                        )
+    elif simulation == STKR:
 
-                    for damage_target_type in {
-                        DamageTargetType.INFANTRY_AUXILIARY_SHIELD,
-                        DamageTargetType.INFANTRY_INFILTRATOR,
-                        DamageTargetType.INFANTRY_HEAVY_RESIST_SHIELD,
-                        DamageTargetType.INFANTRY_HEAVY_HEALTH_SHIELD,
-                        DamageTargetType.INFANTRY_NANOWEAVE,
-                        DamageTargetType.INFANTRY_FLAK_ARMOR,
-                    }:
-                        stkr = list(
-                            fm.shots_to_kill_ranges(
-                                damage_target_type=damage_target_type,
-                                damage_location=damage_location,
-                            )
-                        )
+        print(f"Simulating {weapon.slug} STKR")
 
-                        if stkr and stkr != baseline_stkr:
-                            for distance, stk in stkr:
-                                datapoints.append(
-                                    {X: distance, Y: stk, "target": damage_target_type}
-                                )
+        fg_chart, fm_charts = generate_stkr_simulation(fire_group=fire_group, width=800)
 
-                    if not datapoints:
+    elif simulation == SWEEP:
 
-                        continue
+        print(f"Simulating {weapon.slug} sweep")
 
-                    min_x = min((d[X] for d in datapoints))
-                    max_x = max((d[X] for d in datapoints)) * range_extension_factor
-                    min_y = min((d[Y] for d in datapoints))
-                    max_y = max((d[Y] for d in datapoints))
+        fg_chart, fm_charts = generate_sweep_simulation(fire_group=fire_group)
 
-                    if min_y > 0.0:
+    elif simulation == SUSTAINED:
 
-                        min_y -= 1.0
+        print(f"Simulating {weapon.slug} sustained fire")
 
-                    if max_x == 0.0:
+        fg_chart, fm_charts = generate_sustained_simulation(
+            fire_group=fire_group, width=800
+        )
 
-                        max_x = zero_range_width
+    else:
 
-                    for target, target_dp_it in itertools.groupby(
-                        sorted(datapoints, key=lambda x: x["target"]),
-                        lambda x: x["target"],
-                    ):
-                        last_stk = sorted(target_dp_it, key=lambda x: x[X])[-1][Y]
+        raise ValueError(f"Unsupported simulation: {simulation}")
 
-                        datapoints.append({X: max_x, Y: last_stk, "target": target})
+    # Smaller pages and PNG renderer inputs, for the same rendered charts
+    return json.dumps(
+        {
+            "fire_group": compact_spec(fg_chart) if fg_chart else None,
+            "fire_modes": {
+                fire_mode_id: compact_spec(fm_chart)
+                for fire_mode_id, fm_chart in fm_charts.items()
+            },
+        },
+        separators=(",", ":"),
+    ).encode()
 
-                    if width:
-                        size_properties = {"width": width}
-                    else:
-                        size_properties = {"height": height}
 
-                    dataset = altair.Data(values=datapoints)
+def fire_group_simulation_key(
+    fire_group: FireGroup, simulation: str, fire_group_hash: Optional[str] = None
+) -> str:
 
-                    chart = (
-                        altair.Chart(dataset)
-                        .mark_line(
-                            interpolate="step-after", strokeOpacity=0.5, strokeWidth=10,
-                        )
-                        .encode(
-                            x=altair.X(
-                                f"{X}:Q",
-                                axis=altair.Axis(title="range (meters)"),
-                                scale=altair.Scale(domain=(min_x, max_x)),
-                            ),
-                            y=altair.Y(
-                                f"{Y}:Q",
-                                axis=altair.Axis(title="shots to kill"),
-                                scale=altair.Scale(domain=(min_y, max_y)),
-                            ),
-                            color=SIMULATION_STK_COLOR,
-                            opacity=SIMULATION_STK_OPACITY,
-                            tooltip=["target:N", f"{X}:Q", f"{Y}:Q"],
-                        )
-                        .properties(title=damage_location, **size_properties)
-                        .interactive()
-                    )
+    # Shared with any other weapon or build simulating the same fire group; its
+    # hash is taken before simulation paths are set on it
+    return hash_inputs(
+        simulation, fire_group_hash or content_hash(fire_group), simulations_version(),
+    )
 
-                    legend = (
-                        altair.Chart(dataset)
-                        .mark_point()
-                        .encode(
-                            y=altair.Y("target:N", axis=altair.Axis(orient="right")),
-                            color=SIMULATION_STK_COLOR,
-                        )
-                        .add_selection(SIMULATION_STK_SELECTION)
-                    )
 
-                    fire_mode_hcharts.append(altair.hconcat(chart, legend))
+def simulation_chart_names(
+    weapon: Union[InfantryWeapon, VehicleWeapon],
+    fire_group: FireGroup,
+    simulation: str,
+) -> List[Tuple[Optional[FireMode], str, str]]:
 
-                if fire_mode_hcharts:
-                    fire_mode_charts[fm.fire_mode_id] = altair.vconcat(
-                        *fire_mode_hcharts
-                    )
+    if simulation not in SIMULATION_TITLE_SUFFIXES:
 
-    if fire_mode_hcharts:
-        fire_group_chart = altair.vconcat(*fire_group_hcharts)
+        raise ValueError(f"Unsupported simulation: {simulation}")
 
-    return (
-        fire_group_chart,
-        fire_mode_charts,
-    )
+    title_suffix: str = SIMULATION_TITLE_SUFFIXES[simulation]
 
+    # Fire group, then fire modes, charted or not
+    return [
+        (
+            None,
+            simulation_base_filename(
+                weapon=weapon, fire_group=fire_group, simulation=simulation
+            ),
+            f"{weapon.name} {fire_group.description} fire group {title_suffix}",
+        )
+    ] + [
+        (
+            fm,
+            simulation_base_filename(
+                weapon=weapon,
+                fire_group=fire_group,
+                simulation=simulation,
+                fire_mode=fm,
+            ),
+            f"{weapon.name} {fire_group.description} {fire_mode_type_resolver[fm.fire_mode_type]} {'ADS' if fm.is_ads else 'Hipfire'} fire mode {title_suffix}",
+        )
+        for fm in fire_group.fire_modes
+    ]
 
-def generate_dynamic_pages(update_simulations: bool = True):
 
-    generate_infantry_weapons_stats_pages(update_simulations=update_simulations)
-    generate_vehicle_weapons_stats_pages(update_simulations=update_simulations)
+def simulation_chart_spec(specs: dict, fire_mode_id: Optional[int]) -> Optional[dict]:
 
+    if fire_mode_id is None:
 
-def generate_infantry_weapons_stats_pages(update_simulations: bool = True):
+        return specs["fire_group"]
 
-    fire_groups_data: List[dict] = list(
-        load_fire_groups_data_files(directory=DATA_FILES_DIRECTORY)
-    )
+    return specs["fire_modes"].get(str(fire_mode_id))
 
-    fire_groups_data_id_idx: Dict[int, dict] = {
-        int(x["fire_group_id"]): x for x in fire_groups_data
-    }
 
-    infantry_weapons_data: Iterator[dict] = filter(
-        lambda x: int(x["item_id"]) not in INFANTRY_WEAPONS_EXCLUDED_ITEM_IDS,
-        load_infantry_weapons_data_files(directory=DATA_FILES_DIRECTORY),
+def generate_fire_group_simulation_charts(
+    weapon: Union[InfantryWeapon, VehicleWeapon],
+    fire_group: FireGroup,
+    simulation: str,
+    fire_group_hash: Optional[str] = None,
+) -> List[SimulationChart]:
+
+    names: List[Tuple[Optional[FireMode], str, str]] = simulation_chart_names(
+        weapon=weapon, fire_group=fire_group, simulation=simulation
     )
 
-    pool = Pool(cpu_count())
+    specs: dict = json.loads(
+        cached_artifact(
+            key=fire_group_simulation_key(fire_group, simulation, fire_group_hash),
+            produce=partial(_simulate_fire_group, weapon, fire_group, simulation),
+        )
+    )
 
-    pool.starmap(
-        _generate_infantry_weapons_stats_page,
-        (
-            (ifwd, fire_groups_data_id_idx, update_simulations)
-            for ifwd in infantry_weapons_data
-        ),
+    charts: List[SimulationChart] = []
+
+    fm: Optional[FireMode]
+    base_filename: str
+    title: str
+    for fm, base_filename, title in names:
+
+        spec: Optional[dict] = simulation_chart_spec(
+            specs, fm.fire_mode_id if fm is not None else None
+        )
+
+        if spec:
+
+            charts.append(
+                SimulationChart(
+                    target=fm if fm is not None else fire_group,
+                    base_filename=base_filename,
+                    title=title,
+                    spec=spec,
+                    spec_json=json.dumps(spec, separators=(",", ":")),
+                )
+            )
+
+    return charts
+
+
+def render_chart_page(chart_template: Template, title: str, spec_json: str) -> str:
+
+    return minify(
+        chart_template.render(
+            **{
+                "DamageLocation": DamageLocation,
+                "title": title,
+                "spec_json": spec_json,
+                "update_datetime": datetime.now(timezone.utc),
+            },
+        )
     )
 
 
-def _generate_infantry_weapons_stats_page(
-    infantry_weapon_data: dict,
-    fire_groups_data_id_idx: Dict[int, dict],
+def render_weapon_stats_page(
+    weapon: Union[InfantryWeapon, VehicleWeapon], weapon_stats_template: Template
+) -> str:
+
+    # Each step is reported apart, summed over all weapons in the build report
+    with timed("view_model"):
+        view: dict = weapon_view(weapon)
+
+    with timed("render"):
+        page: str = weapon_stats_template.render(
+            **{
+                "DamageLocation": DamageLocation,
+                "weapon": view,
+                "update_datetime": datetime.now(timezone.utc),
+            },
+        )
+
+    with timed("minify"):
+        return minify(page)
+
+
+def generate_dynamic_pages(
     update_simulations: bool = True,
+    rebuild: bool = False,
+    worker_policy: Optional[WorkerPolicy] = None,
+    shard: Optional[Shard] = None,
+    data: Optional[BuildData] = None,
 ):
 
-    infantry_weapon: InfantryWeapon = parse_infantry_weapon_data(
-        data=infantry_weapon_data, fire_groups_data_id_idx=fire_groups_data_id_idx,
-    )
+    # Data files are loaded here unless kept loaded by the caller
+    build_data: BuildData = data or load_build_data()
 
-    j2_env: Environment = Environment(
-        loader=FileSystemLoader((TEMPLATES_DIRECTORY, PAGES_DIRECTORY))
+    # Shards built on the same machine each keep their own journal and report
+    journal: BuildJournal = BuildJournal(
+        path=shard.suffixed(BUILD_JOURNAL_PATH) if shard else BUILD_JOURNAL_PATH,
+        reset=rebuild,
     )
-    j2_env.filters["items"] = items_filter
-    j2_env.filters["enum_name"] = enum_name_filter
-    j2_env.filters["debug"] = debug_filter
 
-    j2_context: Dict[str, Any] = {
-        "DamageLocation": DamageLocation,
-    }
+    policy: WorkerPolicy = worker_policy or default_worker_policy()
 
-    infantry_weapon_stats_template: Template = j2_env.get_template(
-        INFANTRY_WEAPON_STATS_TEMPLATE_PATH
-    )
+    print(f"Building with {policy.processes} workers")
 
-    infantry_weapon_stats_output_dir: Path = Path(
-        SITE_DIRECTORY, "stats", "weapons", "infantry"
+    # Sweep grid points are cached, and reused by the weapon pages built next
+    if update_simulations:
+
+        generate_sweeps(data=build_data, policy=policy, shard=shard)
+
+    results: List[BuildTaskResult]
+    pipeline: Optional[Dict[str, dict]] = None
+
+    if update_simulations:
+
+        results, pipeline = generate_weapons_stats_pages(
+            data=build_data, journal=journal, policy=policy, shard=shard,
+        )
+
+    else:
+
+        results = generate_infantry_weapons_stats_pages(
+            data=build_data, journal=journal, policy=policy, shard=shard,
+        ) + generate_vehicle_weapons_stats_pages(
+            data=build_data, journal=journal, policy=policy, shard=shard,
+        )
+
+    write_build_report(
+        results,
+        path=shard.suffixed(BUILD_REPORT_PATH) if shard else BUILD_REPORT_PATH,
+        pipeline=pipeline,
     )
 
-    infantry_weapon_stats_output_dir.mkdir(parents=True, exist_ok=True)
+    # Completed weapons stay journaled, the next build only retries these
+    failures: List[BuildTaskResult] = [r for r in results if r.error is not None]
 
-    chart_template: Template = j2_env.get_template(CHART_TEMPLATE_PATH)
+    if failures:
 
-    sim_path: Path = Path(SIMULATIONS_DIRECTORY, "weapons", "infantry")
-    sim_output_dir: Path = Path(SITE_DIRECTORY).joinpath(sim_path)
-    sim_output_dir.mkdir(parents=True, exist_ok=True)
+        raise RuntimeError(
+            f"{len(failures)} weapon pages failed: "
+            + ", ".join(f.key for f in failures)
+        )
 
-    if infantry_weapon.category not in {
-        ItemCategory.EXPLOSIVE,
-        ItemCategory.GRENADE,
-        ItemCategory.KNIFE,
-        ItemCategory.ROCKET_LAUNCHER,
-    }:
+    evict_artifacts()
+    evict_fragments()
 
-        fm: FireMode
+    if shard is not None:
 
-        fg: FireGroup
-        for fg in infantry_weapon.fire_groups:
+        write_shard_manifest(shard=shard, journal=journal)
 
-            # Magdump
-            fg_magdump_sim_base_filename: str = f"{infantry_weapon.slug}-{infantry_weapon.item_id}-fg{fg.fire_group_id}-magdump"
-            fg_magdump_sim_path: Path = sim_path.joinpath(fg_magdump_sim_base_filename)
-            fg_magdump_sim_output_path: Path = (
-                sim_output_dir.joinpath(fg_magdump_sim_base_filename)
-            )
 
-            fm_magdump_sim_base_filename: str
-            fm_magdump_sim_path: Path
-            fm_magdump_sim_output_path: Path
+def generate_sweeps(
+    data: BuildData, policy: WorkerPolicy, shard: Optional[Shard] = None
+):
 
-            # STKR
-            fg_stkr_sim_base_filename: str = f"{infantry_weapon.slug}-{infantry_weapon.item_id}-fg{fg.fire_group_id}-stkr"
-            fg_stkr_sim_path: Path = sim_path.joinpath(fg_stkr_sim_base_filename)
-            fg_stkr_sim_output_path: Path = (
-                sim_output_dir.joinpath(fg_stkr_sim_base_filename)
-            )
+    tasks: List[Tuple[dict, Dict[int, dict], int, int, str]] = []
+    fire_mode_hashes: Set[str] = set()
 
-            fm_stkr_sim_base_filename: str
-            fm_stkr_sim_path: Path
-            fm_stkr_sim_output_path: Path
+    weapon_data: dict
+    for weapon_data in data.infantry_weapons_data:
 
-            if update_simulations is False:
+        if shard is not None and not in_shard(
+            f"infantry/{weapon_data['item_id']}", shard
+        ):
 
-                # Fire group
-                if (
-                    fg_magdump_sim_output_path.with_suffix(".html").is_file()
-                    and fg_magdump_sim_output_path.with_suffix(".png").is_file()
-                ):
+            continue
+
+        infantry_weapon: InfantryWeapon = parse_infantry_weapon_data(
+            data=weapon_data, fire_groups_data_id_idx=data.fire_groups_data_id_idx,
+        )
+
+        if not has_simulations(infantry_weapon):
+
+            continue
+
+        # Only what the weapon references is sent to the workers
+        fire_groups_data_id_idx: Dict[int, dict] = {
+            fg_id: data.fire_groups_data_id_idx[fg_id]
+            for fg_id in referenced_fire_group_ids(weapon_data)
+            if fg_id in data.fire_groups_data_id_idx
+        }
+
+        fg: FireGroup
+        for fg in infantry_weapon.fire_groups:
 
-                    fg.magdump_simulation_base_path = str(fg_magdump_sim_path)
+            fm: FireMode
+            for fm in fg.fire_modes:
 
-                if (
-                    fg_stkr_sim_output_path.with_suffix(".html").is_file()
-                    and fg_stkr_sim_output_path.with_suffix(".png").is_file()
+                fm_hash: str = fire_mode_input_hash(fm)
+
+                # Fire modes shared by several weapons are swept once
+                if fm_hash in fire_mode_hashes or all(
+                    artifact_cache().get(sweep_point_key(fm_hash, p)) is not None
+                    for p in sweep_points(fm)
                 ):
 
-                    fg.stkr_simulation_base_path = str(fg_stkr_sim_path)
+                    continue
 
-                # Fire modes
-                for fm in fg.fire_modes:
+                fire_mode_hashes.add(fm_hash)
 
-                    fm_magdump_sim_base_filename = f"{infantry_weapon.slug}-{infantry_weapon.item_id}-fg{fg.fire_group_id}-fm{fm.fire_mode_id}-magdump"
-                    fm_magdump_sim_path = sim_path.joinpath(
-                        fm_magdump_sim_base_filename
+                tasks.append(
+                    (
+                        weapon_data,
+                        fire_groups_data_id_idx,
+                        fg.fire_group_id,
+                        fm.fire_mode_id,
+                        fm_hash,
                     )
+                )
 
-                    if (
-                        fg_magdump_sim_output_path.with_suffix(".html").is_file()
-                        and fg_magdump_sim_output_path.with_suffix(".png").is_file()
-                    ):
+    print(f"Sweeping {len(tasks)} fire modes")
+
+    # Fire modes failing here are swept again by their weapon page, failing it
+    index: int
+    error: Optional[str]
+    _stats: TaskStats
+    for index, _, error, _stats in imap_recycling(
+        function=sweep_fire_mode_task,
+        args=tasks,
+        policy=policy,
+        stage="sweeps",
+        task_key=lambda t: f"fire_mode/{t[3]}",
+    ):
 
-                        fm.magdump_simulation_base_path = str(fm_magdump_sim_path)
+        if error is not None:
 
-                    fm_stkr_sim_base_filename = f"{infantry_weapon.slug}-{infantry_weapon.item_id}-fg{fg.fire_group_id}-fm{fm.fire_mode_id}-stkr"
-                    fm_stkr_sim_path = sim_path.joinpath(fm_stkr_sim_base_filename)
+            print(f"Failed sweeping fire mode {tasks[index][3]}: {error}")
 
-                    if (
-                        fg_stkr_sim_output_path.with_suffix(".html").is_file()
-                        and fg_stkr_sim_output_path.with_suffix(".png").is_file()
-                    ):
 
-                        fm.stkr_simulation_base_path = str(fm_stkr_sim_path)
+def load_fire_groups_data_id_idx() -> Dict[int, dict]:
 
-            else:
+    return {
+        int(x["fire_group_id"]): x
+        for x in load_fire_groups_data_files(directory=DATA_FILES_DIRECTORY)
+    }
 
-                # Magdump
-                print(f"Simulating {infantry_weapon.slug} magdump")
 
-                fg_magdump_chart: Optional[altair.HConcatChart]
-                fm_magdump_charts: Dict[int, altair.HConcatChart]
-                fg_magdump_chart, fm_magdump_charts = generate_magdump_simulation(
-                    fire_group=fg, runs=50, height=800,
-                )
+def load_build_data() -> BuildData:
 
-                # Fire group
-                if fg_magdump_chart:
+    return BuildData(
+        fire_groups_data_id_idx=load_fire_groups_data_id_idx(),
+        infantry_weapons_data=list(load_infantry_weapons_data()),
+        vehicle_weapons_data=list(load_vehicle_weapons_data()),
+    )
 
-                    altair_saver.save(
-                        fg_magdump_chart,
-                        ".".join((str(fg_magdump_sim_output_path), "png")),
-                    )
 
-                    with open(
-                        ".".join((str(fg_magdump_sim_output_path), "html")), "w"
-                    ) as f:
-                        f.write(
-                            minify(
-                                chart_template.render(
-                                    **j2_context,
-                                    **{
-                                        "title": f"{infantry_weapon.name} {fg.description} fire group magazine dump",
-                                        "chart": fg_magdump_chart,
-                                        "update_datetime": datetime.now(timezone.utc),
-                                    },
-                                )
-                            )
-                        )
+def load_infantry_weapons_data() -> Iterator[dict]:
 
-                    fg.magdump_simulation_base_path = str(fg_magdump_sim_path)
-
-                # Fire modes
-                if fm_magdump_charts:
-
-                    for fm in fg.fire_modes:
-
-                        if fm.fire_mode_id in fm_magdump_charts:
-
-                            fm_magdump_chart: altair.HConcatChart = fm_magdump_charts[
-                                fm.fire_mode_id
-                            ]
-
-                            fm_magdump_sim_base_filename = f"{infantry_weapon.slug}-{infantry_weapon.item_id}-fg{fg.fire_group_id}-fm{fm.fire_mode_id}-magdump"
-                            fm_magdump_sim_path = sim_path.joinpath(
-                                fm_magdump_sim_base_filename
-                            )
-                            fm_magdump_sim_output_path = sim_output_dir.joinpath(
-                                fm_magdump_sim_base_filename
-                            )
-
-                            altair_saver.save(
-                                fm_magdump_chart,
-                                ".".join((str(fm_magdump_sim_output_path), "png")),
-                            )
-
-                            with open(
-                                ".".join((str(fm_magdump_sim_output_path), "html")), "w"
-                            ) as f:
-                                f.write(
-                                    minify(
-                                        chart_template.render(
-                                            **j2_context,
-                                            **{
-                                                "title": f"{infantry_weapon.name} {fg.description} {fire_mode_type_resolver[fm.fire_mode_type]} {'ADS' if fm.is_ads else 'Hipfire'} fire mode magazine dump",
-                                                "chart": fm_magdump_chart,
-                                                "update_datetime": datetime.now(
-                                                    timezone.utc
-                                                ),
-                                            },
-                                        )
-                                    )
-                                )
-
-                            fm.magdump_simulation_base_path = str(fm_magdump_sim_path)
-
-                # STKR
-                print(f"Simulating {infantry_weapon.slug} STKR")
-
-                fg_stkr_chart: Optional[altair.VConcatChart]
-                fm_stkr_charts: Dict[int, altair.VConcatChart]
-                fg_stkr_chart, fm_stkr_charts = generate_stkr_simulation(
-                    fire_group=fg, width=800,
-                )
+    return filter(
+        lambda x: int(x["item_id"]) not in INFANTRY_WEAPONS_EXCLUDED_ITEM_IDS,
+        load_infantry_weapons_data_files(directory=DATA_FILES_DIRECTORY),
+    )
 
-                # Fire group
-                if fg_stkr_chart:
 
-                    altair_saver.save(
-                        fg_stkr_chart, ".".join((str(fg_stkr_sim_output_path), "png")),
-                    )
+def load_vehicle_weapons_data() -> Iterator[dict]:
 
-                    with open(
-                        ".".join((str(fg_stkr_sim_output_path), "html")), "w"
-                    ) as f:
-                        f.write(
-                            minify(
-                                chart_template.render(
-                                    **j2_context,
-                                    **{
-                                        "title": f"{infantry_weapon.name} {fg.description} fire group shots to kill ranges",
-                                        "chart": fg_stkr_chart,
-                                        "update_datetime": datetime.now(timezone.utc),
-                                    },
-                                )
-                            )
-                        )
+    return filter(
+        lambda x: int(x["item_id"]) not in VEHICLE_WEAPONS_EXCLUDED_ITEM_IDS,
+        load_vehicle_weapons_data_files(directory=DATA_FILES_DIRECTORY),
+    )
 
-                    fg.stkr_simulation_base_path = str(fg_stkr_sim_path)
-
-                # Fire modes
-                if fm_stkr_charts:
-
-                    for fm in fg.fire_modes:
-
-                        if fm.fire_mode_id in fm_stkr_charts:
-
-                            fm_stkr_chart: altair.VConcatChart = fm_stkr_charts[
-                                fm.fire_mode_id
-                            ]
-
-                            fm_stkr_sim_base_filename = f"{infantry_weapon.slug}-{infantry_weapon.item_id}-fg{fg.fire_group_id}-fm{fm.fire_mode_id}-stkr"
-                            fm_stkr_sim_path = sim_path.joinpath(
-                                fm_stkr_sim_base_filename
-                            )
-                            fm_stkr_sim_output_path = sim_output_dir.joinpath(
-                                fm_stkr_sim_base_filename
-                            )
-
-                            altair_saver.save(
-                                fm_stkr_chart,
-                                ".".join((str(fm_stkr_sim_output_path), "png")),
-                            )
-
-                            with open(
-                                ".".join((str(fm_stkr_sim_output_path), "html")), "w"
-                            ) as f:
-                                f.write(
-                                    minify(
-                                        chart_template.render(
-                                            **j2_context,
-                                            **{
-                                                "title": f"{infantry_weapon.name} {fg.description} {fire_mode_type_resolver[fm.fire_mode_type]} {'ADS' if fm.is_ads else 'Hipfire'} fire mode shots to kill ranges",
-                                                "chart": fm_stkr_chart,
-                                                "update_datetime": datetime.now(
-                                                    timezone.utc
-                                                ),
-                                            },
-                                        )
-                                    )
-                                )
-
-                            fm.stkr_simulation_base_path = str(fm_stkr_sim_path)
 
-    output_path: Path = (
-        infantry_weapon_stats_output_dir.joinpath(
-            f"{infantry_weapon.slug}-{infantry_weapon.item_id}.html"
+def _weapon_build_tasks(
+    weapon_type: str,
+    weapons_data: Iterator[dict],
+    fire_groups_data_id_idx: Dict[int, dict],
+    update_simulations: bool,
+    shard: Optional[Shard] = None,
+) -> Iterator[BuildTask]:
+
+    # Pages are only reused when built by the same templates, code and library
+    build_hash: str = hash_inputs(
+        hash_directories(TEMPLATES_DIRECTORY),
+        hash_directories(str(Path(__file__).parent), pattern="*.py"),
+        version("ps2-analysis"),
+    )
+
+    weapon_data: dict
+    for weapon_data in weapons_data:
+
+        key: str = f"{weapon_type}/{weapon_data['item_id']}"
+
+        if shard is not None and not in_shard(key, shard):
+
+            continue
+
+        yield BuildTask(
+            key=key,
+            input_hash=weapon_input_hash(
+                weapon_data, fire_groups_data_id_idx, update_simulations, build_hash
+            ),
+            args=(weapon_data, fire_groups_data_id_idx),
         )
+
+
+def _render_chart_png(spec: dict) -> bytes:
+
+    # Heavy, and only needed when rendering simulations
+    import altair_saver
+
+    # Plain specs are rendered as they are, without validation
+    return optimize_png(altair_saver.save(spec, fmt="png"))
+
+
+def _save_chart_png(spec: dict, spec_json: str, path: Path):
+
+    atomic_write(
+        path,
+        cached_artifact(
+            key=hash_inputs(
+                "png", spec_json, version("altair-saver"), version("pillow")
+            ),
+            produce=partial(_render_chart_png, spec),
+        ),
     )
 
-    print(f"Creating {output_path}")
 
-    with open(output_path, "w") as f:
-        f.write(
-            minify(
-                infantry_weapon_stats_template.render(
-                    **j2_context,
-                    **{
-                        "weapon": infantry_weapon,
-                        "update_datetime": datetime.now(timezone.utc),
-                    },
+def _link_weapon_simulations(
+    weapon: Union[InfantryWeapon, VehicleWeapon],
+    simulations: Tuple[str, ...],
+    sim_path: Path,
+):
+
+    fg: FireGroup
+    for fg in weapon.fire_groups:
+
+        simulation: str
+        for simulation in simulations:
+
+            fg_sim_base_path: Path = sim_path.joinpath(
+                simulation_base_filename(
+                    weapon=weapon, fire_group=fg, simulation=simulation
                 )
             )
-        )
 
+            # Fire modes are linked whenever their fire group simulation exists,
+            # in the output directory or the published site
+            if not link_previous_outputs(
+                f"{fg_sim_base_path}{suffix}" for suffix in (".html", ".png")
+            ):
+
+                continue
+
+            set_simulation_base_path(
+                target=fg,
+                simulation=simulation,
+                base_path=fg_sim_base_path,
+                image=optimize_simulation_image(str(fg_sim_base_path)),
+            )
+
+            fm: FireMode
+            for fm in fg.fire_modes:
+
+                fm_sim_base_path: Path = sim_path.joinpath(
+                    simulation_base_filename(
+                        weapon=weapon,
+                        fire_group=fg,
+                        simulation=simulation,
+                        fire_mode=fm,
+                    )
+                )
+
+                fm_linked: bool = link_previous_outputs(
+                    f"{fm_sim_base_path}{suffix}" for suffix in (".html", ".png")
+                )
+
+                set_simulation_base_path(
+                    target=fm,
+                    simulation=simulation,
+                    base_path=fm_sim_base_path,
+                    image=optimize_simulation_image(str(fm_sim_base_path))
+                    if fm_linked
+                    else None,
+                )
 
-def generate_vehicle_weapons_stats_pages(update_simulations: bool = True):
 
-    fire_groups_data: List[dict] = list(
-        load_fire_groups_data_files(directory=DATA_FILES_DIRECTORY)
+def generate_infantry_weapons_stats_pages(
+    data: BuildData,
+    journal: BuildJournal,
+    policy: WorkerPolicy,
+    shard: Optional[Shard] = None,
+) -> List[BuildTaskResult]:
+
+    # Pages linking the simulations of a previous build, simulated ones being
+    # built by the weapon pages pipeline
+    return run_journaled_tasks(
+        function=_generate_infantry_weapons_stats_page,
+        tasks=_weapon_build_tasks(
+            weapon_type="infantry",
+            weapons_data=iter(data.infantry_weapons_data),
+            fire_groups_data_id_idx=data.fire_groups_data_id_idx,
+            update_simulations=False,
+            shard=shard,
+        ),
+        journal=journal,
+        policy=policy,
+        stage="infantry",
     )
 
-    fire_groups_data_id_idx: Dict[int, dict] = {
-        int(x["fire_group_id"]): x for x in fire_groups_data
-    }
 
-    vehicle_weapons_data: Iterator[dict] = filter(
-        lambda x: int(x["item_id"]) not in VEHICLE_WEAPONS_EXCLUDED_ITEM_IDS,
-        load_vehicle_weapons_data_files(directory=DATA_FILES_DIRECTORY),
+def _generate_infantry_weapons_stats_page(
+    infantry_weapon_data: dict, fire_groups_data_id_idx: Dict[int, dict],
+) -> List[str]:
+
+    infantry_weapon: InfantryWeapon = parse_infantry_weapon_data(
+        data=infantry_weapon_data, fire_groups_data_id_idx=fire_groups_data_id_idx,
     )
 
-    pool = Pool(cpu_count())
+    infantry_weapon_stats_template: Template = shared_j2_environment().get_template(
+        INFANTRY_WEAPON_STATS_TEMPLATE_PATH
+    )
 
-    pool.starmap(
-        _generate_vehicle_weapons_stats_page,
-        (
-            (vhwd, fire_groups_data_id_idx, update_simulations)
-            for vhwd in vehicle_weapons_data
+    infantry_weapon_stats_output_dir: Path = Path(
+        output_directory(), "stats", "weapons", "infantry"
+    )
+
+    infantry_weapon_stats_output_dir.mkdir(parents=True, exist_ok=True)
+
+    if has_simulations(infantry_weapon):
+
+        _link_weapon_simulations(
+            weapon=infantry_weapon,
+            simulations=SIMULATIONS,
+            sim_path=Path(SIMULATIONS_DIRECTORY, "weapons", "infantry"),
+        )
+
+    output_path: Path = (
+        infantry_weapon_stats_output_dir.joinpath(
+            f"{infantry_weapon.slug}-{infantry_weapon.item_id}.html"
+        )
+    )
+
+    print(f"Creating {output_path}")
+
+    atomic_write(
+        output_path,
+        render_weapon_stats_page(
+            weapon=infantry_weapon,
+            weapon_stats_template=infantry_weapon_stats_template,
+        ).encode(),
+    )
+
+    # Paths relative to the site directory, journaled once the page is complete
+    return [str(output_path.relative_to(output_directory()))]
+
+
+def generate_vehicle_weapons_stats_pages(
+    data: BuildData,
+    journal: BuildJournal,
+    policy: WorkerPolicy,
+    shard: Optional[Shard] = None,
+) -> List[BuildTaskResult]:
+
+    return run_journaled_tasks(
+        function=_generate_vehicle_weapons_stats_page,
+        tasks=_weapon_build_tasks(
+            weapon_type="vehicle",
+            weapons_data=iter(data.vehicle_weapons_data),
+            fire_groups_data_id_idx=data.fire_groups_data_id_idx,
+            update_simulations=False,
+            shard=shard,
         ),
+        journal=journal,
+        policy=policy,
+        stage="vehicle",
     )
 
 
 def _generate_vehicle_weapons_stats_page(
-    vehicle_weapon_data: dict,
-    fire_groups_data_id_idx: Dict[int, dict],
-    update_simulations: bool = True,
-):
+    vehicle_weapon_data: dict, fire_groups_data_id_idx: Dict[int, dict],
+) -> List[str]:
 
     vehicle_weapon: VehicleWeapon = parse_vehicle_weapon_data(
         data=vehicle_weapon_data, fire_groups_data_id_idx=fire_groups_data_id_idx,
     )
 
-    j2_env: Environment = Environment(
-        loader=FileSystemLoader((TEMPLATES_DIRECTORY, PAGES_DIRECTORY))
-    )
-    j2_env.filters["items"] = items_filter
-    j2_env.filters["enum_name"] = enum_name_filter
-
-    j2_context: Dict[str, Any] = {
-        "DamageLocation": DamageLocation,
-    }
-
-    vehicle_weapon_stats_template: Template = j2_env.get_template(
+    vehicle_weapon_stats_template: Template = shared_j2_environment().get_template(
         VEHICLE_WEAPON_STATS_TEMPLATE_PATH
     )
 
     vehicle_weapon_stats_output_dir: Path = Path(
-        SITE_DIRECTORY, "stats", "weapons", "vehicle"
+        output_directory(), "stats", "weapons", "vehicle"
     )
 
     vehicle_weapon_stats_output_dir.mkdir(parents=True, exist_ok=True)
 
-    sim_path: Path = Path(SIMULATIONS_DIRECTORY, "weapons", "vehicle")
-    sim_output_dir: Path = Path(SITE_DIRECTORY).joinpath(sim_path)
-    sim_output_dir.mkdir(parents=True, exist_ok=True)
+    _link_weapon_simulations(
+        weapon=vehicle_weapon,
+        simulations=VEHICLE_SIMULATIONS,
+        sim_path=Path(SIMULATIONS_DIRECTORY, "weapons", "vehicle"),
+    )
+
+    set_sustained_fire_tables(vehicle_weapon.fire_groups)
 
     output_path: Path = (
         vehicle_weapon_stats_output_dir.joinpath(
@@ -1000,15 +1223,556 @@ def _generate_vehicle_weapons_stats_page(
 
     print(f"Creating {output_path}")
 
-    with open(output_path, "w") as f:
-        f.write(
-            minify(
-                vehicle_weapon_stats_template.render(
-                    **j2_context,
-                    **{
-                        "weapon": vehicle_weapon,
-                        "update_datetime": datetime.now(timezone.utc),
+    atomic_write(
+        output_path,
+        render_weapon_stats_page(
+            weapon=vehicle_weapon, weapon_stats_template=vehicle_weapon_stats_template,
+        ).encode(),
+    )
+
+    return [str(output_path.relative_to(output_directory()))]
+
+
+# Weapon pages with their simulations, built by a pipeline of stages each running
+# on its own workers: simulating fire groups, building chart specs from the cached
+# simulations, rasterizing them, rendering chart and weapon pages, writing them
+
+WEAPON_PARSERS: Dict[str, Callable[..., Union[InfantryWeapon, VehicleWeapon]]] = {
+    "infantry": parse_infantry_weapon_data,
+    "vehicle": parse_vehicle_weapon_data,
+}
+
+WEAPON_SIMULATIONS: Dict[str, Tuple[str, ...]] = {
+    "infantry": SIMULATIONS,
+    "vehicle": VEHICLE_SIMULATIONS,
+}
+
+WEAPON_STATS_TEMPLATE_PATHS: Dict[str, str] = {
+    "infantry": INFANTRY_WEAPON_STATS_TEMPLATE_PATH,
+    "vehicle": VEHICLE_WEAPON_STATS_TEMPLATE_PATH,
+}
+
+
+class FireGroupSpecs(NamedTuple):
+    key: str
+    fire_group_id: int
+    simulation: str
+    # Simulation artifact, sent along so that eviction cannot lose it between stages
+    content: bytes
+    # Fire mode, None for the fire group, base path and title of each chart
+    charts: List[Tuple[Optional[int], str, str]]
+
+
+class ChartSpec(NamedTuple):
+    key: str
+    fire_group_id: int
+    fire_mode_id: Optional[int]
+    simulation: str
+    base_path: str
+    title: str
+    spec_json: str
+
+
+class WeaponPage(NamedTuple):
+    task: BuildTask
+    # Charts written for the page, without their specs
+    charts: List[ChartSpec]
+
+    @property
+    def key(self) -> str:
+
+        return self.task.key
+
+
+class PipelineWrite(NamedTuple):
+    key: str
+    path: str
+    content: bytes
+    outputs: List[str]
+    page: bool = False
+
+
+def _weapon_type(key: str) -> str:
+
+    return key.split("/", 1)[0]
+
+
+def _parse_weapon(task: BuildTask) -> Union[InfantryWeapon, VehicleWeapon]:
+
+    return WEAPON_PARSERS[_weapon_type(task.key)](
+        data=task.args[0], fire_groups_data_id_idx=task.args[1]
+    )
+
+
+def _simulate_weapon(task: BuildTask) -> List[FireGroupSpecs]:
+
+    weapon: Union[InfantryWeapon, VehicleWeapon] = _parse_weapon(task)
+
+    if isinstance(weapon, InfantryWeapon) and not has_simulations(weapon):
+
+        return []
+
+    sim_path: Path = Path(SIMULATIONS_DIRECTORY, "weapons", _weapon_type(task.key))
+
+    fire_groups_specs: List[FireGroupSpecs] = []
+
+    fg: FireGroup
+    for fg in weapon.fire_groups:
+
+        fg_hash: str = content_hash(fg)
+
+        simulation: str
+        for simulation in WEAPON_SIMULATIONS[_weapon_type(task.key)]:
+
+            content: bytes = cached_artifact(
+                key=fire_group_simulation_key(fg, simulation, fg_hash),
+                produce=partial(_simulate_fire_group, weapon, fg, simulation),
+            )
+
+            fire_groups_specs.append(
+                FireGroupSpecs(
+                    key=task.key,
+                    fire_group_id=fg.fire_group_id,
+                    simulation=simulation,
+                    content=content,
+                    charts=[
+                        (
+                            fm.fire_mode_id if fm is not None else None,
+                            str(sim_path.joinpath(base_filename)),
+                            title,
+                        )
+                        for fm, base_filename, title in simulation_chart_names(
+                            weapon=weapon, fire_group=fg, simulation=simulation
+                        )
+                    ],
+                )
+            )
+
+    return fire_groups_specs
+
+
+def _build_chart_specs(fire_group_specs: FireGroupSpecs) -> List[ChartSpec]:
+
+    specs: dict = json.loads(fire_group_specs.content)
+
+    charts: List[ChartSpec] = []
+
+    fire_mode_id: Optional[int]
+    base_path: str
+    title: str
+    for fire_mode_id, base_path, title in fire_group_specs.charts:
+
+        spec: Optional[dict] = simulation_chart_spec(specs, fire_mode_id)
+
+        if spec:
+
+            charts.append(
+                ChartSpec(
+                    key=fire_group_specs.key,
+                    fire_group_id=fire_group_specs.fire_group_id,
+                    fire_mode_id=fire_mode_id,
+                    simulation=fire_group_specs.simulation,
+                    base_path=base_path,
+                    title=title,
+                    spec_json=json.dumps(spec, separators=(",", ":")),
+                )
+            )
+
+    return charts
+
+
+def _rasterize_chart(chart: ChartSpec) -> ChartSpec:
+
+    output_path: Path = Path(output_directory(), f"{chart.base_path}.png")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    _save_chart_png(
+        spec=json.loads(chart.spec_json), spec_json=chart.spec_json, path=output_path,
+    )
+
+    # Before the chart and weapon pages referencing them are written
+    optimize_simulation_image(chart.base_path)
+
+    return chart
+
+
+def _render_weapon_output(item: Union[ChartSpec, WeaponPage]) -> PipelineWrite:
+
+    j2_env: Environment = shared_j2_environment()
+
+    if isinstance(item, ChartSpec):
+
+        return PipelineWrite(
+            key=item.key,
+            path=f"{item.base_path}.html",
+            content=render_chart_page(
+                chart_template=j2_env.get_template(CHART_TEMPLATE_PATH),
+                title=item.title,
+                spec_json=item.spec_json,
+            ).encode(),
+            outputs=[
+                f"{item.base_path}.png",
+                *simulation_image(item.base_path).variant_paths(),
+                f"{item.base_path}.html",
+            ],
+        )
+
+    weapon_type: str = _weapon_type(item.key)
+    weapon: Union[InfantryWeapon, VehicleWeapon] = _parse_weapon(item.task)
+
+    fire_groups: Dict[int, FireGroup] = {
+        fg.fire_group_id: fg for fg in weapon.fire_groups
+    }
+
+    # Image variants are generated along with the PNGs, written before the page
+    chart: ChartSpec
+    for chart in item.charts:
+
+        fg: FireGroup = fire_groups[chart.fire_group_id]
+
+        set_simulation_base_path(
+            target=fg
+            if chart.fire_mode_id is None
+            else next(
+                fm for fm in fg.fire_modes if fm.fire_mode_id == chart.fire_mode_id
+            ),
+            simulation=chart.simulation,
+            base_path=Path(chart.base_path),
+            image=simulation_image(chart.base_path),
+        )
+
+    if isinstance(weapon, VehicleWeapon):
+
+        set_sustained_fire_tables(weapon.fire_groups)
+
+    path: str = str(
+        Path("stats", "weapons", weapon_type, f"{weapon.slug}-{weapon.item_id}.html")
+    )
+
+    print(f"Creating {path}")
+
+    return PipelineWrite(
+        key=item.key,
+        path=path,
+        content=render_weapon_stats_page(
+            weapon=weapon,
+            weapon_stats_template=j2_env.get_template(
+                WEAPON_STATS_TEMPLATE_PATHS[weapon_type]
+            ),
+        ).encode(),
+        outputs=[path],
+        page=True,
+    )
+
+
+def _write_weapon_output(write: PipelineWrite) -> PipelineWrite:
+
+    output_path: Path = Path(output_directory(), write.path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    atomic_write(output_path, write.content)
+
+    return write._replace(content=b"")
+
+
+# Shares of the worker processes: simulations dominate, rasterization runs a
+# renderer per chart, specs are cheap; writes run on threads of the build process
+WEAPON_PAGES_STAGE_SHARES: Dict[str, int] = {
+    "simulate": 4,
+    "spec": 1,
+    "rasterize": 2,
+    "render": 2,
+}
+WEAPON_PAGES_WRITE_THREADS: int = 2
+
+
+def _split_processes(processes: int, shares: Dict[str, int]) -> Dict[str, int]:
+
+    # Split by largest remainder, adding up to the processes the policy allows
+    total: int = sum(shares.values())
+
+    workers: Dict[str, int] = {
+        name: processes * share // total for name, share in shares.items()
+    }
+
+    name: str
+    for name in sorted(
+        shares, key=lambda n: processes * shares[n] % total, reverse=True
+    )[: processes - sum(workers.values())]:
+
+        workers[name] += 1
+
+    return workers
+
+
+def weapon_pages_stages(policy: WorkerPolicy) -> List[PipelineStage]:
+
+    processes: Dict[str, int] = _split_processes(
+        policy.processes, WEAPON_PAGES_STAGE_SHARES
+    )
+
+    workers: Dict[str, int] = {
+        **processes,
+        "write": WEAPON_PAGES_WRITE_THREADS,
+        **(policy.stage_workers or {}),
+    }
+
+    functions: Dict[str, Callable[[Any], Any]] = {
+        "simulate": _simulate_weapon,
+        "spec": _build_chart_specs,
+        "rasterize": _rasterize_chart,
+        "render": _render_weapon_output,
+        "write": _write_weapon_output,
+    }
+
+    return [
+        PipelineStage(
+            name=name,
+            function=functions[name],
+            # Stages left without a process, with few of them, run on a thread
+            workers=max(workers[name], 1),
+            threads=processes.get(name, 0) == 0,
+        )
+        for name in WEAPON_PAGES_STAGES
+    ]
+
+
+class _WeaponPagesBuild:
+    def __init__(self, journal: BuildJournal, stage: str):
+
+        self.journal: BuildJournal = journal
+        self.stage: str = stage
+
+        # Weapons in the pipeline, until their page is written or they fail
+        self.tasks: Dict[str, BuildTask] = {}
+        self.starts: Dict[str, float] = {}
+        # Fire groups to build the specs of, and charts to write, per weapon
+        self.pending: Dict[str, int] = {}
+        self.charts: Dict[str, List[ChartSpec]] = {}
+        self.outputs: Dict[str, List[str]] = {}
+        # Memory of the workers and timed steps of all the weapon's items
+        self.stats: Dict[str, TaskStats] = {}
+
+        self.results: List[BuildTaskResult] = []
+
+    def source(
+        self, tasks: List[BuildTask], fire_groups_data_id_idx: Dict[int, dict]
+    ) -> Iterator[BuildTask]:
+
+        task: BuildTask
+        for task in tasks:
+
+            self.tasks[task.key] = task
+            self.starts[task.key] = time.perf_counter()
+            self.pending[task.key] = 0
+            self.charts[task.key] = []
+            self.outputs[task.key] = []
+            self.stats[task.key] = TaskStats(0.0, 0, 0, 0, None, {})
+
+            report_progress("task_start", self.stage, task.key)
+
+            # Only what the weapon references is sent to the workers
+            yield task._replace(
+                args=(
+                    task.args[0],
+                    {
+                        fg_id: fire_groups_data_id_idx[fg_id]
+                        for fg_id in referenced_fire_group_ids(task.args[0])
+                        if fg_id in fire_groups_data_id_idx
                     },
                 )
             )
+
+    def _merge_stats(self, key: str, stage: str, stats: TaskStats):
+
+        merged: TaskStats = self.stats[key]
+
+        timings: Dict[str, float] = dict(merged.timings or {})
+
+        # Steps timed within the stage, summed as tasks of other builds do, and
+        # the stage itself
+        name: str
+        duration: float
+        for name, duration in [
+            (f"{stage}_stage", stats.duration),
+            *(stats.timings or {}).items(),
+        ]:
+
+            timings[name] = timings.get(name, 0.0) + duration
+
+        self.stats[key] = merged._replace(
+            rss=max(merged.rss, stats.rss),
+            rss_delta=max(merged.rss_delta, stats.rss_delta),
+            peak_rss=max(merged.peak_rss, stats.peak_rss),
+            traced_peak=max(
+                (p for p in (merged.traced_peak, stats.traced_peak) if p is not None),
+                default=None,
+            ),
+            timings=timings,
         )
+
+    def route(
+        self, stage: str, item: Any, result: Any, stats: TaskStats
+    ) -> List[Tuple[str, Any]]:
+
+        key: str = item.key
+
+        # Items of failed weapons still in the pipeline are dropped
+        if key not in self.tasks:
+
+            return []
+
+        self._merge_stats(key, stage, stats)
+
+        routed: List[Tuple[str, Any]] = []
+
+        if stage == "simulate":
+
+            self.tasks[key] = item
+            self.pending[key] += len(result)
+
+            routed = [("spec", s) for s in result]
+
+        elif stage == "spec":
+
+            self.pending[key] += len(result) - 1
+
+            routed = [("rasterize", c) for c in result]
+
+        elif stage == "rasterize":
+
+            self.charts[key].append(result._replace(spec_json=""))
+
+            routed = [("render", result)]
+
+        elif stage == "render":
+
+            routed = [("write", result)]
+
+        elif result.page:
+
+            self.outputs[key].extend(result.outputs)
+
+            self._complete(key)
+
+            return []
+
+        else:
+
+            self.outputs[key].extend(result.outputs)
+            self.pending[key] -= 1
+
+        # Pages are rendered once all their charts are written
+        if stage in ("simulate", "spec", "write") and self.pending[key] == 0:
+
+            routed.append(("render", WeaponPage(self.tasks[key], self.charts[key])))
+
+        return routed
+
+    def _stats(self, key: str) -> TaskStats:
+
+        # From the weapon entering the pipeline to its page being written
+        return self.stats.pop(key)._replace(
+            duration=time.perf_counter() - self.starts.pop(key)
+        )
+
+    def _forget(self, key: str) -> BuildTask:
+
+        self.pending.pop(key)
+        self.charts.pop(key)
+
+        return self.tasks.pop(key)
+
+    def _complete(self, key: str):
+
+        task: BuildTask = self._forget(key)
+        stats: TaskStats = self._stats(key)
+
+        result: BuildTaskResult = BuildTaskResult(
+            key=key,
+            input_hash=task.input_hash,
+            outputs=self.outputs.pop(key),
+            error=None,
+            stats=stats,
+        )
+
+        self.journal.record(result)
+
+        stream_outputs(result.outputs)
+
+        report_progress(
+            "task_done", self.stage, key, duration=stats.duration,
+        )
+
+        self.results.append(result)
+
+    def fail(self, stage: str, item: Any, error: str):
+
+        key: str = item.key
+
+        if key not in self.tasks:
+
+            return
+
+        task: BuildTask = self._forget(key)
+        self.outputs.pop(key)
+
+        print(f"Failed {key} at {stage}:\n{error}")
+
+        stats: TaskStats = self._stats(key)
+
+        result: BuildTaskResult = BuildTaskResult(
+            key=key, input_hash=task.input_hash, outputs=[], error=error, stats=stats,
+        )
+
+        report_progress(
+            "task_failed",
+            self.stage,
+            key,
+            duration=stats.duration,
+            error=error.strip().splitlines()[-1],
+        )
+
+        self.results.append(result)
+
+
+def generate_weapons_stats_pages(
+    data: BuildData,
+    journal: BuildJournal,
+    policy: WorkerPolicy,
+    shard: Optional[Shard] = None,
+) -> Tuple[List[BuildTaskResult], Dict[str, dict]]:
+
+    tasks: List[BuildTask] = pending_tasks(
+        itertools.chain(
+            _weapon_build_tasks(
+                weapon_type="infantry",
+                weapons_data=iter(data.infantry_weapons_data),
+                fire_groups_data_id_idx=data.fire_groups_data_id_idx,
+                update_simulations=True,
+                shard=shard,
+            ),
+            _weapon_build_tasks(
+                weapon_type="vehicle",
+                weapons_data=iter(data.vehicle_weapons_data),
+                fire_groups_data_id_idx=data.fire_groups_data_id_idx,
+                update_simulations=True,
+                shard=shard,
+            ),
+        ),
+        journal,
+    )
+
+    build: _WeaponPagesBuild = _WeaponPagesBuild(journal=journal, stage="weapons")
+
+    with progress_stage("weapons", total=len(tasks)):
+
+        summary: Dict[str, dict] = run_pipeline(
+            stages=weapon_pages_stages(policy),
+            items=build.source(tasks, data.fire_groups_data_id_idx),
+            route=build.route,
+            fail=build.fail,
+            policy=policy,
+        )
+
+    return (build.results, summary)
@@ -0,0 +1,20 @@
+from typing import Dict, FrozenSet
+
+from ps2_census.enums import Faction, ItemCategory
+
+FACTION_BACKGROUND_COLOR_CLASSES: Dict[Faction, str] = {
+    Faction.NONE: "has-background-no-faction",
+    Faction.VANU_SOVEREIGNTY: "has-background-vs",
+    Faction.NEW_CONGLOMERATE: "has-background-nc",
+    Faction.TERRAN_REPUBLIC: "has-background-tr",
+    Faction.NS_OPERATIVES: "has-background-no-faction",
+}
+
+INFANTRY_WEAPONS_NO_SIMULATION_CATEGORIES: FrozenSet[ItemCategory] = frozenset(
+    (
+        ItemCategory.EXPLOSIVE,
+        ItemCategory.GRENADE,
+        ItemCategory.KNIFE,
+        ItemCategory.ROCKET_LAUNCHER,
+    )
+)
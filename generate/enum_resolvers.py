@@ -1,4 +1,5 @@
-from typing import Dict
+from enum import Enum
+from typing import Any, Dict, Tuple
 
 from ps2_analysis.enums import DamageLocation
 from ps2_census.enums import (
@@ -131,3 +132,28 @@ target_type_resolver: Dict[TargetType, str] = {
     TargetType.ENEMY: "Enemy",
     TargetType.ALLY: "Ally",
 }
+
+# Keyed by type as well, members of different integer enums comparing equal
+enum_name_resolver: Dict[Tuple[type, Enum], str] = {
+    (type(e), e): name
+    for resolver in (
+        faction_resolver,
+        fire_mode_type_resolver,
+        item_category_resolver,
+        projectile_flight_type_resolver,
+        damage_location_resolver,
+        player_state_resolver,
+        resist_type_resolver,
+        target_type_resolver,
+    )
+    for e, name in resolver.items()
+}
+
+
+def enum_name(e: Any) -> str:
+
+    if isinstance(e, Enum):
+
+        return enum_name_resolver.get((type(e), e), e.name)
+
+    return str(e)
@@ -0,0 +1,29 @@
+from functools import lru_cache
+
+from jinja2 import Environment, FileSystemLoader
+
+from .constants import PAGES_DIRECTORY, TEMPLATES_DIRECTORY
+from .fragments import cached_fragment
+from .jinja_filters import debug_filter, enum_name_filter, items_filter, picture_filter
+
+
+def create_j2_environment() -> Environment:
+
+    j2_env: Environment = Environment(
+        loader=FileSystemLoader((TEMPLATES_DIRECTORY, PAGES_DIRECTORY))
+    )
+    j2_env.filters["items"] = items_filter
+    j2_env.filters["enum_name"] = enum_name_filter
+    j2_env.filters["debug"] = debug_filter
+    j2_env.filters["picture"] = picture_filter
+    j2_env.globals["cached_fragment"] = cached_fragment
+
+    return j2_env
+
+
+@lru_cache(maxsize=None)
+def shared_j2_environment() -> Environment:
+
+    # Compiled templates are kept across tasks, and inherited by forked workers;
+    # they are reloaded whenever their source changes
+    return create_j2_environment()
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+from dataclasses import fields, is_dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, List, Optional, Set, Tuple
+
+from jinja2.runtime import Macro
+from markupsafe import Markup
+
+from .caching import LRUCache
+from .constants import (
+    BUILD_FRAGMENTS_DIRECTORY,
+    FRAGMENT_CACHE_SIZE,
+    FRAGMENT_STORE_SIZE,
+    TEMPLATES_DIRECTORY,
+)
+from .journal import hash_directories, hash_inputs
+
+
+@lru_cache(maxsize=None)
+def templates_version() -> str:
+
+    # Filters and resolvers shape fragments as much as the templates do
+    return hash_inputs(
+        hash_directories(TEMPLATES_DIRECTORY),
+        hash_directories(str(Path(__file__).parent), pattern="*.py"),
+    )
+
+
+def _content_repr(value: Any) -> str:
+
+    # Dataclass reprs leave out attributes set after parsing, like simulations,
+    # while cached properties and methods only depend on the fields
+    if is_dataclass(value) and not isinstance(value, type):
+
+        field_names: Set[str] = {f.name for f in fields(value)}
+
+        return (
+            f"{type(value).__qualname__}("
+            + ", ".join(
+                f"{k}={_content_repr(v)}"
+                for k, v in vars(value).items()
+                if k in field_names
+                or not (k.startswith("_") or hasattr(type(value), k))
+            )
+            + ")"
+        )
+
+    elif isinstance(value, dict):
+
+        return (
+            "{"
+            + ", ".join(
+                f"{_content_repr(k)}: {_content_repr(v)}" for k, v in value.items()
+            )
+            + "}"
+        )
+
+    elif isinstance(value, (list, tuple)):
+
+        return "[" + ", ".join(_content_repr(v) for v in value) + "]"
+
+    else:
+
+        return repr(value)
+
+
+def content_hash(*values: Any) -> str:
+
+    # Views are hashed as JSON, anything else through its content
+    return hashlib.sha256(
+        json.dumps(values, separators=(",", ":"), default=_content_repr).encode()
+    ).hexdigest()
+
+
+class FragmentCache:
+    def __init__(
+        self,
+        directory: str = BUILD_FRAGMENTS_DIRECTORY,
+        max_size: int = FRAGMENT_CACHE_SIZE,
+        max_disk_size: int = FRAGMENT_STORE_SIZE,
+    ):
+
+        self.directory: Path = Path(directory)
+        self.max_disk_size: int = max_disk_size
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self._fragments: LRUCache[str] = LRUCache(max_size=max_size, sizeof=len)
+
+    def _path(self, key: str) -> Path:
+
+        return self.directory.joinpath(key[:2], f"{key}.html")
+
+    def get(self, key: str) -> Optional[str]:
+
+        fragment: Optional[str] = self._fragments.get(key)
+
+        if fragment is None:
+
+            path: Path = self._path(key)
+
+            try:
+
+                fragment = path.read_text()
+
+                # Modification times order fragments by last use, for eviction
+                os.utime(path)
+
+            # Missing, or evicted by another process meanwhile
+            except FileNotFoundError:
+
+                return None
+
+            self._fragments.put(key, fragment)
+
+        return fragment
+
+    def put(self, key: str, fragment: str):
+
+        self._fragments.put(key, fragment)
+
+        path: Path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Other workers may be writing the same fragment, each to its own file
+        tmp_path: Path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+        tmp_path.write_text(fragment)
+
+        os.replace(tmp_path, path)
+
+    def evict(self) -> int:
+
+        # Fragments of previous templates and code are never read again
+        entries: List[Tuple[float, int, Path]] = []
+
+        path: Path
+        for path in self.directory.glob("*/*"):
+
+            if path.name.startswith("."):
+
+                continue
+
+            try:
+
+                stat: os.stat_result = path.stat()
+
+            except FileNotFoundError:
+
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size: int = sum(e[1] for e in entries)
+        evicted: int = 0
+
+        entry_size: int
+        for _, entry_size, path in sorted(entries):
+
+            if size <= self.max_disk_size:
+
+                break
+
+            try:
+
+                path.unlink()
+
+            except FileNotFoundError:
+
+                pass
+
+            size -= entry_size
+            evicted += 1
+
+        return evicted
+
+    def render(self, macro: Macro, *args: Any, **kwargs: Any) -> Markup:
+
+        key: str = content_hash(templates_version(), macro.name, args, kwargs)
+
+        fragment: Optional[str] = self.get(key)
+
+        if fragment is None:
+
+            self.misses += 1
+
+            fragment = str(macro(*args, **kwargs))
+
+            self.put(key, fragment)
+
+        else:
+
+            self.hits += 1
+
+        return Markup(fragment)
+
+
+_fragment_cache: Optional[FragmentCache] = None
+
+
+def fragment_cache() -> FragmentCache:
+
+    # One per worker process, all of them sharing the disk store
+    global _fragment_cache
+
+    if _fragment_cache is None:
+
+        _fragment_cache = FragmentCache()
+
+    return _fragment_cache
+
+
+def cached_fragment(macro: Macro, *args: Any, **kwargs: Any) -> Markup:
+
+    return fragment_cache().render(macro, *args, **kwargs)
+
+
+def evict_fragments() -> int:
+
+    return fragment_cache().evict()
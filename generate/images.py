@@ -0,0 +1,158 @@
+import hashlib
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+try:
+
+    # AVIF encoder for Pillow versions without native support
+    import pillow_avif  # noqa: F401
+
+except ImportError:
+
+    pass
+
+from .constants import SIMULATION_IMAGE_FORMATS, SIMULATION_IMAGE_WIDTHS
+from .staging import atomic_write, link_previous_outputs, output_directory
+
+# The smallest encoding is kept: lossless suits flat full size charts, but
+# resampled ones compress better lossy
+ENCODER_OPTIONS: Dict[str, List[dict]] = {
+    "png": [{"optimize": True}],
+    "webp": [{"lossless": True, "method": 6}, {"quality": 90, "method": 6}],
+    "avif": [{"quality": 80}],
+}
+
+
+class SimulationImage(NamedTuple):
+    base_path: str
+    # Ascending, the last one being the width of the chart PNG itself
+    widths: Tuple[int, ...] = ()
+    # Modern formats only, the PNG staying the full size fallback
+    formats: Tuple[str, ...] = ()
+    # Of the PNG, naming the variants resized from it
+    digest: str = ""
+
+    @property
+    def width(self) -> Optional[int]:
+
+        return self.widths[-1] if self.widths else None
+
+    def variant_path(self, width: int, fmt: str) -> str:
+
+        return f"{self.base_path}.{self.digest}.{width}w.{fmt}"
+
+    def variant_paths(self) -> Iterator[str]:
+
+        fmt: str
+        for fmt in self.formats:
+
+            width: int
+            for width in self.widths:
+
+                yield self.variant_path(width, fmt)
+
+    def srcset(self, fmt: str) -> str:
+
+        return ", ".join(f"/{self.variant_path(w, fmt)} {w}w" for w in self.widths)
+
+
+def supported_formats() -> Tuple[str, ...]:
+
+    Image.init()
+
+    return tuple(f for f in SIMULATION_IMAGE_FORMATS if f.upper() in Image.SAVE)
+
+
+def simulation_image(base_path: str) -> SimulationImage:
+
+    content: bytes = Path(output_directory(), f"{base_path}.png").read_bytes()
+
+    # Only decodes the PNG header
+    width: int
+    with Image.open(BytesIO(content)) as image:
+        width = image.width
+
+    return SimulationImage(
+        base_path=base_path,
+        widths=tuple(w for w in SIMULATION_IMAGE_WIDTHS if w < width) + (width,),
+        formats=supported_formats(),
+        digest=hashlib.sha256(content).hexdigest()[:16],
+    )
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+
+    encoded: List[bytes] = []
+
+    options: dict
+    for options in ENCODER_OPTIONS[fmt]:
+
+        output: BytesIO = BytesIO()
+
+        image.save(output, format=fmt.upper(), **options)
+
+        encoded.append(output.getvalue())
+
+    return min(encoded, key=len)
+
+
+def optimize_png(content: bytes) -> bytes:
+
+    source: Image.Image
+    with Image.open(BytesIO(content)) as source:
+        source.load()
+
+    return _encode(source, "png")
+
+
+def optimize_simulation_image(base_path: str) -> SimulationImage:
+
+    image: SimulationImage = simulation_image(base_path)
+
+    output_dir: Path = Path(output_directory())
+    png_path: Path = output_dir.joinpath(f"{base_path}.png")
+
+    # Variants are named after the PNG they are resized from, those of the
+    # published site being reused whenever it is unchanged
+    link_previous_outputs(image.variant_paths())
+
+    missing: List[str] = [
+        p for p in image.variant_paths() if not output_dir.joinpath(p).is_file()
+    ]
+
+    if not missing:
+
+        return image
+
+    print(f"Optimizing {png_path}")
+
+    source: Image.Image
+    with Image.open(png_path) as source:
+        source.load()
+
+    width: int
+    for width in image.widths:
+
+        resized: Image.Image = (
+            source
+            if width == source.width
+            else source.resize(
+                (width, max(1, round(source.height * width / source.width))),
+                Image.LANCZOS,
+            )
+        )
+
+        fmt: str
+        for fmt in image.formats:
+
+            if image.variant_path(width, fmt) in missing:
+
+                atomic_write(
+                    output_dir.joinpath(image.variant_path(width, fmt)),
+                    _encode(resized, fmt),
+                )
+
+    return image
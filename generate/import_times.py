@@ -0,0 +1,130 @@
+import builtins
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from .constants import BUILD_IMPORTS_REPORT_PATH
+
+
+class ImportTime(NamedTuple):
+    module: str
+    # Seconds, including and excluding the nested imports
+    cumulative: float
+    own: float
+
+
+_import_times: List[ImportTime] = []
+_original_import: Optional[Callable[..., Any]] = None
+
+
+def record_import_times():
+
+    global _original_import
+
+    if _original_import is not None:
+
+        return
+
+    _original_import = builtins.__import__
+
+    # Time spent in nested imports, to subtract from the enclosing one
+    nested: List[float] = []
+
+    def timed_import(
+        name: str,
+        globals: Optional[dict] = None,
+        locals: Optional[dict] = None,
+        fromlist: tuple = (),
+        level: int = 0,
+    ) -> Any:
+
+        assert _original_import is not None
+
+        # Already imported, the common case
+        if level == 0 and name in sys.modules and not fromlist:
+
+            return _original_import(name, globals, locals, fromlist, level)
+
+        modules_count: int = len(sys.modules)
+
+        nested.append(0.0)
+        start: float = time.perf_counter()
+
+        try:
+
+            return _original_import(name, globals, locals, fromlist, level)
+
+        finally:
+
+            duration: float = time.perf_counter() - start
+            nested_duration: float = nested.pop()
+
+            if nested:
+
+                nested[-1] += duration
+
+            if len(sys.modules) > modules_count:
+
+                module: str = name
+
+                if level > 0:
+
+                    module = importlib.util.resolve_name(
+                        "." * level + name, (globals or {}).get("__package__")
+                    )
+
+                _import_times.append(
+                    ImportTime(
+                        module=module,
+                        cumulative=duration,
+                        own=duration - nested_duration,
+                    )
+                )
+
+    builtins.__import__ = timed_import
+
+
+def import_times() -> List[ImportTime]:
+
+    # Slowest first, an import statement possibly loading several modules
+    merged: Dict[str, ImportTime] = {}
+
+    import_time: ImportTime
+    for import_time in _import_times:
+
+        previous: Optional[ImportTime] = merged.get(import_time.module)
+
+        merged[import_time.module] = (
+            import_time
+            if previous is None
+            else ImportTime(
+                module=import_time.module,
+                cumulative=previous.cumulative + import_time.cumulative,
+                own=previous.own + import_time.own,
+            )
+        )
+
+    return sorted(merged.values(), key=lambda x: x.cumulative, reverse=True)
+
+
+def write_import_times_report(path: str = BUILD_IMPORTS_REPORT_PATH, top: int = 10):
+
+    times: List[ImportTime] = import_times()
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump([t._asdict() for t in times], f, indent=2)
+
+    print(f"Import times written to {path}, slowest:")
+
+    import_time: ImportTime
+    for import_time in times[:top]:
+
+        print(
+            f"  {import_time.module}: {import_time.cumulative:.3f}s"
+            f" ({import_time.own:.3f}s own)"
+        )
@@ -1,27 +1,10 @@
 from enum import Enum
 from typing import Any, List, Tuple
 
-from ps2_analysis.enums import DamageLocation
-from ps2_census.enums import (
-    Faction,
-    FireModeType,
-    ItemCategory,
-    PlayerState,
-    ProjectileFlightType,
-    ResistType,
-    TargetType,
-)
-
-from .enum_resolvers import (
-    damage_location_resolver,
-    faction_resolver,
-    fire_mode_type_resolver,
-    item_category_resolver,
-    player_state_resolver,
-    projectile_flight_type_resolver,
-    resist_type_resolver,
-    target_type_resolver,
-)
+from markupsafe import Markup, escape
+
+from .enum_resolvers import enum_name
+from .images import SimulationImage
 
 
 def debug_filter(msg: str) -> str:
@@ -35,46 +18,39 @@ def items_filter(d: dict) -> List[Tuple[Any, Any]]:
     return list(d.items())
 
 
-def enum_name_filter(e: Enum) -> str:
-
-    if isinstance(e, Enum):
-
-        if isinstance(e, Faction):
-
-            return faction_resolver[e]
-
-        elif isinstance(e, FireModeType):
+def _html_attributes(attributes: dict) -> str:
 
-            return fire_mode_type_resolver[e]
+    return " ".join(f'{k}="{escape(v)}"' for k, v in attributes.items())
 
-        elif isinstance(e, ItemCategory):
 
-            return item_category_resolver[e]
+def picture_filter(image: SimulationImage, **attributes: str) -> Markup:
 
-        elif isinstance(e, ProjectileFlightType):
+    img_attributes: dict = {"src": f"/{image.base_path}.png", **attributes}
 
-            return projectile_flight_type_resolver[e]
+    # Without variants, as in the preview server which renders images on demand
+    if not image.widths:
 
-        elif isinstance(e, DamageLocation):
+        return Markup(f"<img {_html_attributes(img_attributes)} />")
 
-            return damage_location_resolver[e]
+    sizes: str = f"(max-width: {image.width}px) 100vw, {image.width}px"
 
-        elif isinstance(e, PlayerState):
+    # Browsers pick the first supported format, then the width
+    sources: str = "".join(
+        "<source "
+        + _html_attributes(
+            {"type": f"image/{fmt}", "srcset": image.srcset(fmt), "sizes": sizes}
+        )
+        + " />"
+        for fmt in image.formats
+    )
 
-            return player_state_resolver[e]
+    img_attributes["width"] = image.width
 
-        elif isinstance(e, ResistType):
+    return Markup(
+        f"<picture>{sources}<img {_html_attributes(img_attributes)} /></picture>"
+    )
 
-            return resist_type_resolver[e]
 
-        elif isinstance(e, TargetType):
-
-            return target_type_resolver[e]
-
-        else:
-
-            return e.name
-
-    else:
+def enum_name_filter(e: Enum) -> str:
 
-        return str(e)
+    return enum_name(e)
@@ -0,0 +1,331 @@
+import hashlib
+import json
+import os
+import time
+import traceback
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .constants import (
+    BUILD_JOURNAL_PATH,
+    BUILD_REPORT_PATH,
+    BUILD_TASK_BACKOFF,
+    BUILD_TASK_RETRIES,
+)
+from .staging import link_previous_outputs
+from .streaming import stream_outputs
+from .workers import TaskStats, WorkerPolicy, imap_recycling
+
+
+class BuildTask(NamedTuple):
+    key: str
+    input_hash: str
+    args: tuple
+
+
+class BuildTaskResult(NamedTuple):
+    key: str
+    input_hash: str
+    outputs: List[str]
+    error: Optional[str]
+    stats: Optional[TaskStats] = None
+
+
+def hash_inputs(*inputs: Any) -> str:
+
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str).encode()
+    ).hexdigest()
+
+
+def hash_directories(*directories: str, pattern: str = "*") -> str:
+
+    digest = hashlib.sha256()
+
+    path: Path
+    for path in sorted(p for d in directories for p in Path(d).rglob(pattern)):
+
+        if path.is_file():
+
+            digest.update(str(path).encode())
+            digest.update(path.read_bytes())
+
+    return digest.hexdigest()
+
+
+def hash_files(*paths: str) -> str:
+
+    digest = hashlib.sha256()
+
+    # Names only, for the same files to hash the same on any machine
+    path: str
+    for path in paths:
+
+        digest.update(Path(path).name.encode())
+        digest.update(Path(path).read_bytes())
+
+    return digest.hexdigest()
+
+
+def referenced_fire_group_ids(data: Any) -> Iterator[int]:
+
+    if isinstance(data, dict):
+
+        if "fire_group_id" in data:
+
+            yield int(data["fire_group_id"])
+
+        for value in data.values():
+
+            yield from referenced_fire_group_ids(value)
+
+    elif isinstance(data, list):
+
+        for value in data:
+
+            yield from referenced_fire_group_ids(value)
+
+
+def weapon_input_hash(
+    weapon_data: dict, fire_groups_data_id_idx: Dict[int, dict], *extra: Any
+) -> str:
+
+    return hash_inputs(
+        weapon_data,
+        [
+            fire_groups_data_id_idx.get(fg_id)
+            for fg_id in sorted(set(referenced_fire_group_ids(weapon_data)))
+        ],
+        *extra,
+    )
+
+
+class BuildJournal:
+    def __init__(self, path: str = BUILD_JOURNAL_PATH, reset: bool = False):
+
+        self.path: Path = Path(path)
+        self.completed: Dict[str, dict] = {}
+
+        if reset and self.path.exists():
+
+            self.path.unlink()
+
+        elif self.path.exists():
+
+            with open(self.path) as f:
+
+                for line in f:
+
+                    # An interrupted append leaves an incomplete last line
+                    try:
+
+                        entry: dict = json.loads(line)
+
+                    except json.JSONDecodeError:
+
+                        continue
+
+                    self.completed[entry["key"]] = entry
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def is_completed(self, task: BuildTask) -> bool:
+
+        entry: Optional[dict] = self.completed.get(task.key)
+
+        # Outputs of a previous build are reused when their inputs did not change
+        return (
+            entry is not None
+            and entry["input_hash"] == task.input_hash
+            and link_previous_outputs(entry["outputs"])
+        )
+
+    def record(self, result: BuildTaskResult):
+
+        entry: dict = {
+            "key": result.key,
+            "input_hash": result.input_hash,
+            "outputs": result.outputs,
+        }
+
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.completed[result.key] = entry
+
+
+def _run_task(
+    function: Callable[..., List[str]], task: BuildTask, retries: int, backoff: float,
+) -> BuildTaskResult:
+
+    attempt: int = 0
+
+    while True:
+
+        try:
+
+            return BuildTaskResult(
+                key=task.key,
+                input_hash=task.input_hash,
+                outputs=function(*task.args),
+                error=None,
+            )
+
+        except Exception:
+
+            if attempt >= retries:
+
+                return BuildTaskResult(
+                    key=task.key,
+                    input_hash=task.input_hash,
+                    outputs=[],
+                    error=traceback.format_exc(),
+                )
+
+            delay: float = backoff * 2 ** attempt
+
+            print(f"Retrying {task.key} in {delay:.1f}s")
+
+            time.sleep(delay)
+
+            attempt += 1
+
+
+def pending_tasks(tasks: Iterable[BuildTask], journal: BuildJournal) -> List[BuildTask]:
+
+    pending: List[BuildTask] = []
+
+    task: BuildTask
+    for task in tasks:
+
+        if journal.is_completed(task):
+
+            print(f"Skipping {task.key}, already completed")
+
+        else:
+
+            pending.append(task)
+
+    return pending
+
+
+def run_journaled_tasks(
+    function: Callable[..., List[str]],
+    tasks: Iterable[BuildTask],
+    journal: BuildJournal,
+    policy: WorkerPolicy,
+    retries: int = BUILD_TASK_RETRIES,
+    backoff: float = BUILD_TASK_BACKOFF,
+    stage: Optional[str] = None,
+) -> List[BuildTaskResult]:
+
+    pending: List[BuildTask] = pending_tasks(tasks, journal)
+
+    results: List[BuildTaskResult] = []
+
+    # Recorded as soon as each task completes, so that an interrupted build
+    # keeps everything finished so far
+    index: int
+    value: Optional[BuildTaskResult]
+    error: Optional[str]
+    stats: TaskStats
+    for index, value, error, stats in imap_recycling(
+        partial(_run_task, function, retries=retries, backoff=backoff),
+        pending,
+        policy,
+        stage=stage,
+        task_key=lambda t: t.key,
+    ):
+
+        result: BuildTaskResult = (
+            value
+            if value is not None
+            else BuildTaskResult(
+                key=pending[index].key,
+                input_hash=pending[index].input_hash,
+                outputs=[],
+                error=error,
+            )
+        )._replace(stats=stats)
+
+        if result.error is None:
+
+            journal.record(result)
+
+            stream_outputs(result.outputs)
+
+        else:
+
+            print(f"Failed {result.key}:\n{result.error}")
+
+        results.append(result)
+
+    return results
+
+
+def write_build_report(
+    results: List[BuildTaskResult],
+    path: str = BUILD_REPORT_PATH,
+    pipeline: Optional[Dict[str, dict]] = None,
+):
+
+    tasks: Dict[str, dict] = {
+        r.key: {"error": r.error is not None, **r.stats._asdict()}
+        for r in results
+        if r.stats is not None
+    }
+
+    timings: Dict[str, float] = {}
+
+    task: dict
+    for task in tasks.values():
+
+        name: str
+        duration: float
+        for name, duration in (task["timings"] or {}).items():
+
+            timings[name] = timings.get(name, 0.0) + duration
+
+    report: dict = {
+        "tasks": tasks,
+        "summary": {
+            "count": len(tasks),
+            "failed": sum(t["error"] for t in tasks.values()),
+            "duration": sum(t["duration"] for t in tasks.values()),
+            "max_rss": max((t["rss"] for t in tasks.values()), default=0),
+            "max_rss_delta": max((t["rss_delta"] for t in tasks.values()), default=0),
+            "max_peak_rss": max((t["peak_rss"] for t in tasks.values()), default=0),
+            "max_traced_peak": max(
+                (t["traced_peak"] or 0 for t in tasks.values()), default=0
+            ),
+            "timings": timings,
+        },
+    }
+
+    # Workers, utilization and queue depths of each stage, when pipelined
+    if pipeline is not None:
+
+        report["pipeline"] = pipeline
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Created {path}")
+
+    for name, duration in timings.items():
+
+        print(f"{name}: {duration:.1f}s over {len(tasks)} tasks")
+
+    key: str
+    for key in sorted(tasks, key=lambda k: tasks[k]["rss_delta"], reverse=True)[:10]:
+
+        print(
+            f"{key}: {tasks[key]['duration']:.1f}s, "
+            f"RSS {tasks[key]['rss'] / 2 ** 20:.0f}MB "
+            f"({tasks[key]['rss_delta'] / 2 ** 20:+.0f}MB)"
+        )
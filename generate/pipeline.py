@@ -0,0 +1,353 @@
+import heapq
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Tuple,
+    Union,
+)
+
+from .constants import (
+    BUILD_TASK_BACKOFF,
+    BUILD_TASK_RETRIES,
+    PIPELINE_QUEUE_SIZE,
+    PROGRESS_REFRESH_INTERVAL,
+    WEAPON_PAGES_STAGES,
+)
+from .progress import report_progress
+from .workers import TaskError, TaskStats, WorkerPolicy, WorkerPool
+
+
+class PipelineStage(NamedTuple):
+    name: str
+    function: Callable[[Any], Any]
+    workers: int
+    # Stages waiting on files or subprocesses run on threads, others on workers
+    # recycled as set by the worker policy
+    threads: bool = False
+
+
+class StageStats:
+    def __init__(self, workers: int):
+
+        self.workers: int = workers
+        self.completed: int = 0
+        self.failed: int = 0
+        self.retried: int = 0
+        self.busy: float = 0.0
+        self.max_depth: int = 0
+        self._depths: int = 0
+        self._samples: int = 0
+
+    def sample(self, depth: int):
+
+        self.max_depth = max(self.max_depth, depth)
+        self._depths += depth
+        self._samples += 1
+
+    def summary(self, elapsed: float) -> dict:
+
+        # Utilization near 1 with deep queues marks the stage to give workers to
+        return {
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "busy": round(self.busy, 3),
+            "utilization": round(self.busy / (self.workers * elapsed), 3)
+            if elapsed > 0
+            else 0.0,
+            "mean_depth": round(self._depths / self._samples, 3)
+            if self._samples
+            else 0.0,
+            "max_depth": self.max_depth,
+        }
+
+
+class _Entry(NamedTuple):
+    item: Any
+    attempts: int = 0
+
+
+# Items routed by the caller to any stage, from the result of the previous one
+# and the stats of the task producing it
+Route = Callable[[str, Any, Any, TaskStats], Iterable[Tuple[str, Any]]]
+
+StageExecutor = Union[ThreadPoolExecutor, WorkerPool]
+
+
+def parse_stage_workers(value: str) -> Tuple[str, int]:
+
+    stage: str
+    workers: str
+    stage, _, workers = value.partition("=")
+
+    if stage not in WEAPON_PAGES_STAGES or int(workers) < 1:
+
+        raise ValueError(f"Invalid stage workers {value}")
+
+    return (stage, int(workers))
+
+
+def _timed_call(function: Callable[[Any], Any], item: Any) -> Tuple[Any, TaskStats]:
+
+    start: float = time.perf_counter()
+
+    value: Any = function(item)
+
+    # Memory of threads is the build process's own, not told apart
+    return (value, TaskStats(time.perf_counter() - start, 0, 0, 0, None, {}))
+
+
+def _executor(stage: PipelineStage, policy: WorkerPolicy) -> StageExecutor:
+
+    if stage.threads:
+
+        return ThreadPoolExecutor(
+            max_workers=stage.workers, thread_name_prefix=stage.name
+        )
+
+    return WorkerPool(function=stage.function, policy=policy, processes=stage.workers)
+
+
+def _submit(executor: StageExecutor, stage: PipelineStage, item: Any) -> Future:
+
+    if isinstance(executor, WorkerPool):
+
+        return executor.submit(item)
+
+    return executor.submit(_timed_call, stage.function, item)
+
+
+def run_pipeline(
+    stages: List[PipelineStage],
+    items: Iterable[Any],
+    route: Route,
+    fail: Callable[[str, Any, str], None],
+    policy: WorkerPolicy,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    retries: int = BUILD_TASK_RETRIES,
+    backoff: float = BUILD_TASK_BACKOFF,
+) -> Dict[str, dict]:
+
+    names: List[str] = [s.name for s in stages]
+
+    order: Dict[str, int] = {name: i for i, name in enumerate(names)}
+
+    queues: Dict[str, Deque[_Entry]] = {name: deque() for name in names}
+    # Results routed to a full queue, waiting with the stage that produced them
+    parked: Dict[str, Deque[Tuple[str, Any]]] = {name: deque() for name in names}
+    running: Dict[str, int] = {name: 0 for name in names}
+    stage_stats: Dict[str, StageStats] = {s.name: StageStats(s.workers) for s in stages}
+
+    executors: Dict[str, StageExecutor] = {s.name: _executor(s, policy) for s in stages}
+    in_flight: Dict[Future, Tuple[str, _Entry]] = {}
+    # Failed items waiting for their retry, by time they are due
+    delayed: List[Tuple[float, int, str, _Entry]] = []
+    retried: int = 0
+
+    name: str
+    entry: _Entry
+    next_name: str
+    next_item: Any
+
+    source: Iterator[Any] = iter(items)
+    exhausted: bool = False
+
+    start: float = time.perf_counter()
+    reported: float = 0.0
+
+    try:
+
+        while True:
+
+            while delayed and delayed[0][0] <= time.perf_counter():
+
+                _, _, name, entry = heapq.heappop(delayed)
+
+                queues[name].append(entry)
+
+            # Items routed back to an earlier stage, joining others, are never held,
+            # so that stages feeding each other cannot hold each other back
+            for name in names:
+
+                while parked[name] and (
+                    order[parked[name][0][0]] <= order[name]
+                    or len(queues[parked[name][0][0]]) < queue_size
+                ):
+
+                    next_name, next_item = parked[name].popleft()
+
+                    queues[next_name].append(_Entry(next_item))
+
+            # Items are only pulled from the source while the first stage has room
+            while not exhausted and len(queues[names[0]]) < queue_size:
+
+                try:
+
+                    queues[names[0]].append(_Entry(next(source)))
+
+                except StopIteration:
+
+                    exhausted = True
+
+            # A stage is held back while the queue of the next one is full, or its
+            # results wait for room, later stages being fed first to drain the
+            # pipeline
+            i: int
+            stage: PipelineStage
+            for i, stage in reversed(list(enumerate(stages))):
+
+                while (
+                    queues[stage.name]
+                    and not parked[stage.name]
+                    and running[stage.name] < stage.workers
+                    and (i + 1 == len(stages) or len(queues[names[i + 1]]) < queue_size)
+                ):
+
+                    entry = queues[stage.name].popleft()
+
+                    in_flight[_submit(executors[stage.name], stage, entry.item)] = (
+                        stage.name,
+                        entry,
+                    )
+                    running[stage.name] += 1
+
+            # Workers retired or dead since are replaced
+            executor: StageExecutor
+            for executor in executors.values():
+
+                if isinstance(executor, WorkerPool):
+
+                    executor.maintain()
+
+            if not in_flight and not delayed and not any(parked.values()):
+
+                break
+
+            timeout: float = PROGRESS_REFRESH_INTERVAL
+
+            if delayed:
+
+                timeout = max(0.0, min(timeout, delayed[0][0] - time.perf_counter()))
+
+            done: Iterable[Future] = set()
+
+            if in_flight:
+
+                done, _ = wait(
+                    list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED,
+                )
+
+            else:
+
+                time.sleep(timeout)
+
+            future: Future
+            for future in done:
+
+                name, entry = in_flight.pop(future)
+                running[name] -= 1
+
+                try:
+
+                    result: Any
+                    stats: TaskStats
+                    result, stats = future.result()
+
+                except Exception as e:
+
+                    # A worker dying only fails its own item, the pool replacing it
+                    if entry.attempts < retries:
+
+                        stage_stats[name].retried += 1
+
+                        # Retried with backoff, as journaled tasks are
+                        delay: float = backoff * 2 ** entry.attempts
+
+                        print(f"Retrying {name} item in {delay:.1f}s")
+
+                        heapq.heappush(
+                            delayed,
+                            (
+                                time.perf_counter() + delay,
+                                retried,
+                                name,
+                                entry._replace(attempts=entry.attempts + 1),
+                            ),
+                        )
+
+                        retried += 1
+
+                    else:
+
+                        stage_stats[name].failed += 1
+
+                        fail(
+                            name,
+                            entry.item,
+                            e.error
+                            if isinstance(e, TaskError)
+                            else "".join(
+                                traceback.format_exception(type(e), e, e.__traceback__)
+                            ),
+                        )
+
+                    continue
+
+                stage_stats[name].completed += 1
+                stage_stats[name].busy += stats.duration
+
+                parked[name].extend(route(name, entry.item, result, stats))
+
+            for name in names:
+
+                stage_stats[name].sample(len(queues[name]))
+
+            now: float = time.perf_counter()
+
+            # Depths of the queues as the pipeline runs, for its workers to be sized
+            if now - reported >= PROGRESS_REFRESH_INTERVAL:
+
+                report_progress(
+                    "queue_depths",
+                    "pipeline",
+                    depths={name: len(queues[name]) for name in names},
+                    running=dict(running),
+                )
+
+                reported = now
+
+    finally:
+
+        for executor in executors.values():
+
+            executor.shutdown()
+
+        report_progress("stage_end", "pipeline")
+
+    elapsed: float = time.perf_counter() - start
+
+    summary: Dict[str, dict] = {
+        name: stage_stats[name].summary(elapsed) for name in names
+    }
+
+    for name in names:
+
+        print(
+            f"{name}: {summary[name]['completed']} items on "
+            f"{summary[name]['workers']} workers, "
+            f"{summary[name]['utilization'] * 100:.0f}% busy, queue "
+            f"{summary[name]['mean_depth']:.1f} mean / {summary[name]['max_depth']} max"
+        )
+
+    return summary
@@ -1,10 +1,10 @@
 from datetime import datetime, timezone
 from itertools import groupby
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from htmlmin import minify
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment
 from ps2_analysis.enums import DamageLocation
 from ps2_analysis.weapons.infantry.generate import generate_all_infantry_weapons
 from ps2_analysis.weapons.infantry.infantry_weapon import InfantryWeapon
@@ -12,23 +12,59 @@ from ps2_analysis.weapons.vehicle.generate import generate_all_vehicle_weapons
 from ps2_analysis.weapons.vehicle.vehicle_weapon import VehicleWeapon
 from ps2_census.enums import Faction, ItemCategory
 
-from .constants import (
-    DATA_FILES_DIRECTORY,
-    FACTION_BACKGROUND_COLOR_CLASSES,
-    PAGES_DIRECTORY,
-    SITE_DIRECTORY,
-    TEMPLATE_EXTENSION,
-    TEMPLATES_DIRECTORY,
-)
-from .jinja_filters import debug_filter, enum_name_filter, items_filter
+from .constants import DATA_FILES_DIRECTORY, PAGES_DIRECTORY, TEMPLATE_EXTENSION
+from .datasets import generate_weapons_stats_datasets
+from .enum_constants import FACTION_BACKGROUND_COLOR_CLASSES
+from .environment import shared_j2_environment
+from .search_index import generate_weapons_search_index
+from .snapshots import DataDiff, latest_diff, weapon_changes
+from .staging import atomic_write, output_directory
 
 
-def generate_predefined_pages(update_simulations: bool = True):
+def load_all_weapons() -> Tuple[List[InfantryWeapon], List[VehicleWeapon]]:
 
-    infantry_weapons: List[InfantryWeapon] = generate_all_infantry_weapons(
-        data_files_directory=DATA_FILES_DIRECTORY, no_children=True
+    return (
+        list(generate_all_infantry_weapons(data_files_directory=DATA_FILES_DIRECTORY)),
+        list(generate_all_vehicle_weapons(data_files_directory=DATA_FILES_DIRECTORY)),
     )
 
+
+def generate_weapons_data_outputs(
+    infantry_weapons: List[InfantryWeapon], vehicle_weapons: List[VehicleWeapon]
+):
+
+    generate_weapons_search_index(
+        infantry_weapons=infantry_weapons, vehicle_weapons=vehicle_weapons
+    )
+    generate_weapons_stats_datasets(
+        infantry_weapons=infantry_weapons, vehicle_weapons=vehicle_weapons
+    )
+
+
+def generate_predefined_pages(
+    update_simulations: bool = True,
+    infantry_weapons: Optional[List[InfantryWeapon]] = None,
+    vehicle_weapons: Optional[List[VehicleWeapon]] = None,
+):
+
+    # Parsed here unless kept parsed by the caller
+    if infantry_weapons is None or vehicle_weapons is None:
+
+        infantry_weapons, vehicle_weapons = load_all_weapons()
+
+    generate_weapons_data_outputs(
+        infantry_weapons=infantry_weapons, vehicle_weapons=vehicle_weapons
+    )
+
+    render_predefined_pages(
+        infantry_weapons=infantry_weapons, vehicle_weapons=vehicle_weapons
+    )
+
+
+def render_predefined_pages(
+    infantry_weapons: List[InfantryWeapon], vehicle_weapons: List[VehicleWeapon]
+):
+
     faction_category_infantry_weapons: Dict[
         Faction, Dict[ItemCategory, List[InfantryWeapon]]
     ] = {
@@ -43,10 +79,6 @@ def generate_predefined_pages(update_simulations: bool = True):
         )
     }
 
-    vehicle_weapons: List[VehicleWeapon] = generate_all_vehicle_weapons(
-        data_files_directory=DATA_FILES_DIRECTORY, no_children=True
-    )
-
     faction_category_vehicle_weapons: Dict[
         Faction, Dict[ItemCategory, List[VehicleWeapon]]
     ] = {
@@ -61,12 +93,15 @@ def generate_predefined_pages(update_simulations: bool = True):
         )
     }
 
-    j2_env: Environment = Environment(
-        loader=FileSystemLoader((TEMPLATES_DIRECTORY, PAGES_DIRECTORY))
-    )
-    j2_env.filters["items"] = items_filter
-    j2_env.filters["enum_name"] = enum_name_filter
-    j2_env.filters["debug"] = debug_filter
+    # Changes of the latest game patch, linked to the pages of current weapons
+    data_diff: Optional[DataDiff] = latest_diff()
+
+    weapon_slugs: Dict[str, str] = {
+        **{f"infantry/{w.item_id}": w.slug for w in infantry_weapons},
+        **{f"vehicle/{w.item_id}": w.slug for w in vehicle_weapons},
+    }
+
+    j2_env: Environment = shared_j2_environment()
 
     j2_context: Dict[str, Any] = {
         "DamageLocation": DamageLocation,
@@ -74,6 +109,9 @@ def generate_predefined_pages(update_simulations: bool = True):
         "faction_background_color_classes": FACTION_BACKGROUND_COLOR_CLASSES,
         "faction_category_infantry_weapons": faction_category_infantry_weapons,
         "faction_category_vehicle_weapons": faction_category_vehicle_weapons,
+        "data_diff": data_diff,
+        "weapon_changes": weapon_changes(data_diff) if data_diff else [],
+        "weapon_slugs": weapon_slugs,
     }
 
     for page_path in Path(PAGES_DIRECTORY).rglob(f"*.{TEMPLATE_EXTENSION}"):
@@ -84,18 +122,18 @@ def generate_predefined_pages(update_simulations: bool = True):
 
         source_template_path: Path = Path(*page_dirs, page_filename)
 
-        output_dir: Path = Path(SITE_DIRECTORY, *page_dirs)
+        output_dir: Path = Path(output_directory(), *page_dirs)
         output_dir.mkdir(parents=True, exist_ok=True)
 
         output_path: Path = output_dir.joinpath(f"{page_filename.split('.')[0]}.html")
 
         print(f"Creating {output_path}")
 
-        with open(output_path, "w") as f:
-            f.write(
-                minify(
-                    j2_env.get_template(str(source_template_path)).render(
-                        **j2_context, **{"update_datetime": datetime.now(timezone.utc)}
-                    )
+        atomic_write(
+            output_path,
+            minify(
+                j2_env.get_template(str(source_template_path)).render(
+                    **j2_context, **{"update_datetime": datetime.now(timezone.utc)}
                 )
-            )
+            ).encode(),
+        )
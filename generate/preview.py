@@ -0,0 +1,412 @@
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import cpu_count
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional, Pattern, Tuple
+
+from jinja2 import Environment, Template
+from ps2_analysis.fire_groups.fire_group import FireGroup
+from ps2_analysis.fire_groups.fire_mode import FireMode
+from ps2_analysis.weapons.infantry.generate import parse_infantry_weapon_data
+from ps2_analysis.weapons.infantry.infantry_weapon import InfantryWeapon
+from ps2_analysis.weapons.vehicle.generate import parse_vehicle_weapon_data
+from ps2_analysis.weapons.vehicle.vehicle_weapon import VehicleWeapon
+
+from .caching import LRUCache
+from .constants import (
+    CHART_TEMPLATE_PATH,
+    DATA_FILES_DIRECTORY,
+    INFANTRY_WEAPON_STATS_TEMPLATE_PATH,
+    PAGES_DIRECTORY,
+    PREVIEW_REFRESH_INTERVAL,
+    SIMULATIONS,
+    SIMULATIONS_DIRECTORY,
+    TEMPLATES_DIRECTORY,
+    VEHICLE_WEAPON_STATS_TEMPLATE_PATH,
+)
+from .dynamic_pages import (
+    SimulationChart,
+    generate_fire_group_simulation_charts,
+    has_simulations,
+    load_fire_groups_data_id_idx,
+    load_infantry_weapons_data,
+    load_vehicle_weapons_data,
+    render_chart_page,
+    render_weapon_stats_page,
+    set_simulation_base_path,
+    simulation_base_filename,
+)
+from .environment import create_j2_environment
+from .fragments import templates_version as fragments_templates_version
+from .journal import referenced_fire_group_ids
+from .sustained import set_sustained_fire_tables
+
+INFANTRY_WEAPON_PAGE_PATTERN: Pattern = re.compile(
+    r"^stats/weapons/infantry/(?P<slug>.+)-(?P<item_id>\d+)\.html$"
+)
+VEHICLE_WEAPON_PAGE_PATTERN: Pattern = re.compile(
+    r"^stats/weapons/vehicle/(?P<slug>.+)-(?P<item_id>\d+)\.html$"
+)
+INFANTRY_SIMULATION_PAGE_PATTERN: Pattern = re.compile(
+    rf"^{SIMULATIONS_DIRECTORY}/weapons/infantry/"
+    r"(?P<slug>.+)-(?P<item_id>\d+)-fg(?P<fire_group_id>\d+)(-fm\d+)?"
+    rf"-(?P<simulation>{'|'.join(SIMULATIONS)})\.(?P<extension>html|png)$"
+)
+
+# Any other path, like static assets, is served from the site directory
+RENDERED_PAGE_PATTERNS: Tuple[Pattern, ...] = (
+    INFANTRY_WEAPON_PAGE_PATTERN,
+    VEHICLE_WEAPON_PAGE_PATTERN,
+    INFANTRY_SIMULATION_PAGE_PATTERN,
+)
+
+EXTENSION_MIMETYPE: Dict[str, str] = {
+    "html": "text/html",
+    "png": "image/png",
+}
+
+
+def _render_fire_group_simulation(
+    infantry_weapon_data: dict,
+    fire_groups_data_id_idx: Dict[int, dict],
+    fire_group_id: int,
+    simulation: str,
+) -> Dict[str, bytes]:
+
+    # Heavy, imported by the simulation workers only
+    import altair_saver
+
+    infantry_weapon: InfantryWeapon = parse_infantry_weapon_data(
+        data=infantry_weapon_data, fire_groups_data_id_idx=fire_groups_data_id_idx,
+    )
+
+    chart_template: Template = create_j2_environment().get_template(CHART_TEMPLATE_PATH)
+
+    sim_path: Path = Path(SIMULATIONS_DIRECTORY, "weapons", "infantry")
+
+    rendered: Dict[str, bytes] = {}
+
+    fg: FireGroup
+    for fg in infantry_weapon.fire_groups:
+
+        if fg.fire_group_id != fire_group_id:
+
+            continue
+
+        simulation_chart: SimulationChart
+        for simulation_chart in generate_fire_group_simulation_charts(
+            weapon=infantry_weapon, fire_group=fg, simulation=simulation
+        ):
+
+            base_path: str = str(sim_path.joinpath(simulation_chart.base_filename))
+
+            png: BytesIO = BytesIO()
+            altair_saver.save(simulation_chart.spec, png, fmt="png")
+
+            rendered[f"{base_path}.png"] = png.getvalue()
+            rendered[f"{base_path}.html"] = render_chart_page(
+                chart_template=chart_template,
+                title=simulation_chart.title,
+                spec_json=simulation_chart.spec_json,
+            ).encode()
+
+    return rendered
+
+
+def _latest_mtime(directory: str) -> float:
+
+    latest: float = 0.0
+
+    for root, _, filenames in os.walk(directory):
+
+        for filename in filenames:
+
+            latest = max(latest, os.stat(os.path.join(root, filename)).st_mtime)
+
+    return latest
+
+
+class PreviewRenderer:
+    def __init__(self, processes: Optional[int] = None, cache_size: int = 256):
+
+        self.processes: int = processes or cpu_count()
+
+        self._pages: LRUCache[bytes] = LRUCache(max_size=cache_size)
+        self._weapons: LRUCache[InfantryWeapon] = LRUCache(max_size=cache_size)
+        self._pending: Dict[Tuple[int, int, str], Future] = {}
+
+        self._lock: Lock = Lock()
+        self._refreshed: Optional[float] = None
+        self._templates_version: Optional[float] = None
+        self._data_version: Optional[float] = None
+
+        self._j2_env: Environment
+        self._fire_groups_data_id_idx: Dict[int, dict] = {}
+        self._infantry_weapons_data: Dict[int, dict] = {}
+        self._vehicle_weapons_data: Dict[int, dict] = {}
+
+        # Created at start-up, its workers started from a server process rather
+        # than forked from request threads; the data they need is sent with each
+        # task, so that it is kept when data files are reloaded
+        context: Any = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+
+        self._executor: ProcessPoolExecutor = ProcessPoolExecutor(
+            max_workers=self.processes, mp_context=context
+        )
+
+    def _refresh(self):
+
+        now: float = time.monotonic()
+
+        # Once loaded, sources are scanned at most once per interval
+        with self._lock:
+
+            if (
+                self._templates_version is not None
+                and self._refreshed is not None
+                and now - self._refreshed < PREVIEW_REFRESH_INTERVAL
+            ):
+
+                return
+
+            self._refreshed = now
+
+        templates_version: float = max(
+            _latest_mtime(TEMPLATES_DIRECTORY), _latest_mtime(PAGES_DIRECTORY)
+        )
+        data_version: float = _latest_mtime(DATA_FILES_DIRECTORY)
+
+        with self._lock:
+
+            if data_version != self._data_version:
+
+                print("Loading data files")
+
+                self._fire_groups_data_id_idx = load_fire_groups_data_id_idx()
+                self._infantry_weapons_data = {
+                    int(x["item_id"]): x for x in load_infantry_weapons_data()
+                }
+                self._vehicle_weapons_data = {
+                    int(x["item_id"]): x for x in load_vehicle_weapons_data()
+                }
+
+                self._weapons.clear()
+                self._pages.clear()
+                self._pending.clear()
+
+                self._data_version = data_version
+
+            if templates_version != self._templates_version:
+
+                print("Loading templates")
+
+                self._j2_env = create_j2_environment()
+
+                # Fragments rendered by the previous templates are not reused
+                fragments_templates_version.cache_clear()
+
+                self._pages.clear()
+                self._pending.clear()
+
+                self._templates_version = templates_version
+
+    def render(self, path: str) -> Optional[Tuple[bytes, str]]:
+
+        if not any(p.match(path) for p in RENDERED_PAGE_PATTERNS):
+
+            return None
+
+        self._refresh()
+
+        cached: Optional[bytes] = self._pages.get(path)
+
+        if cached is not None:
+
+            return (cached, EXTENSION_MIMETYPE[path.rsplit(".", 1)[-1]])
+
+        match: Optional[re.Match]
+        content: Optional[bytes] = None
+
+        if (match := INFANTRY_WEAPON_PAGE_PATTERN.match(path)) is not None:
+
+            content = self._render_infantry_weapon_page(
+                item_id=int(match.group("item_id"))
+            )
+
+        elif (match := VEHICLE_WEAPON_PAGE_PATTERN.match(path)) is not None:
+
+            content = self._render_vehicle_weapon_page(
+                item_id=int(match.group("item_id"))
+            )
+
+        elif (match := INFANTRY_SIMULATION_PAGE_PATTERN.match(path)) is not None:
+
+            content = self._render_simulation(
+                path=path,
+                item_id=int(match.group("item_id")),
+                fire_group_id=int(match.group("fire_group_id")),
+                simulation=match.group("simulation"),
+            )
+
+        if content is None:
+
+            return None
+
+        self._pages.put(path, content)
+
+        return (content, EXTENSION_MIMETYPE[path.rsplit(".", 1)[-1]])
+
+    def _infantry_weapon(self, item_id: int) -> Optional[InfantryWeapon]:
+
+        if item_id not in self._infantry_weapons_data:
+
+            return None
+
+        infantry_weapon: Optional[InfantryWeapon] = self._weapons.get(item_id)
+
+        if infantry_weapon is None:
+
+            infantry_weapon = parse_infantry_weapon_data(
+                data=self._infantry_weapons_data[item_id],
+                fire_groups_data_id_idx=self._fire_groups_data_id_idx,
+            )
+
+            self._weapons.put(item_id, infantry_weapon)
+
+        return infantry_weapon
+
+    def _render_infantry_weapon_page(self, item_id: int) -> Optional[bytes]:
+
+        infantry_weapon: Optional[InfantryWeapon] = self._infantry_weapon(item_id)
+
+        if infantry_weapon is None:
+
+            return None
+
+        # Link every simulation; they get rendered when first requested
+        if has_simulations(infantry_weapon):
+
+            sim_path: Path = Path(SIMULATIONS_DIRECTORY, "weapons", "infantry")
+
+            fg: FireGroup
+            for fg in infantry_weapon.fire_groups:
+
+                simulation: str
+                for simulation in SIMULATIONS:
+
+                    set_simulation_base_path(
+                        target=fg,
+                        simulation=simulation,
+                        base_path=sim_path.joinpath(
+                            simulation_base_filename(
+                                weapon=infantry_weapon,
+                                fire_group=fg,
+                                simulation=simulation,
+                            )
+                        ),
+                    )
+
+                    fm: FireMode
+                    for fm in fg.fire_modes:
+
+                        set_simulation_base_path(
+                            target=fm,
+                            simulation=simulation,
+                            base_path=sim_path.joinpath(
+                                simulation_base_filename(
+                                    weapon=infantry_weapon,
+                                    fire_group=fg,
+                                    simulation=simulation,
+                                    fire_mode=fm,
+                                )
+                            ),
+                        )
+
+        return render_weapon_stats_page(
+            weapon=infantry_weapon,
+            weapon_stats_template=self._j2_env.get_template(
+                INFANTRY_WEAPON_STATS_TEMPLATE_PATH
+            ),
+        ).encode()
+
+    def _render_vehicle_weapon_page(self, item_id: int) -> Optional[bytes]:
+
+        if item_id not in self._vehicle_weapons_data:
+
+            return None
+
+        vehicle_weapon: VehicleWeapon = parse_vehicle_weapon_data(
+            data=self._vehicle_weapons_data[item_id],
+            fire_groups_data_id_idx=self._fire_groups_data_id_idx,
+        )
+
+        # Sustained fire tables only, charts being left to full builds
+        set_sustained_fire_tables(vehicle_weapon.fire_groups)
+
+        return render_weapon_stats_page(
+            weapon=vehicle_weapon,
+            weapon_stats_template=self._j2_env.get_template(
+                VEHICLE_WEAPON_STATS_TEMPLATE_PATH
+            ),
+        ).encode()
+
+    def _render_simulation(
+        self, path: str, item_id: int, fire_group_id: int, simulation: str
+    ) -> Optional[bytes]:
+
+        if item_id not in self._infantry_weapons_data:
+
+            return None
+
+        # A whole fire group simulation renders the fire group and all its fire modes
+        # pages at once; concurrent requests share the same pending computation
+        key: Tuple[int, int, str] = (item_id, fire_group_id, simulation)
+
+        future: Future
+
+        with self._lock:
+
+            if key in self._pending:
+
+                future = self._pending[key]
+
+            else:
+
+                print(f"Queuing {simulation} simulation of fire group {fire_group_id}")
+
+                infantry_weapon_data: dict = self._infantry_weapons_data[item_id]
+
+                future = self._executor.submit(
+                    _render_fire_group_simulation,
+                    infantry_weapon_data,
+                    # Only what the weapon references is sent to the workers
+                    {
+                        fg_id: self._fire_groups_data_id_idx[fg_id]
+                        for fg_id in referenced_fire_group_ids(infantry_weapon_data)
+                        if fg_id in self._fire_groups_data_id_idx
+                    },
+                    fire_group_id,
+                    simulation,
+                )
+
+                self._pending[key] = future
+
+        rendered: Dict[str, bytes] = future.result()
+
+        with self._lock:
+
+            self._pending.pop(key, None)
+
+        rendered_path: str
+        rendered_content: bytes
+        for rendered_path, rendered_content in rendered.items():
+
+            self._pages.put(rendered_path, rendered_content)
+
+        return rendered.get(path)
@@ -0,0 +1,408 @@
+import json
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import Queue
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from .constants import (
+    BUILD_PROGRESS_PATH,
+    BUILD_REPORT_PATH,
+    PROGRESS_REFRESH_INTERVAL,
+    PROGRESS_SLOW_TASK_FACTOR,
+    PROGRESS_SLOW_TASK_MIN_DURATION,
+)
+
+# Set by the parent process before starting workers, which inherit it
+_events: Optional[Queue] = None
+
+
+def report_progress(event: str, stage: str, key: Optional[str] = None, **fields):
+
+    # Nothing is reported when no monitor is running
+    if _events is None:
+
+        return
+
+    _events.put(
+        {
+            "event": event,
+            "stage": stage,
+            "key": key,
+            "pid": os.getpid(),
+            "time": time.time(),
+            **fields,
+        }
+    )
+
+
+@contextmanager
+def progress_stage(stage: str, total: int) -> Iterator[None]:
+
+    report_progress("stage_start", stage, total=total)
+
+    try:
+
+        yield
+
+    finally:
+
+        report_progress("stage_end", stage)
+
+
+@contextmanager
+def progress_task(stage: str, key: str) -> Iterator[None]:
+
+    report_progress("task_start", stage, key)
+
+    start: float = time.perf_counter()
+
+    try:
+
+        yield
+
+    except Exception as e:
+
+        report_progress(
+            "task_failed",
+            stage,
+            key,
+            duration=time.perf_counter() - start,
+            error=repr(e),
+        )
+
+        raise
+
+    report_progress("task_done", stage, key, duration=time.perf_counter() - start)
+
+
+def previous_durations(path: str = BUILD_REPORT_PATH) -> Dict[str, float]:
+
+    # Task durations of the previous build, as expected costs of this one
+    try:
+
+        with open(path) as f:
+
+            return {k: v["duration"] for k, v in json.load(f)["tasks"].items()}
+
+    except (OSError, ValueError, KeyError):
+
+        return {}
+
+
+def _format_duration(seconds: float) -> str:
+
+    minutes: int
+    remainder: int
+    minutes, remainder = divmod(int(seconds), 60)
+
+    return f"{minutes}m{remainder:02d}s" if minutes else f"{remainder}s"
+
+
+class _StageProgress:
+    def __init__(self, total: int, start: float):
+
+        self.total: int = total
+        self.start: float = start
+        self.completed: int = 0
+        self.failed: int = 0
+        self.durations: List[float] = []
+        self.running: Dict[str, Tuple[float, int]] = {}
+
+    def rate(self, now: float) -> float:
+
+        # Tasks per minute since the stage started
+        elapsed: float = now - self.start
+
+        return self.completed * 60 / elapsed if elapsed > 0 else 0.0
+
+    def eta(self, now: float) -> Optional[float]:
+
+        rate: float = self.rate(now)
+
+        return (self.total - self.completed) * 60 / rate if rate > 0 else None
+
+
+class ProgressMonitor:
+    def __init__(
+        self,
+        log_path: Optional[str] = None,
+        stream: TextIO = sys.stderr,
+        expected_durations: Optional[Dict[str, float]] = None,
+    ):
+
+        # A live display on terminals, an event log otherwise
+        self.stream: TextIO = stream
+        self.interactive: bool = log_path is None and stream.isatty()
+        self.log_path: Optional[Path] = (
+            None
+            if self.interactive
+            else Path(log_path if log_path is not None else BUILD_PROGRESS_PATH)
+        )
+
+        self.expected_durations: Dict[str, float] = (
+            expected_durations
+            if expected_durations is not None
+            else previous_durations()
+        )
+
+        self.stages: Dict[str, _StageProgress] = {}
+        self.slow: Set[str] = set()
+        # Queued and running items of each pipeline stage, as last reported
+        self.queues: Dict[str, Tuple[int, int]] = {}
+
+        self._events: Queue = Queue()
+        self._log: Optional[TextIO] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+
+        global _events
+
+        if self.log_path is not None:
+
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(self.log_path, "w")
+
+        _events = self._events
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+
+        global _events
+
+        if self._thread is None:
+
+            return
+
+        _events = None
+
+        self._events.put(None)
+        self._thread.join()
+        self._thread = None
+
+        if self.interactive:
+
+            self.stream.write("\r\x1b[K")
+            self.stream.flush()
+
+        if self._log is not None:
+
+            self._log.close()
+            self._log = None
+
+    def __enter__(self) -> "ProgressMonitor":
+
+        self.start()
+
+        return self
+
+    def __exit__(self, *_):
+
+        self.stop()
+
+    def _run(self):
+
+        while True:
+
+            try:
+
+                event: Optional[dict] = self._events.get(
+                    timeout=PROGRESS_REFRESH_INTERVAL
+                )
+
+            except queue.Empty:
+
+                event = {}
+
+            if event is None:
+
+                break
+
+            if event:
+
+                self._handle(event)
+
+            self._check_slow_tasks()
+
+            if self.interactive:
+
+                self._display()
+
+    def _handle(self, event: dict):
+
+        stage: str = event["stage"]
+        key: Optional[str] = event["key"]
+
+        if event["event"] == "stage_start":
+
+            self.stages[stage] = _StageProgress(
+                total=event["total"], start=event["time"]
+            )
+
+        progress: Optional[_StageProgress] = self.stages.get(stage)
+
+        # Stages counting their tasks as they go
+        if progress is not None and event["event"] == "stage_total":
+
+            progress.total = event["total"]
+
+        if progress is not None and key is not None:
+
+            if event["event"] == "task_start":
+
+                progress.running[key] = (event["time"], event["pid"])
+
+            elif event["event"] in ("task_done", "task_failed"):
+
+                progress.running.pop(key, None)
+                progress.completed += 1
+                progress.durations.append(event["duration"])
+
+                if event["event"] == "task_failed":
+
+                    progress.failed += 1
+
+            # Throughput and ETA as of this event, for the log to be read alone
+            event = {
+                **event,
+                "completed": progress.completed,
+                "total": progress.total,
+                "rate": round(progress.rate(event["time"]), 2),
+                "eta": progress.eta(event["time"]),
+            }
+
+        if event["event"] == "queue_depths":
+
+            self.queues = {
+                name: (depth, event["running"][name])
+                for name, depth in event["depths"].items()
+            }
+
+        if event["event"] == "stage_end":
+
+            self.stages.pop(stage, None)
+
+            if stage == "pipeline":
+
+                self.queues = {}
+
+        self._write(event)
+
+    def _expected_duration(self, progress: _StageProgress, key: str) -> Optional[float]:
+
+        if key in self.expected_durations:
+
+            return self.expected_durations[key]
+
+        # Otherwise as long as other tasks of the same stage, once there are some
+        if len(progress.durations) >= 5:
+
+            return statistics.median(progress.durations)
+
+        return None
+
+    def _check_slow_tasks(self):
+
+        now: float = time.time()
+
+        stage: str
+        progress: _StageProgress
+        for stage, progress in self.stages.items():
+
+            key: str
+            start: float
+            pid: int
+            for key, (start, pid) in progress.running.items():
+
+                elapsed: float = now - start
+                expected: Optional[float] = self._expected_duration(progress, key)
+
+                if (
+                    key in self.slow
+                    or expected is None
+                    or elapsed < PROGRESS_SLOW_TASK_MIN_DURATION
+                    or elapsed < expected * PROGRESS_SLOW_TASK_FACTOR
+                ):
+
+                    continue
+
+                # Flagged once, a worker stuck on it keeps it in the display
+                self.slow.add(key)
+
+                self._write(
+                    {
+                        "event": "task_slow",
+                        "stage": stage,
+                        "key": key,
+                        "pid": pid,
+                        "time": now,
+                        "elapsed": elapsed,
+                        "expected": expected,
+                    }
+                )
+
+    def _write(self, event: dict):
+
+        if self._log is not None:
+
+            self._log.write(json.dumps(event, separators=(",", ":")) + "\n")
+            self._log.flush()
+
+        elif event["event"] == "task_slow":
+
+            self.stream.write(
+                f"\r\x1b[KSlow {event['key']}: running for "
+                f"{_format_duration(event['elapsed'])}, expected "
+                f"{_format_duration(event['expected'])} (worker {event['pid']})\n"
+            )
+
+        elif event["event"] == "task_failed":
+
+            self.stream.write(f"\r\x1b[KFailed {event['key']}: {event['error']}\n")
+
+    def _display(self):
+
+        now: float = time.time()
+
+        lines: List[str] = []
+
+        stage: str
+        progress: _StageProgress
+        for stage, progress in self.stages.items():
+
+            eta: Optional[float] = progress.eta(now)
+
+            lines.append(
+                f"{stage} {progress.completed}/{progress.total}"
+                f" ({progress.completed * 100 // max(progress.total, 1)}%)"
+                f" {progress.rate(now):.1f}/min"
+                f" ETA {_format_duration(eta) if eta is not None else '?'}"
+                f", {len(progress.running)} running"
+                + (f", {progress.failed} failed" if progress.failed else "")
+                + (
+                    f", {len(self.slow.intersection(progress.running))} slow"
+                    if self.slow.intersection(progress.running)
+                    else ""
+                )
+            )
+
+        if self.queues:
+
+            lines.append(
+                "queues "
+                + ", ".join(
+                    f"{name} {depth} ({running} running)"
+                    for name, (depth, running) in self.queues.items()
+                )
+            )
+
+        self.stream.write("\r\x1b[K" + " | ".join(lines))
+        self.stream.flush()
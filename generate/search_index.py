@@ -0,0 +1,179 @@
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Union
+
+from ps2_analysis.fire_groups.fire_mode import FireMode
+from ps2_analysis.weapons.infantry.infantry_weapon import InfantryWeapon
+from ps2_analysis.weapons.vehicle.vehicle_weapon import VehicleWeapon
+
+from .constants import (
+    SEARCH_DIRECTORY,
+    SEARCH_INDEX_DOCUMENTS_SHARD_SIZE,
+    SEARCH_INDEX_PREFIX_MARKER,
+)
+from .enum_resolvers import faction_resolver, item_category_resolver
+from .staging import atomic_write, output_directory
+
+DOCUMENT_FIELDS: List[str] = [
+    "name",
+    "slug",
+    "item_id",
+    "type",
+    "faction",
+    "category",
+    "damage",
+    "rpm",
+    "magazine",
+]
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def index_keys(text: str) -> Set[str]:
+
+    keys: Set[str] = set()
+
+    token: str
+    for token in tokenize(text):
+
+        # Short prefixes for queries of less than three characters
+        keys.update(
+            f"{SEARCH_INDEX_PREFIX_MARKER}{token[:i]}"
+            for i in range(1, min(len(token), 2) + 1)
+        )
+
+        keys.update(token[i : i + 3] for i in range(len(token) - 2))
+
+    return keys
+
+
+def shard_name(key: str) -> str:
+
+    c: str = key.lstrip(SEARCH_INDEX_PREFIX_MARKER)[0]
+
+    return c if c.isalnum() else "_"
+
+
+def _headline_fire_mode(
+    weapon: Union[InfantryWeapon, VehicleWeapon]
+) -> Optional[FireMode]:
+
+    fm: FireMode
+    for fm in (fm for fg in weapon.fire_groups for fm in fg.fire_modes):
+
+        if fm.direct_damage_profile or fm.indirect_damage_profile:
+
+            return fm
+
+    return None
+
+
+def weapon_document(
+    weapon: Union[InfantryWeapon, VehicleWeapon], weapon_type: str
+) -> list:
+
+    fm: Optional[FireMode] = _headline_fire_mode(weapon)
+
+    return [
+        weapon.name,
+        weapon.slug,
+        weapon.item_id,
+        weapon_type,
+        faction_resolver.get(weapon.faction, weapon.faction.name),
+        item_category_resolver.get(weapon.category, weapon.category.name),
+        fm.damage_per_shot(distance=0.0) if fm else None,
+        fm.fire_timing.shots_per_minute if fm else None,
+        fm.max_consecutive_shots if fm else None,
+    ]
+
+
+def generate_weapons_search_index(
+    infantry_weapons: List[InfantryWeapon], vehicle_weapons: List[VehicleWeapon]
+):
+
+    output_dir: Path = Path(output_directory(), SEARCH_DIRECTORY, "weapons")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    documents: List[list] = []
+    postings: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+
+    weapon: Union[InfantryWeapon, VehicleWeapon]
+    weapon_type: str
+    for weapon, weapon_type in _typed_weapons(infantry_weapons, vehicle_weapons):
+
+        document_id: int = len(documents)
+        document: list = weapon_document(weapon=weapon, weapon_type=weapon_type)
+
+        documents.append(document)
+
+        key: str
+        for key in index_keys(f"{weapon.name} {document[5]}"):
+
+            postings[shard_name(key)][key].append(document_id)
+
+    # Postings, sharded on their first character
+    shard: str
+    shard_postings: Dict[str, List[int]]
+    for shard, shard_postings in postings.items():
+
+        output_path: Path = output_dir.joinpath(f"grams-{shard}.json")
+
+        print(f"Creating {output_path}")
+
+        atomic_write(
+            output_path, json.dumps(shard_postings, separators=(",", ":")).encode()
+        )
+
+    # Documents, sharded on their ID
+    documents_shards: int = 0
+
+    start: int
+    for start in range(0, len(documents), SEARCH_INDEX_DOCUMENTS_SHARD_SIZE):
+
+        output_path = output_dir.joinpath(f"documents-{documents_shards}.json")
+
+        print(f"Creating {output_path}")
+
+        atomic_write(
+            output_path,
+            json.dumps(
+                documents[start : start + SEARCH_INDEX_DOCUMENTS_SHARD_SIZE],
+                separators=(",", ":"),
+            ).encode(),
+        )
+
+        documents_shards += 1
+
+    output_path = output_dir.joinpath("index.json")
+
+    print(f"Creating {output_path}")
+
+    atomic_write(
+        output_path,
+        json.dumps(
+            {
+                "fields": DOCUMENT_FIELDS,
+                "documents_count": len(documents),
+                "documents_shard_size": SEARCH_INDEX_DOCUMENTS_SHARD_SIZE,
+                "documents_shards": documents_shards,
+                "grams_shards": sorted(postings.keys()),
+                "prefix_marker": SEARCH_INDEX_PREFIX_MARKER,
+            },
+            separators=(",", ":"),
+        ).encode(),
+    )
+
+
+def _typed_weapons(
+    infantry_weapons: List[InfantryWeapon], vehicle_weapons: List[VehicleWeapon]
+) -> Iterator:
+
+    yield from ((w, "infantry") for w in infantry_weapons)
+    yield from ((w, "vehicle") for w in vehicle_weapons)
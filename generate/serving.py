@@ -0,0 +1,129 @@
+import gzip
+import mimetypes
+import os
+from typing import Optional
+
+from flask import Request, Response
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+from .caching import LRUCache
+from .constants import IMAGE_SUFFIX_CONTENT_TYPE, SUFFIX_CONTENT_TYPE
+
+GZIP_SUFFIX: str = ".gz"
+GZIP_CACHE_SIZE: int = 64 * 1024 * 1024
+GZIP_COMPRESS_LEVEL: int = 6
+
+_gzip_cache: LRUCache[bytes] = LRUCache(max_size=GZIP_CACHE_SIZE, sizeof=len)
+
+
+def content_type(path: str) -> str:
+
+    suffix: str = os.path.splitext(path)[1]
+
+    if suffix in SUFFIX_CONTENT_TYPE:
+
+        return SUFFIX_CONTENT_TYPE[suffix]
+
+    if suffix in IMAGE_SUFFIX_CONTENT_TYPE:
+
+        return IMAGE_SUFFIX_CONTENT_TYPE[suffix]
+
+    guessed: Optional[str] = mimetypes.guess_type(path)[0]
+
+    return guessed or "application/octet-stream"
+
+
+def accepts_gzip(request: Request) -> bool:
+
+    return request.accept_encodings["gzip"] > 0
+
+
+def conditional_response(
+    request: Request,
+    content: bytes,
+    path: str,
+    etag: str,
+    last_modified: Optional[float] = None,
+    precompressed: Optional[bytes] = None,
+) -> Response:
+
+    compressible: bool = os.path.splitext(path)[1] in SUFFIX_CONTENT_TYPE
+
+    body: bytes = content
+    encoding: Optional[str] = None
+
+    # Same encoding as files uploaded to the bucket
+    if compressible and accepts_gzip(request):
+
+        etag = f"{etag}-gzip"
+        encoding = "gzip"
+
+        if precompressed is not None:
+
+            body = precompressed
+
+        else:
+
+            # Etags only tell versions of the same file apart
+            cached: Optional[bytes] = _gzip_cache.get((path, etag))
+
+            if cached is None:
+
+                cached = gzip.compress(content, compresslevel=GZIP_COMPRESS_LEVEL)
+                _gzip_cache.put((path, etag), cached)
+
+            body = cached
+
+    response: Response = Response(body, mimetype=content_type(path))
+
+    if encoding is not None:
+
+        response.content_encoding = encoding
+
+    if compressible:
+
+        response.vary.add("Accept-Encoding")
+
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+
+    if last_modified is not None:
+
+        response.last_modified = last_modified
+
+    return response.make_conditional(
+        request.environ, accept_ranges=True, complete_length=len(body)
+    )
+
+
+def send_site_file(request: Request, directory: str, path: str) -> Response:
+
+    file_path: Optional[str] = safe_join(directory, path)
+
+    if file_path is None or not os.path.isfile(file_path):
+
+        raise NotFound()
+
+    stat: os.stat_result = os.stat(file_path)
+
+    with open(file_path, "rb") as f:
+        content: bytes = f.read()
+
+    # Use a precompressed sibling when it is at least as recent as its source
+    precompressed: Optional[bytes] = None
+    gz_path: str = f"{file_path}{GZIP_SUFFIX}"
+
+    if os.path.isfile(gz_path) and os.stat(gz_path).st_mtime >= stat.st_mtime:
+
+        with open(gz_path, "rb") as f:
+            precompressed = f.read()
+
+    return conditional_response(
+        request=request,
+        content=content,
+        path=path,
+        etag=f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+        last_modified=stat.st_mtime,
+        precompressed=precompressed,
+    )
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Set
+
+from .constants import (
+    BUILD_JOURNAL_PATH,
+    DATA_FILES_DIRECTORY,
+    SHARD_MANIFEST_FILENAME,
+    SHARDS_DIRECTORY,
+)
+from .journal import BuildJournal, BuildTaskResult, hash_directories
+from .staging import link_file, output_directory
+
+
+class Shard(NamedTuple):
+    shard_index: int
+    shard_count: int
+
+    @property
+    def name(self) -> str:
+
+        return f"{self.shard_index}-of-{self.shard_count}"
+
+    @property
+    def directory(self) -> Path:
+
+        return Path(SHARDS_DIRECTORY, self.name)
+
+    def suffixed(self, path: str) -> str:
+
+        root: str
+        ext: str
+        root, ext = os.path.splitext(path)
+
+        return f"{root}-{self.name}{ext}"
+
+
+def parse_shard(value: str) -> Shard:
+
+    index: str
+    count: str
+    index, _, count = value.partition("/")
+
+    shard: Shard = Shard(shard_index=int(index), shard_count=int(count))
+
+    if not 1 <= shard.shard_index <= shard.shard_count:
+
+        raise ValueError(f"Invalid shard {value}")
+
+    return shard
+
+
+def in_shard(key: str, shard: Shard) -> bool:
+
+    # Stable across processes and machines, unlike the builtin hash
+    digest: int = int(hashlib.sha256(key.encode()).hexdigest()[:16], 16)
+
+    return digest % shard.shard_count == shard.shard_index - 1
+
+
+def write_shard_manifest(shard: Shard, journal: BuildJournal):
+
+    shard_dir: Path = Path(output_directory())
+
+    files: List[str] = sorted(
+        str(p.relative_to(shard_dir))
+        for p in shard_dir.rglob("*")
+        if p.is_file() and p.name != SHARD_MANIFEST_FILENAME
+    )
+
+    files_set: Set[str] = set(files)
+
+    manifest: dict = {
+        "shard": {"index": shard.shard_index, "count": shard.shard_count},
+        "data_hash": hash_directories(DATA_FILES_DIRECTORY),
+        "tasks": [
+            entry
+            for key, entry in sorted(journal.completed.items())
+            if in_shard(key, shard) and files_set.issuperset(entry["outputs"])
+        ],
+        "files": files,
+    }
+
+    output_path: Path = shard_dir.joinpath(SHARD_MANIFEST_FILENAME)
+
+    print(f"Creating {output_path}")
+
+    with open(output_path, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+
+
+def load_shard_manifests(shard_dirs: List[Path]) -> Dict[Path, dict]:
+
+    manifests: Dict[Path, dict] = {}
+
+    shard_dir: Path
+    for shard_dir in shard_dirs:
+
+        with open(shard_dir.joinpath(SHARD_MANIFEST_FILENAME)) as f:
+            manifests[shard_dir] = json.load(f)
+
+    counts: Set[int] = {m["shard"]["count"] for m in manifests.values()}
+    indexes: List[int] = sorted(m["shard"]["index"] for m in manifests.values())
+
+    if len(counts) != 1 or indexes != list(range(1, counts.pop() + 1)):
+
+        raise ValueError(f"Incomplete or inconsistent shards: {indexes}")
+
+    # List pages are rendered from the local data files after the merge
+    if {m["data_hash"] for m in manifests.values()} != {
+        hash_directories(DATA_FILES_DIRECTORY)
+    }:
+
+        raise ValueError("Shards were built from different data files")
+
+    return manifests
+
+
+def merge_shards(shard_dirs: List[Path]):
+
+    manifests: Dict[Path, dict] = load_shard_manifests(shard_dirs)
+
+    output_dir: Path = Path(output_directory())
+
+    merged: Dict[str, Path] = {}
+
+    shard_dir: Path
+    manifest: dict
+    for shard_dir, manifest in manifests.items():
+
+        print(f"Merging {shard_dir}")
+
+        path: str
+        for path in manifest["files"]:
+
+            if path in merged:
+
+                raise ValueError(f"{path} is in both {merged[path]} and {shard_dir}")
+
+            merged[path] = shard_dir
+
+            destination_path: Path = output_dir.joinpath(path)
+            destination_path.parent.mkdir(parents=True, exist_ok=True)
+
+            link_file(shard_dir.joinpath(path), destination_path)
+
+    # Merged pages can then be reused by the next build on this machine
+    journal: BuildJournal = BuildJournal(path=BUILD_JOURNAL_PATH)
+
+    for manifest in manifests.values():
+
+        entry: dict
+        for entry in manifest["tasks"]:
+
+            journal.record(
+                BuildTaskResult(
+                    key=entry["key"],
+                    input_hash=entry["input_hash"],
+                    outputs=entry["outputs"],
+                    error=None,
+                )
+            )
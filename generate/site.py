@@ -2,38 +2,37 @@ import os
 import shutil
 import subprocess
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, List, Optional
 
-import altair
-from ps2_analysis.fire_groups.data_files import (
-    update_data_files as update_fire_groups_data_files,
-)
-from ps2_analysis.weapons.infantry.data_files import (
-    update_data_files as update_infantry_weapons_data_files,
-)
-from ps2_analysis.weapons.vehicle.data_files import (
-    update_data_files as update_vehicle_weapons_data_files,
-)
-
-from .altair_utils import dark_theme
 from .constants import (
     DATA_FILES_DIRECTORY,
     MISC_DIRECTORY,
     SITE_DIRECTORY,
     STATICS_DIRECTORY,
 )
-from .dynamic_pages import generate_dynamic_pages
-from .predefined_pages import generate_predefined_pages
-
-# Altair dark theme
-altair.themes.register("dark", dark_theme)
-altair.themes.enable("dark")
+from .progress import progress_stage, progress_task
+from .staging import atomic_copy, output_directory, remove_previous_builds
+from .workers import WorkerPolicy
 
 
 def clean_site():
 
     print("Cleaning site")
 
+    site_path: Path = Path(SITE_DIRECTORY)
+
+    # Builds are removed once the site no longer links to one, rather than the
+    # published build being emptied in place
+    if site_path.is_symlink():
+
+        print(f"Deleting {site_path}")
+
+        site_path.unlink()
+
+        remove_previous_builds()
+
+        return
+
     for filename in os.listdir(SITE_DIRECTORY):
 
         filepath = os.path.join(SITE_DIRECTORY, filename)
@@ -51,47 +50,99 @@ def clean_site():
 
 def update_all_data_files(census_service_id: str):
 
-    update_fire_groups_data_files(
-        directory=DATA_FILES_DIRECTORY, service_id=census_service_id,
+    # Site cleanup and copies don't need the analysis and rendering stack
+    from ps2_analysis.fire_groups.data_files import (
+        update_data_files as update_fire_groups_data_files,
     )
-    update_infantry_weapons_data_files(
-        directory=DATA_FILES_DIRECTORY, service_id=census_service_id,
+    from ps2_analysis.weapons.infantry.data_files import (
+        update_data_files as update_infantry_weapons_data_files,
     )
-    update_vehicle_weapons_data_files(
-        directory=DATA_FILES_DIRECTORY, service_id=census_service_id,
+    from ps2_analysis.weapons.vehicle.data_files import (
+        update_data_files as update_vehicle_weapons_data_files,
     )
 
+    from .snapshots import (
+        diff_snapshots,
+        list_snapshots,
+        snapshot_data_files,
+        write_data_changes,
+    )
+
+    updates: Dict[str, Callable[..., Any]] = {
+        "fire_groups": update_fire_groups_data_files,
+        "infantry_weapons": update_infantry_weapons_data_files,
+        "vehicle_weapons": update_vehicle_weapons_data_files,
+    }
+
+    with progress_stage("data", total=len(updates)):
+
+        name: str
+        update: Callable[..., Any]
+        for name, update in updates.items():
+
+            with progress_task("data", name):
+
+                update(directory=DATA_FILES_DIRECTORY, service_id=census_service_id)
+
+    # Versioned, for the changes of each game patch to be known
+    previous_snapshots: List[str] = list_snapshots()
+
+    snapshot_id: str = snapshot_data_files()
+
+    if previous_snapshots:
+
+        write_data_changes(diff_snapshots(previous_snapshots[-1], snapshot_id))
+
 
 def generate_css():
 
     subprocess.check_call("npm run css-build", shell=True)
 
 
-def generate_pages(update_simulations: bool = True):
+def generate_pages(
+    update_simulations: bool = True,
+    rebuild: bool = False,
+    worker_policy: Optional[WorkerPolicy] = None,
+):
+
+    from .dynamic_pages import generate_dynamic_pages
+    from .predefined_pages import generate_predefined_pages
 
     generate_predefined_pages(update_simulations=update_simulations)
-    generate_dynamic_pages(update_simulations=update_simulations)
+    generate_dynamic_pages(
+        update_simulations=update_simulations,
+        rebuild=rebuild,
+        worker_policy=worker_policy,
+    )
 
 
 def copy_statics():
 
-    for static_path in Path(STATICS_DIRECTORY).rglob("*"):
+    static_paths: List[Path] = [
+        p for p in Path(STATICS_DIRECTORY).rglob("*") if os.path.isfile(p)
+    ]
 
-        if not os.path.isfile(static_path):
-            continue
+    with progress_stage("statics", total=len(static_paths)):
 
-        static_dirs: List[str]
-        static_filename: str
-        _, *static_dirs, static_filename = static_path.parts
+        static_path: Path
+        for static_path in static_paths:
 
-        destination_dir: Path = Path(SITE_DIRECTORY, STATICS_DIRECTORY, *static_dirs)
-        destination_dir.mkdir(parents=True, exist_ok=True)
+            static_dirs: List[str]
+            static_filename: str
+            _, *static_dirs, static_filename = static_path.parts
 
-        destination_path: Path = destination_dir.joinpath(static_filename)
+            destination_dir: Path = Path(
+                output_directory(), STATICS_DIRECTORY, *static_dirs
+            )
+            destination_dir.mkdir(parents=True, exist_ok=True)
 
-        print(f"Copying {destination_path}")
+            destination_path: Path = destination_dir.joinpath(static_filename)
+
+            print(f"Copying {destination_path}")
+
+            with progress_task("statics", str(static_path)):
 
-        shutil.copyfile(static_path, destination_path)
+                atomic_copy(static_path, destination_path)
 
 
 def copy_misc():
@@ -105,11 +156,11 @@ def copy_misc():
         misc_filename: str
         _, *misc_dirs, misc_filename = misc_path.parts
 
-        destination_dir: Path = Path(SITE_DIRECTORY, *misc_dirs)
+        destination_dir: Path = Path(output_directory(), *misc_dirs)
         destination_dir.mkdir(parents=True, exist_ok=True)
 
         destination_path: Path = destination_dir.joinpath(misc_filename)
 
         print(f"Copying {destination_path}")
 
-        shutil.copyfile(misc_path, destination_path)
+        atomic_copy(misc_path, destination_path)
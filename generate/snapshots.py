@@ -0,0 +1,418 @@
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from ps2_analysis.fire_groups.data_files import (
+    DATA_FILENAME as FIRE_GROUPS_DATA_FILENAME,
+)
+from ps2_analysis.fire_groups.data_files import (
+    load_data_files as load_fire_groups_data_files,
+)
+from ps2_analysis.weapons.infantry.data_files import (
+    DATA_FILENAME as INFANTRY_WEAPONS_DATA_FILENAME,
+)
+from ps2_analysis.weapons.infantry.data_files import (
+    load_data_files as load_infantry_weapons_data_files,
+)
+from ps2_analysis.weapons.vehicle.data_files import (
+    DATA_FILENAME as VEHICLE_WEAPONS_DATA_FILENAME,
+)
+from ps2_analysis.weapons.vehicle.data_files import (
+    load_data_files as load_vehicle_weapons_data_files,
+)
+
+from .constants import DATA_CHANGES_PATH, DATA_FILES_DIRECTORY, DATA_SNAPSHOTS_DIRECTORY
+from .journal import hash_inputs, referenced_fire_group_ids
+from .staging import atomic_write
+
+SNAPSHOT_ID_FORMAT: str = "%Y%m%dT%H%M%SZ"
+
+
+class SnapshotKind(NamedTuple):
+    filename: str
+    id_field: str
+    load: Callable[[str], Iterator[dict]]
+
+
+# Weapon kinds are named after the build task keys, as in infantry/<item_id>
+FIRE_GROUPS: str = "fire_groups"
+WEAPON_KINDS: Tuple[str, ...] = ("infantry", "vehicle")
+
+SNAPSHOT_KINDS: Dict[str, SnapshotKind] = {
+    FIRE_GROUPS: SnapshotKind(
+        FIRE_GROUPS_DATA_FILENAME, "fire_group_id", load_fire_groups_data_files
+    ),
+    "infantry": SnapshotKind(
+        INFANTRY_WEAPONS_DATA_FILENAME, "item_id", load_infantry_weapons_data_files
+    ),
+    "vehicle": SnapshotKind(
+        VEHICLE_WEAPONS_DATA_FILENAME, "item_id", load_vehicle_weapons_data_files
+    ),
+}
+
+# Hashes of a record before and after, None when it did not exist
+RecordChange = Tuple[Optional[str], Optional[str]]
+
+
+class DataDiff(NamedTuple):
+    old: str
+    new: str
+    changes: Dict[str, Dict[str, RecordChange]]
+    # Weapons referencing each changed fire group, before or after the change,
+    # with the hash of their latest record
+    fire_group_weapons: Dict[str, Dict[str, str]]
+
+    def added(self, kind: str) -> List[str]:
+
+        return sorted(k for k, (b, _) in self.changes[kind].items() if b is None)
+
+    def changed(self, kind: str) -> List[str]:
+
+        return sorted(
+            k
+            for k, (b, a) in self.changes[kind].items()
+            if b is not None and a is not None
+        )
+
+    def removed(self, kind: str) -> List[str]:
+
+        return sorted(k for k, (_, a) in self.changes[kind].items() if a is None)
+
+    def affected_weapons(self) -> Set[str]:
+
+        return {
+            f"{kind}/{record_id}"
+            for kind in WEAPON_KINDS
+            for record_id in self.changes[kind]
+        }.union(*(w.keys() for w in self.fire_group_weapons.values()))
+
+    def resimulated_weapons(self) -> List[str]:
+
+        # Only infantry weapons are simulated, removed ones are not built anymore
+        removed: Set[str] = {f"infantry/{i}" for i in self.removed("infantry")}
+
+        return sorted(
+            key
+            for key in self.affected_weapons()
+            if key.startswith("infantry/") and key not in removed
+        )
+
+
+def _record_path(directory: str, record_hash: str) -> Path:
+
+    return Path(directory, "records", record_hash[:2], f"{record_hash}.json")
+
+
+def _read_json(path: Path) -> dict:
+
+    with open(path) as f:
+
+        return json.load(f)
+
+
+def _write_json(path: Path, content: dict):
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    atomic_write(path, json.dumps(content, separators=(",", ":")).encode())
+
+
+def load_record(record_hash: str, directory: str = DATA_SNAPSHOTS_DIRECTORY) -> dict:
+
+    return _read_json(_record_path(directory, record_hash))
+
+
+def list_snapshots(directory: str = DATA_SNAPSHOTS_DIRECTORY) -> List[str]:
+
+    # Identifiers are timestamps, sorting them by name sorts them in time
+    if not Path(directory).exists():
+
+        return []
+
+    return sorted(
+        p.name for p in Path(directory).iterdir() if p.joinpath("changes.json").exists()
+    )
+
+
+def snapshot_data_files(
+    data_files_directory: str = DATA_FILES_DIRECTORY,
+    directory: str = DATA_SNAPSHOTS_DIRECTORY,
+) -> str:
+
+    snapshots: List[str] = list_snapshots(directory)
+    parent: Optional[str] = snapshots[-1] if snapshots else None
+
+    previous_index: dict = (
+        _read_json(Path(directory, parent, "index.json"))
+        if parent is not None
+        else {"records": {}, "fire_group_weapons": {}}
+    )
+
+    records: Dict[str, Dict[str, str]] = {}
+    changes: Dict[str, Dict[str, RecordChange]] = {}
+    fire_group_weapons: Dict[str, Dict[str, str]] = {}
+
+    kind_name: str
+    kind: SnapshotKind
+    for kind_name, kind in SNAPSHOT_KINDS.items():
+
+        kind_records: Dict[str, str] = {}
+
+        record: dict
+        for record in kind.load(data_files_directory):
+
+            record_id: str = str(record[kind.id_field])
+            record_hash: str = hash_inputs(record)
+
+            kind_records[record_id] = record_hash
+
+            # Records are stored once, by content, whatever the snapshots sharing them
+            record_path: Path = _record_path(directory, record_hash)
+
+            if not record_path.exists():
+
+                _write_json(record_path, record)
+
+            if kind_name in WEAPON_KINDS:
+
+                fg_id: int
+                for fg_id in set(referenced_fire_group_ids(record)):
+
+                    fire_group_weapons.setdefault(str(fg_id), {})[
+                        f"{kind_name}/{record_id}"
+                    ] = record_hash
+
+        previous: Dict[str, str] = previous_index["records"].get(kind_name, {})
+
+        changes[kind_name] = {
+            **{
+                i: (previous.get(i), h)
+                for i, h in kind_records.items()
+                if previous.get(i) != h
+            },
+            **{i: (h, None) for i, h in previous.items() if i not in kind_records},
+        }
+
+        records[kind_name] = kind_records
+
+    if parent is not None and not any(changes.values()):
+
+        print(f"No data changes since snapshot {parent}")
+
+        return parent
+
+    snapshot_id: str = datetime.now(timezone.utc).strftime(SNAPSHOT_ID_FORMAT)
+
+    _write_json(
+        Path(directory, snapshot_id, "index.json"),
+        {"records": records, "fire_group_weapons": fire_group_weapons},
+    )
+
+    # Written last, marking the snapshot complete; diffs only read these, sized by
+    # the changes rather than by the data
+    _write_json(
+        Path(directory, snapshot_id, "changes.json"),
+        {
+            "id": snapshot_id,
+            "parent": parent,
+            "changes": changes,
+            "fire_group_weapons": {
+                fg_id: {
+                    **previous_index["fire_group_weapons"].get(fg_id, {}),
+                    **fire_group_weapons.get(fg_id, {}),
+                }
+                for fg_id in changes[FIRE_GROUPS]
+            },
+        },
+    )
+
+    print(
+        f"Created snapshot {snapshot_id}, "
+        f"{sum(len(c) for c in changes.values())} records changed"
+    )
+
+    return snapshot_id
+
+
+def diff_snapshots(
+    old: str, new: str, directory: str = DATA_SNAPSHOTS_DIRECTORY
+) -> DataDiff:
+
+    snapshots: List[str] = list_snapshots(directory)
+
+    start: int = snapshots.index(old)
+    end: int = snapshots.index(new)
+
+    backwards: bool = end < start
+
+    if backwards:
+
+        start, end = end, start
+
+    composed: Dict[str, Dict[str, RecordChange]] = {k: {} for k in SNAPSHOT_KINDS}
+    fire_group_weapons: Dict[str, Dict[str, str]] = {}
+
+    # Changes of the snapshots in between are chained rather than comparing whole
+    # indexes, in time linear in the number of changed records
+    snapshot_id: str
+    for snapshot_id in snapshots[start + 1 : end + 1]:
+
+        delta: dict = _read_json(Path(directory, snapshot_id, "changes.json"))
+
+        kind: str
+        kind_changes: Dict[str, List[Optional[str]]]
+        for kind, kind_changes in delta["changes"].items():
+
+            record_id: str
+            before: Optional[str]
+            after: Optional[str]
+            for record_id, (before, after) in kind_changes.items():
+
+                first: Optional[RecordChange] = composed[kind].get(record_id)
+
+                composed[kind][record_id] = (
+                    first[0] if first is not None else before,
+                    after,
+                )
+
+        fg_id: str
+        weapons: Dict[str, str]
+        for fg_id, weapons in delta["fire_group_weapons"].items():
+
+            fire_group_weapons.setdefault(fg_id, {}).update(weapons)
+
+    # Records changed back in between are left out
+    changes: Dict[str, Dict[str, RecordChange]] = {
+        kind: {
+            record_id: (after, before) if backwards else (before, after)
+            for record_id, (before, after) in kind_changes.items()
+            if before != after
+        }
+        for kind, kind_changes in composed.items()
+    }
+
+    return DataDiff(
+        old=old,
+        new=new,
+        changes=changes,
+        fire_group_weapons={
+            fg_id: weapons
+            for fg_id, weapons in fire_group_weapons.items()
+            if fg_id in changes[FIRE_GROUPS]
+        },
+    )
+
+
+def latest_diff(directory: str = DATA_SNAPSHOTS_DIRECTORY) -> Optional[DataDiff]:
+
+    snapshots: List[str] = list_snapshots(directory)
+
+    if len(snapshots) < 2:
+
+        return None
+
+    return diff_snapshots(snapshots[-2], snapshots[-1], directory=directory)
+
+
+def weapon_changes(
+    diff: DataDiff, directory: str = DATA_SNAPSHOTS_DIRECTORY
+) -> List[dict]:
+
+    changes: List[dict] = []
+
+    key: str
+    for key in sorted(diff.affected_weapons()):
+
+        kind: str
+        record_id: str
+        kind, record_id = key.split("/", 1)
+
+        before: Optional[str]
+        after: Optional[str]
+        before, after = diff.changes[kind].get(record_id, (None, None))
+
+        status: str = (
+            "fire groups changed"
+            if before is None and after is None
+            else "added"
+            if before is None
+            else "removed"
+            if after is None
+            else "changed"
+        )
+
+        fire_groups_weapons: Dict[str, str] = {
+            fg_id: weapons[key]
+            for fg_id, weapons in diff.fire_group_weapons.items()
+            if key in weapons
+        }
+
+        # Names from the records themselves, removed weapons having no page anymore
+        record_hash: str = after or before or next(iter(fire_groups_weapons.values()))
+
+        changes.append(
+            {
+                "key": key,
+                "kind": kind,
+                "item_id": int(record_id),
+                "status": status,
+                "name": load_record(record_hash, directory=directory)["name"]["en"],
+                "fire_group_ids": sorted(int(fg_id) for fg_id in fire_groups_weapons),
+            }
+        )
+
+    return changes
+
+
+def write_data_changes(diff: DataDiff, path: str = DATA_CHANGES_PATH):
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "old": diff.old,
+                "new": diff.new,
+                **{
+                    status: {
+                        kind: getattr(diff, status)(kind) for kind in SNAPSHOT_KINDS
+                    }
+                    for status in ("added", "changed", "removed")
+                },
+                "affected_weapons": sorted(diff.affected_weapons()),
+                "resimulated_weapons": diff.resimulated_weapons(),
+            },
+            f,
+            indent=2,
+        )
+
+    print(
+        f"Created {path}: {len(diff.affected_weapons())} weapons affected, "
+        f"{len(diff.resimulated_weapons())} to simulate again"
+    )
+
+
+def restore_snapshot(
+    snapshot_id: str,
+    data_files_directory: str = DATA_FILES_DIRECTORY,
+    directory: str = DATA_SNAPSHOTS_DIRECTORY,
+):
+
+    index: dict = _read_json(Path(directory, snapshot_id, "index.json"))
+
+    Path(data_files_directory).mkdir(parents=True, exist_ok=True)
+
+    kind_name: str
+    kind: SnapshotKind
+    for kind_name, kind in SNAPSHOT_KINDS.items():
+
+        atomic_write(
+            Path(data_files_directory, kind.filename),
+            "".join(
+                f"{json.dumps(load_record(h, directory=directory))}\n"
+                for h in index["records"][kind_name].values()
+            ).encode(),
+        )
+
+    print(f"Restored snapshot {snapshot_id} into {data_files_directory}")
@@ -0,0 +1,267 @@
+import fcntl
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from multiprocessing import Process
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, TextIO
+
+from .constants import SITE_BUILDS_DIRECTORY, SITE_DIRECTORY
+
+# Inherited by worker processes, so that they write to the same staging directory
+OUTPUT_DIRECTORY_ENVVAR: str = "SITE_OUTPUT_DIRECTORY"
+
+STAGING_SUFFIX: str = ".staging"
+
+# Locks held by this process on the staging directories it builds, released when
+# they are published or the process exits
+_staging_locks: Dict[Path, TextIO] = {}
+
+
+def output_directory() -> str:
+
+    return os.environ.get(OUTPUT_DIRECTORY_ENVVAR, SITE_DIRECTORY)
+
+
+def atomic_write(path: Path, content: bytes):
+
+    # Readers only ever see a complete file, never a partially written one; this
+    # also never writes through a hard link shared with a previous build
+    tmp_path: Path = path.with_name(f".{path.name}.tmp")
+
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+
+    os.replace(tmp_path, path)
+
+
+def atomic_copy(source: Path, destination: Path):
+
+    tmp_path: Path = destination.with_name(f".{destination.name}.tmp")
+
+    shutil.copyfile(source, tmp_path)
+
+    os.replace(tmp_path, destination)
+
+
+def link_file(source: Path, destination: Path):
+
+    tmp_path: Path = destination.with_name(f".{destination.name}.tmp")
+
+    try:
+
+        os.link(source, tmp_path)
+
+    except OSError:
+
+        shutil.copy2(source, tmp_path)
+
+    os.replace(tmp_path, destination)
+
+
+def link_previous_outputs(paths: Iterable[str]) -> bool:
+
+    # Reuse files of the published site in the output directory, when different
+    output_dir: str = output_directory()
+    reuse: bool = os.path.realpath(output_dir) != os.path.realpath(SITE_DIRECTORY)
+
+    path: str
+    for path in paths:
+
+        output_path: Path = Path(output_dir, path)
+
+        if output_path.is_file():
+
+            continue
+
+        previous_path: Path = Path(SITE_DIRECTORY, path)
+
+        if not reuse or not previous_path.is_file():
+
+            return False
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        link_file(previous_path, output_path)
+
+    return True
+
+
+def _staging_lock_path(staging_dir: Path) -> Path:
+
+    # Beside the staging directory, so that it is never published with it
+    return staging_dir.with_name(f".{staging_dir.name}.lock")
+
+
+def _lock_staging_directory(staging_dir: Path) -> bool:
+
+    lock_path: Path = _staging_lock_path(staging_dir)
+    lock_file: TextIO = open(lock_path, "a")
+
+    try:
+
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        # Removed by another process once it found the build abandoned
+        if os.fstat(lock_file.fileno()).st_ino != os.stat(lock_path).st_ino:
+
+            raise FileNotFoundError(lock_path)
+
+    except (BlockingIOError, FileNotFoundError):
+
+        lock_file.close()
+
+        return False
+
+    _staging_locks[staging_dir] = lock_file
+
+    return True
+
+
+def _unlock_staging_directory(staging_dir: Path):
+
+    lock_file: Optional[TextIO] = _staging_locks.pop(staging_dir, None)
+
+    if lock_file is not None:
+
+        _staging_lock_path(staging_dir).unlink(missing_ok=True)
+        lock_file.close()
+
+
+def staging_directory_active(staging_dir: Path) -> bool:
+
+    # Locked by the build writing to it, in this process or another one
+    if staging_dir in _staging_locks:
+
+        return True
+
+    if not _lock_staging_directory(staging_dir):
+
+        return True
+
+    _unlock_staging_directory(staging_dir)
+
+    return False
+
+
+def _staging_directories() -> Iterator[Path]:
+
+    builds_dir: Path = Path(SITE_BUILDS_DIRECTORY)
+
+    if builds_dir.is_dir():
+
+        yield from sorted(
+            p for p in builds_dir.iterdir() if p.name.endswith(STAGING_SUFFIX)
+        )
+
+
+def create_staging_directory(resume: bool = False) -> Path:
+
+    if resume:
+
+        # The latest build not still running elsewhere
+        previous: Path
+        for previous in reversed(list(_staging_directories())):
+
+            if _lock_staging_directory(previous) and previous.is_dir():
+
+                print(f"Resuming {previous}")
+
+                return previous
+
+    build_id: str = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    staging_dir: Path = Path(SITE_BUILDS_DIRECTORY, f"{build_id}{STAGING_SUFFIX}")
+
+    # Locked before it exists, never taken for an abandoned build
+    staging_dir.parent.mkdir(parents=True, exist_ok=True)
+    _lock_staging_directory(staging_dir)
+
+    staging_dir.mkdir()
+
+    print(f"Staging {staging_dir}")
+
+    return staging_dir
+
+
+@contextmanager
+def staged_output(staging_dir: Path) -> Iterator[Path]:
+
+    previous: Optional[str] = os.environ.get(OUTPUT_DIRECTORY_ENVVAR)
+
+    os.environ[OUTPUT_DIRECTORY_ENVVAR] = str(staging_dir)
+
+    try:
+
+        yield staging_dir
+
+    finally:
+
+        if previous is None:
+
+            del os.environ[OUTPUT_DIRECTORY_ENVVAR]
+
+        else:
+
+            os.environ[OUTPUT_DIRECTORY_ENVVAR] = previous
+
+
+def publish_staging_directory(staging_dir: Path) -> Process:
+
+    build_dir: Path = staging_dir.with_name(staging_dir.name[: -len(STAGING_SUFFIX)])
+    os.rename(staging_dir, build_dir)
+
+    # Complete, and left out of the lock inherited by the cleanup process
+    _unlock_staging_directory(staging_dir)
+
+    site_path: Path = Path(SITE_DIRECTORY)
+
+    # A site directory from before staged builds becomes a previous build
+    if site_path.is_dir() and not site_path.is_symlink():
+
+        os.rename(site_path, build_dir.with_name(f"{build_dir.name}.legacy"))
+
+    link_path: Path = site_path.with_name(f".{site_path.name}.tmp")
+
+    if link_path.is_symlink():
+
+        link_path.unlink()
+
+    link_path.symlink_to(os.path.relpath(build_dir, site_path.parent))
+
+    print(f"Publishing {build_dir}")
+
+    # Atomically points the site to the new build
+    os.replace(link_path, site_path)
+
+    cleanup: Process = Process(target=remove_previous_builds, args=(build_dir,))
+    cleanup.start()
+
+    return cleanup
+
+
+def remove_previous_builds(current_build_dir: Optional[Path] = None):
+
+    builds_dir: Path = Path(SITE_BUILDS_DIRECTORY)
+
+    if not builds_dir.is_dir():
+
+        return
+
+    # Previous builds, and staging directories of abandoned ones; those of builds
+    # still running, concurrently or resumed, are left alone
+    path: Path
+    for path in sorted(builds_dir.iterdir()):
+
+        if (
+            path == current_build_dir
+            or path.name.startswith(".")
+            or not path.is_dir()
+            or (path.name.endswith(STAGING_SUFFIX) and staging_directory_active(path))
+        ):
+
+            continue
+
+        print(f"Deleting {path}")
+
+        shutil.rmtree(path, ignore_errors=True)
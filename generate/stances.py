@@ -0,0 +1,280 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from ps2_analysis.fire_groups.cone_of_fire import ConeOfFire
+from ps2_analysis.fire_groups.fire_group import FireGroup
+from ps2_analysis.fire_groups.fire_mode import FireMode
+from ps2_census.enums import PlayerState
+
+from .constants import PRECISION_DECIMALS
+from .enum_resolvers import fire_mode_type_resolver, player_state_resolver
+from .vega_utils import (
+    SIMULATION_STANCE_COLOR,
+    SIMULATION_STANCE_FIELD,
+    SIMULATION_STANCE_OPACITY,
+    SIMULATION_STANCE_SELECTION,
+    X,
+    Y,
+    heatmap_chart_spec,
+    scatter_chart_spec,
+    top_level_spec,
+    with_legend_spec,
+)
+
+
+def _unit_disk_points(rng: np.random.Generator, shape: Tuple[int, ...]) -> np.ndarray:
+
+    # Uniform over the disk, as the analysis library draws cone of fire points
+    radius: np.ndarray = np.sqrt(rng.random(shape))
+    angle: np.ndarray = 2 * math.pi * rng.random(shape)
+
+    return np.stack((radius * np.cos(angle), radius * np.sin(angle)), axis=-1)
+
+
+def _pellets_count(fire_mode: FireMode) -> int:
+
+    if fire_mode.direct_damage_profile is not None:
+
+        return fire_mode.direct_damage_profile.pellets_count
+
+    elif fire_mode.indirect_damage_profile is not None:
+
+        return fire_mode.indirect_damage_profile.pellets_count
+
+    return 1
+
+
+def cone_of_fire_angles(
+    fire_mode: FireMode, cone_of_fire: ConeOfFire, timings: List[Tuple[int, bool]]
+) -> np.ndarray:
+
+    # Same blooms and recoveries as the analysis library, which only depend on
+    # shot timings
+    angles: np.ndarray = np.zeros(len(timings))  # (S,)
+
+    angle: float = cone_of_fire.min_cof_angle()
+    recovery_delay: int = fire_mode.fire_timing.refire_time + cone_of_fire.recovery_delay
+
+    previous_t: int = 0
+
+    i: int
+    t: int
+    for i, (t, _) in enumerate(timings):
+
+        if t > 0:
+
+            delta: int = t - previous_t
+
+            if delta <= recovery_delay:
+
+                angle = cone_of_fire.apply_bloom(current=angle)
+
+            else:
+
+                angle = cone_of_fire.recover(current=angle, time=delta - recovery_delay)
+
+        angles[i] = angle
+        previous_t = t
+
+    return angles
+
+
+def simulate_stances(
+    fire_mode: FireMode,
+    runs: int = 1,
+    control_time: int = 0,
+    auto_burst_length: Optional[int] = None,
+    recoil_compensation: bool = False,
+    rng: Optional[np.random.Generator] = None,
+) -> Dict[PlayerState, np.ndarray]:
+
+    rng = rng or np.random.default_rng()
+
+    states: List[PlayerState] = list(fire_mode.player_state_cone_of_fire)
+    shots: int = fire_mode.max_consecutive_shots
+
+    timings: List[Tuple[int, bool]] = list(
+        fire_mode.generate_real_shot_timings(
+            shots=shots, control_time=control_time, auto_burst_length=auto_burst_length
+        )
+    )
+
+    # Recoil moves the cursor the same way in every stance, so each run is only
+    # simulated once
+    cursors: np.ndarray = np.array(
+        [
+            [
+                cursor
+                for _, cursor, _, _, _, _ in fire_mode.simulate_shots(
+                    shots=shots,
+                    control_time=control_time,
+                    auto_burst_length=auto_burst_length,
+                    recoil_compensation=recoil_compensation,
+                    player_state=states[0],
+                )
+            ]
+            for _ in range(runs)
+        ]
+    )  # (R, S, 2)
+
+    # Random draws are shared too, scaled by each stance's angles; stances are
+    # then compared on the same shots
+    cof_points: np.ndarray = _unit_disk_points(rng, cursors.shape[:2])  # (R, S, 2)
+    pellet_points: np.ndarray = _unit_disk_points(
+        rng, cursors.shape[:2] + (_pellets_count(fire_mode),)
+    )  # (R, S, P, 2)
+
+    pellets: Dict[PlayerState, np.ndarray] = {}
+
+    state: PlayerState
+    for state in states:
+
+        cone_of_fire: ConeOfFire = fire_mode.player_state_cone_of_fire[state]
+
+        angles: np.ndarray = cone_of_fire_angles(fire_mode, cone_of_fire, timings)
+
+        shots_points: np.ndarray = (
+            cursors + cof_points * angles[np.newaxis, :, np.newaxis]
+        )  # (R, S, 2)
+
+        pellets[state] = (
+            shots_points[:, :, np.newaxis, :]
+            + pellet_points * cone_of_fire.pellet_spread
+        ).reshape(-1, 2)
+
+    return pellets
+
+
+def _chart_size(
+    x_domain: Tuple[float, float],
+    y_domain: Tuple[float, float],
+    width: Optional[int],
+    height: Optional[int],
+) -> Tuple[int, int]:
+
+    x_extent: float = x_domain[1] - x_domain[0]
+    y_extent: float = y_domain[1] - y_domain[0]
+
+    if height:
+
+        return (
+            int(math.ceil(x_extent * height / y_extent)) if y_extent else height,
+            height,
+        )
+
+    assert width
+
+    return (width, int(math.ceil(y_extent * width / x_extent)) if x_extent else width)
+
+
+def generate_stances_simulation(
+    fire_group: FireGroup,
+    runs: int = 1,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+) -> Tuple[Optional[dict], Dict[int, dict]]:
+
+    assert (width or height) and not (width and height)
+
+    fire_modes_charts: Dict[int, dict] = {}
+    spreads: List[dict] = []
+
+    fire_mode: FireMode
+    for fire_mode in fire_group.fire_modes:
+
+        if (
+            fire_mode.max_consecutive_shots <= 0
+            or not fire_mode.player_state_cone_of_fire
+        ):
+
+            continue
+
+        firemode: str = f"{fire_mode_type_resolver[fire_mode.fire_mode_type]} {'ADS' if fire_mode.is_ads else 'Hipfire'} ({fire_mode.fire_mode_id})"
+
+        datapoints: List[dict] = []
+
+        state: PlayerState
+        pellets: np.ndarray
+        for state, pellets in simulate_stances(fire_mode=fire_mode, runs=runs).items():
+
+            stance: str = player_state_resolver[state]
+
+            rounded: np.ndarray = np.round(pellets, PRECISION_DECIMALS)
+
+            datapoints.extend(
+                {SIMULATION_STANCE_FIELD: stance, X: x, Y: y}
+                for x, y in rounded.tolist()
+            )
+
+            spreads.append(
+                {
+                    "firemode": firemode,
+                    SIMULATION_STANCE_FIELD: stance,
+                    "median_distance": round(
+                        float(np.median(np.hypot(pellets[:, 0], pellets[:, 1]))),
+                        PRECISION_DECIMALS,
+                    ),
+                }
+            )
+
+        x_domain: Tuple[float, float] = (
+            min(d[X] for d in datapoints),
+            max(d[X] for d in datapoints),
+        )
+        y_domain: Tuple[float, float] = (
+            min(d[Y] for d in datapoints),
+            max(d[Y] for d in datapoints),
+        )
+
+        chart_width: int
+        chart_height: int
+        chart_width, chart_height = _chart_size(x_domain, y_domain, width, height)
+
+        fire_modes_charts[fire_mode.fire_mode_id] = top_level_spec(
+            with_legend_spec(
+                chart=scatter_chart_spec(
+                    x_domain=x_domain,
+                    y_domain=y_domain,
+                    color=SIMULATION_STANCE_COLOR,
+                    opacity=SIMULATION_STANCE_OPACITY,
+                    width=chart_width,
+                    height=chart_height,
+                    title=f"{runs} magdumps per stance, {len(datapoints)} pellets",
+                    tooltip=[
+                        {"field": SIMULATION_STANCE_FIELD, "type": "nominal"},
+                        {"field": X, "type": "quantitative"},
+                        {"field": Y, "type": "quantitative"},
+                    ],
+                ),
+                values=datapoints,
+                field=SIMULATION_STANCE_FIELD,
+                color=SIMULATION_STANCE_COLOR,
+                selection=SIMULATION_STANCE_SELECTION,
+            )
+        )
+
+    if not fire_modes_charts:
+
+        return (None, {})
+
+    # Fire modes against each other, on how far pellets land from the aim point
+    fg_chart: dict = top_level_spec(
+        heatmap_chart_spec(
+            values=spreads,
+            x_field=SIMULATION_STANCE_FIELD,
+            x_title="stance",
+            y_field="firemode",
+            y_title="fire mode",
+            color_field="median_distance",
+            color_title="median distance (degrees)",
+            tooltip=[
+                {"field": "firemode", "type": "nominal"},
+                {"field": SIMULATION_STANCE_FIELD, "type": "nominal"},
+                {"field": "median_distance", "type": "quantitative"},
+            ],
+            title=f"{runs} magdumps per stance, median pellet distance to the aim point",
+        )
+    )
+
+    return (fg_chart, fire_modes_charts)
@@ -0,0 +1,227 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .constants import (
+    SITE_DIRECTORY,
+    STREAMING_UPLOAD_MAX_PENDING,
+    STREAMING_UPLOAD_THREADS,
+)
+from .progress import progress_task, report_progress
+from .staging import output_directory
+
+# Set while a streaming upload runs, outputs being streamed from the build process
+_uploader: Optional["StreamingUploader"] = None
+
+# Size and modification time, a file changed since its upload being uploaded again
+FileStat = Tuple[int, int]
+
+
+def _file_stat(path: Path) -> FileStat:
+
+    stat: os.stat_result = os.stat(path)
+
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def stream_outputs(paths: Iterable[str]):
+
+    # Nothing is streamed when no upload runs along the build
+    if _uploader is None:
+
+        return
+
+    directory: Path = Path(output_directory())
+
+    path: str
+    for path in paths:
+
+        _uploader.submit(directory, path)
+
+
+class StreamingUploader:
+    def __init__(
+        self,
+        bucket_name: str,
+        prefix: str = "",
+        threads: int = STREAMING_UPLOAD_THREADS,
+        max_pending: int = STREAMING_UPLOAD_MAX_PENDING,
+    ):
+
+        self.bucket_name: str = bucket_name
+        self.prefix: str = prefix
+        self.threads: int = threads
+
+        # Submitting blocks once this many uploads are pending, holding the build
+        # back rather than queuing the whole site in memory
+        self._slots: threading.BoundedSemaphore = threading.BoundedSemaphore(
+            max_pending
+        )
+
+        self.uploaded: Dict[str, FileStat] = {}
+        self.failed: Dict[str, str] = {}
+        self.submitted: int = 0
+
+        self._lock: threading.Lock = threading.Lock()
+        self._local: threading.local = threading.local()
+        self._pending: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+
+        global _uploader
+
+        print(f"Streaming uploads to {self.bucket_name} bucket")
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix="upload"
+        )
+
+        # Its total grows as outputs are streamed
+        report_progress("stage_start", "upload", total=0)
+
+        _uploader = self
+
+    def stop(self):
+
+        global _uploader
+
+        if self._executor is None:
+
+            return
+
+        _uploader = None
+
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+        report_progress("stage_end", "upload")
+
+    def __enter__(self) -> "StreamingUploader":
+
+        self.start()
+
+        return self
+
+    def __exit__(self, *_):
+
+        self.stop()
+
+    def submit(self, directory: Path, path: str):
+
+        assert self._executor is not None
+
+        if not path.startswith(self.prefix):
+
+            return
+
+        try:
+
+            stat: FileStat = _file_stat(directory.joinpath(path))
+
+        except FileNotFoundError:
+
+            return
+
+        with self._lock:
+
+            # Unchanged since uploaded, or already being uploaded; later changes
+            # are caught by the consistency pass
+            if self.uploaded.get(path) == stat or path in self._pending:
+
+                return
+
+        self._slots.acquire()
+
+        with self._lock:
+
+            self.submitted += 1
+
+            report_progress("stage_total", "upload", total=self.submitted)
+
+            future: Future = self._executor.submit(self._upload, directory, path, stat)
+            self._pending[path] = future
+
+        future.add_done_callback(lambda _: self._done(path))
+
+    def _done(self, path: str):
+
+        with self._lock:
+
+            self._pending.pop(path, None)
+
+        self._slots.release()
+
+    def _bucket(self) -> Any:
+
+        # Heavy, imported once uploads start; a client per thread, clients not
+        # being shared between threads
+        from .bucket import get_bucket
+
+        if not hasattr(self._local, "bucket"):
+
+            self._local.bucket = get_bucket(self.bucket_name)
+
+        return self._local.bucket
+
+    def _upload(self, directory: Path, path: str, stat: FileStat):
+
+        from .bucket import _upload_blob
+
+        try:
+
+            with progress_task("upload", path):
+
+                _upload_blob(self._bucket().blob(path), directory.joinpath(path))
+
+        except Exception as e:
+
+            with self._lock:
+
+                self.failed[path] = repr(e)
+
+            return
+
+        with self._lock:
+
+            self.uploaded[path] = stat
+            self.failed.pop(path, None)
+
+    def drain(self):
+
+        with self._lock:
+
+            pending: List[Future] = list(self._pending.values())
+
+        future: Future
+        for future in pending:
+
+            future.result()
+
+    def finish(self, directory: str = SITE_DIRECTORY):
+
+        # Consistency pass, uploading whatever was not streamed, changed since or
+        # failed; the same files moved by publishing are left as they are
+        print(f"Checking uploads of {directory}")
+
+        site_dir: Path = Path(directory)
+
+        file_path: Path
+        for file_path in sorted(site_dir.rglob("*")):
+
+            if file_path.is_file():
+
+                self.submit(site_dir, str(file_path.relative_to(site_dir)))
+
+        self.drain()
+
+        print(f"Uploaded {len(self.uploaded)} files in {self.submitted} uploads")
+
+        if self.failed:
+
+            raise RuntimeError(
+                f"{len(self.failed)} uploads failed: "
+                + ", ".join(f"{p} ({e})" for p, e in sorted(self.failed.items()))
+            )
@@ -0,0 +1,393 @@
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from ps2_analysis.fire_groups.ammo import Ammo
+from ps2_analysis.fire_groups.fire_group import FireGroup
+from ps2_analysis.fire_groups.fire_mode import FireMode
+from ps2_analysis.fire_groups.fire_timing import FireTiming
+from ps2_analysis.fire_groups.heat import Heat
+
+from .constants import PRECISION_DECIMALS
+from .enum_resolvers import fire_mode_type_resolver
+from .vega_utils import (
+    SIMULATION_FIRE_MODE_COLOR,
+    SIMULATION_FIRE_MODE_FIELD,
+    SIMULATION_FIRE_MODE_OPACITY,
+    SIMULATION_FIRE_MODE_SELECTION,
+    X,
+    Y,
+    line_chart_spec,
+    top_level_spec,
+    with_legend_spec,
+)
+
+# Trigger held from a cold weapon with a full magazine, in milliseconds
+SUSTAINED_FIRE_DURATION: int = 30_000
+
+
+class SustainedFire(NamedTuple):
+    fire_modes: List[FireMode]
+    # Whether each row stops firing before overheating rather than holding the
+    # trigger, heat fire modes only
+    managed: np.ndarray  # (R,)
+    fire_mode_index: np.ndarray  # (R,)
+    damage_per_shot: np.ndarray  # (R,)
+    # Shots fired within the duration, NaN once a row stopped
+    shot_times: np.ndarray  # (R, S)
+    # Time of the first overheating shot and of the shot emptying the first
+    # magazine, NaN when it does not happen within the duration
+    overheat_time: np.ndarray  # (R,)
+    empty_time: np.ndarray  # (R,)
+    duration: int
+
+    def label(self, row: int) -> str:
+
+        fire_mode: FireMode = self.fire_modes[self.fire_mode_index[row]]
+
+        return (
+            f"{fire_mode_type_resolver[fire_mode.fire_mode_type]} "
+            f"{'ADS' if fire_mode.is_ads else 'Hipfire'} ({fire_mode.fire_mode_id})"
+            + (" managed" if self.managed[row] else "")
+        )
+
+    def cumulative_damage(self) -> np.ndarray:
+
+        return np.cumsum(
+            np.where(np.isnan(self.shot_times), 0, self.damage_per_shot[:, None]),
+            axis=1,
+        )  # (R, S)
+
+
+def raw_damage_per_shot(fire_mode: FireMode) -> int:
+
+    # Before any resistance, vehicle weapons damaging targets of all kinds
+    return sum(
+        profile.max_damage * profile.pellets_count
+        for profile in (
+            fire_mode.direct_damage_profile,
+            fire_mode.indirect_damage_profile,
+        )
+        if profile is not None
+    )
+
+
+def simulate_sustained_fire(
+    fire_modes: List[FireMode], duration: int = SUSTAINED_FIRE_DURATION
+) -> SustainedFire:
+
+    rows: List[Tuple[int, bool]] = []
+
+    i: int
+    fire_mode: FireMode
+    for i, fire_mode in enumerate(fire_modes):
+
+        rows.append((i, False))
+
+        if (
+            fire_mode.heat
+            and fire_mode.heat.recovery_rate > 0
+            and fire_mode.heat.shots_before_overheat > 0
+        ):
+
+            rows.append((i, True))
+
+    fire_mode_index: np.ndarray = np.array([i for i, _ in rows], dtype=int)
+    managed: np.ndarray = np.array([m for _, m in rows], dtype=bool)
+
+    def parameter(values: List[float]) -> np.ndarray:
+
+        return np.array(values, dtype=float)[fire_mode_index]
+
+    timings: List[FireTiming] = [fm.fire_timing for fm in fire_modes]
+    heats: List[Optional[Heat]] = [fm.heat for fm in fire_modes]
+    ammos: List[Optional[Ammo]] = [fm.ammo for fm in fire_modes]
+
+    damage_per_shot: np.ndarray = parameter(
+        [raw_damage_per_shot(fm) for fm in fire_modes]
+    )
+
+    # Intervals between shots of a streak of continuous fire
+    first_delay: np.ndarray = parameter([ft.total_delay for ft in timings])
+    between_bursts: np.ndarray = parameter(
+        [
+            ft.refire_time
+            + (ft.chamber_time or 0)
+            + (
+                ft.total_delay
+                if not ft.is_automatic or (ft.burst_length or 0) > 1
+                else 0
+            )
+            for ft in timings
+        ]
+    )
+    burst_length: np.ndarray = parameter(
+        [
+            ft.burst_length if ft.burst_length and ft.burst_refire_time else 1
+            for ft in timings
+        ]
+    )
+    burst_refire: np.ndarray = parameter([ft.burst_refire_time or 0 for ft in timings])
+    spool_up_time: np.ndarray = parameter(
+        [ft.spool_up_time if ft.spool_up_initial_refire_time else 0 for ft in timings]
+    )
+    spool_up_refire: np.ndarray = parameter(
+        [ft.spool_up_initial_refire_time or 0 for ft in timings]
+    )
+
+    # Heat, recovery rates per millisecond and -1 lockouts never recovering
+    has_heat: np.ndarray = parameter([h is not None for h in heats]).astype(bool)
+    heat_capacity: np.ndarray = parameter([h.total_capacity if h else 0 for h in heats])
+    heat_per_shot: np.ndarray = parameter([h.heat_per_shot if h else 0 for h in heats])
+    recovery_delay: np.ndarray = parameter(
+        [h.recovery_delay if h else 0 for h in heats]
+    )
+    recovery_rate: np.ndarray = parameter(
+        [h.recovery_rate / 1000 if h else 0 for h in heats]
+    )
+    overheat_lockout: np.ndarray = parameter(
+        [h.overheat_recovery_time if h else 0 for h in heats]
+    )
+
+    # Magazines, infinite when shots use no ammo
+    shots_per_clip: np.ndarray = parameter(
+        [a.shots_per_clip if a and a.shots_per_clip >= 0 else math.inf for a in ammos]
+    )
+    reserve: np.ndarray = parameter(
+        [
+            a.total_capacity // a.ammo_per_shot
+            if a and a.ammo_per_shot > 0 and a.total_capacity > 0
+            else math.inf
+            for a in ammos
+        ]
+    )
+    reload_time: np.ndarray = parameter([a.long_reload_time if a else 0 for a in ammos])
+
+    t: np.ndarray = first_delay.copy()
+    last: np.ndarray = np.zeros(len(rows))
+    streak_start: np.ndarray = t.copy()
+    burst_shots: np.ndarray = np.zeros(len(rows))
+    heat: np.ndarray = np.zeros(len(rows))
+    clip: np.ndarray = shots_per_clip.copy()
+
+    overheat_time: np.ndarray = np.full(len(rows), np.nan)
+    empty_time: np.ndarray = np.full(len(rows), np.nan)
+
+    active: np.ndarray = (damage_per_shot > 0) & (clip > 0)
+
+    shot_times: List[np.ndarray] = []
+
+    # One event per row and iteration, the next shot of every row at once
+    while True:
+
+        active &= t <= duration
+
+        if not active.any():
+
+            break
+
+        shot_times.append(np.where(active, t, np.nan))
+
+        # Heat recovered since the previous shot, then added by this one
+        heat = np.maximum(
+            heat - np.maximum(t - last - recovery_delay, 0) * recovery_rate, 0
+        )
+        heat += np.where(active, heat_per_shot, 0)
+
+        clip -= active
+        burst_shots += active
+
+        in_burst: np.ndarray = (burst_length > 1) & (burst_shots % burst_length != 0)
+        spooling: np.ndarray = (spool_up_time > 0) & (t - streak_start < spool_up_time)
+
+        next_t: np.ndarray = t + np.maximum(
+            np.where(
+                spooling,
+                spool_up_refire,
+                np.where(in_burst, burst_refire, between_bursts),
+            ),
+            1,
+        )
+
+        # Holding the trigger past the heat capacity locks the weapon out
+        overheated: np.ndarray = (active & has_heat & ~managed & (heat > heat_capacity))
+        next_t = np.where(overheated, t + overheat_lockout, next_t)
+        heat = np.where(overheated, 0, heat)
+        overheat_time = np.where(overheated & np.isnan(overheat_time), t, overheat_time)
+
+        # Managed fire stops before the shot overheating the weapon and waits for
+        # the heat to be recovered, as the analysis library reloads heat weapons
+        cooling: np.ndarray = (
+            active & managed & (heat + heat_per_shot > heat_capacity)
+        )
+        cooled_t: np.ndarray = t + recovery_delay + np.divide(
+            heat, recovery_rate, out=np.zeros(len(rows)), where=cooling,
+        )
+        next_t = np.where(cooling, np.maximum(next_t, cooled_t), next_t)
+
+        empty: np.ndarray = active & (clip <= 0)
+        next_t = np.where(empty, np.maximum(next_t, t + reload_time), next_t)
+        clip = np.where(empty, np.minimum(shots_per_clip, reserve), clip)
+        reserve = np.subtract(
+            reserve, clip, out=reserve.copy(), where=empty & np.isfinite(reserve)
+        )
+        empty_time = np.where(empty & np.isnan(empty_time), t, empty_time)
+
+        # Spool up and bursts start over after any pause
+        interrupted: np.ndarray = overheated | cooling | empty
+        streak_start = np.where(interrupted, next_t, streak_start)
+        burst_shots = np.where(interrupted, 0, burst_shots)
+
+        last = np.where(active, t, last)
+        t = np.where(active, next_t, t)
+
+        active &= ~(overheated & (overheat_lockout < 0))
+        active &= ~(empty & ((reload_time < 0) | (clip <= 0)))
+
+    return SustainedFire(
+        fire_modes=fire_modes,
+        managed=managed,
+        fire_mode_index=fire_mode_index,
+        damage_per_shot=damage_per_shot,
+        shot_times=(
+            np.stack(shot_times, axis=1) if shot_times else np.empty((len(rows), 0))
+        ),
+        overheat_time=overheat_time,
+        empty_time=empty_time,
+        duration=duration,
+    )
+
+
+def sustained_fire_table(sustained: SustainedFire) -> List[dict]:
+
+    cumulative_damage: np.ndarray = sustained.cumulative_damage()
+
+    table: List[dict] = []
+
+    row: int
+    for row in range(len(sustained.managed)):
+
+        fire_mode: FireMode = sustained.fire_modes[sustained.fire_mode_index[row]]
+        times: np.ndarray = sustained.shot_times[row]
+
+        shots: int = int(np.count_nonzero(~np.isnan(times)))
+        total_damage: float = (
+            float(cumulative_damage[row, -1]) if cumulative_damage.shape[1] else 0.0
+        )
+
+        overheat_time: float = float(sustained.overheat_time[row])
+        empty_time: float = float(sustained.empty_time[row])
+
+        table.append(
+            {
+                "firemode": sustained.label(row),
+                "managed": bool(sustained.managed[row]),
+                "shots_to_overheat": fire_mode.heat.shots_to_overheat
+                if fire_mode.heat and not sustained.managed[row]
+                else None,
+                "time_to_overheat": None
+                if math.isnan(overheat_time)
+                else int(overheat_time),
+                "overheat_lockout": fire_mode.heat.overheat_recovery_time
+                if fire_mode.heat and not sustained.managed[row]
+                else None,
+                "time_to_empty": None if math.isnan(empty_time) else int(empty_time),
+                "shots": shots,
+                "damage": int(total_damage),
+                "damage_per_second": round(
+                    total_damage * 1000 / sustained.duration, PRECISION_DECIMALS
+                ),
+            }
+        )
+
+    return table
+
+
+def set_sustained_fire_tables(fire_groups: Iterable[FireGroup]):
+
+    # Cheap enough to be simulated again for every page, charts being cached;
+    # set once the fire groups were hashed for their simulations
+    fg: FireGroup
+    for fg in fire_groups:
+
+        fg.sustained_fire = sustained_fire_table(  # type: ignore
+            simulate_sustained_fire(fg.fire_modes)
+        )
+
+
+def generate_sustained_simulation(
+    fire_group: FireGroup, width: int = 800,
+) -> Tuple[Optional[dict], Dict[int, dict]]:
+
+    sustained: SustainedFire = simulate_sustained_fire(fire_group.fire_modes)
+
+    cumulative_damage: np.ndarray = sustained.cumulative_damage()
+
+    datapoints: List[dict] = []
+
+    row: int
+    for row in range(len(sustained.managed)):
+
+        firemode: str = sustained.label(row)
+        times: np.ndarray = sustained.shot_times[row]
+        fired: np.ndarray = ~np.isnan(times)
+
+        if not fired.any():
+
+            continue
+
+        # Steps from the trigger pull to the end of the duration
+        datapoints.append({SIMULATION_FIRE_MODE_FIELD: firemode, X: 0, Y: 0})
+
+        t: float
+        damage: float
+        for t, damage in zip(
+            times[fired].tolist(), cumulative_damage[row][fired].tolist()
+        ):
+
+            datapoints.append(
+                {
+                    SIMULATION_FIRE_MODE_FIELD: firemode,
+                    X: round(t / 1000, PRECISION_DECIMALS),
+                    Y: int(damage),
+                }
+            )
+
+        datapoints.append(
+            {
+                SIMULATION_FIRE_MODE_FIELD: firemode,
+                X: sustained.duration / 1000,
+                Y: datapoints[-1][Y],
+            }
+        )
+
+    if not datapoints:
+
+        return (None, {})
+
+    fg_chart: dict = top_level_spec(
+        with_legend_spec(
+            chart=line_chart_spec(
+                x_domain=(0, sustained.duration / 1000),
+                y_domain=(0, max(d[Y] for d in datapoints)),
+                x_title="time (seconds)",
+                y_title="damage",
+                color=SIMULATION_FIRE_MODE_COLOR,
+                opacity=SIMULATION_FIRE_MODE_OPACITY,
+                tooltip=[
+                    {"field": SIMULATION_FIRE_MODE_FIELD, "type": "nominal"},
+                    {"field": X, "type": "quantitative"},
+                    {"field": Y, "type": "quantitative"},
+                ],
+                title=f"Trigger held for {sustained.duration // 1000}s from a cold weapon, raw damage before resistances",
+                width=width,
+                interpolate="step-after",
+            ),
+            values=datapoints,
+            field=SIMULATION_FIRE_MODE_FIELD,
+            color=SIMULATION_FIRE_MODE_COLOR,
+            selection=SIMULATION_FIRE_MODE_SELECTION,
+        )
+    )
+
+    return (fg_chart, {})
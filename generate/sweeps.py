@@ -0,0 +1,266 @@
+import itertools
+import json
+import math
+from dataclasses import fields
+from functools import lru_cache, partial
+from importlib.metadata import version
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from ps2_analysis.fire_groups.fire_group import FireGroup
+from ps2_analysis.fire_groups.fire_mode import FireMode
+from ps2_analysis.weapons.infantry.generate import parse_infantry_weapon_data
+from ps2_census.enums import PlayerState
+
+from .artifacts import cached_artifact
+from .constants import PRECISION_DECIMALS
+from .enum_resolvers import enum_name, fire_mode_type_resolver
+from .fragments import content_hash
+from .journal import hash_files, hash_inputs
+from .vega_utils import heatmap_chart_spec, top_level_spec
+
+# Grid of the magdump simulation parameters, control times in milliseconds
+SWEEP_CONTROL_TIMES: Tuple[int, ...] = (0, 100, 250, 500)
+# Automatic fire modes only, None being full auto
+SWEEP_AUTO_BURST_LENGTHS: Tuple[Optional[int], ...] = (None, 3, 5)
+SWEEP_RECOIL_COMPENSATIONS: Tuple[bool, ...] = (False, True)
+SWEEP_PLAYER_STATES: Tuple[PlayerState, ...] = (
+    PlayerState.STANDING,
+    PlayerState.CROUCHING,
+)
+
+SWEEP_RUNS: int = 20
+
+# Targets centered on the aim point, diameters in meters
+SWEEP_TARGET_SIZES: Dict[str, float] = {"head": 0.25, "torso": 0.6}
+SWEEP_RANGES: Tuple[int, ...] = (10, 25, 50)
+
+
+class SweepPoint(NamedTuple):
+    control_time: int
+    auto_burst_length: Optional[int]
+    recoil_compensation: bool
+    player_state: PlayerState
+
+    @property
+    def label(self) -> str:
+
+        return " ".join(
+            [f"{self.control_time}ms"]
+            + ([f"burst {self.auto_burst_length}"] if self.auto_burst_length else [])
+            + (["compensated"] if self.recoil_compensation else [])
+            + [enum_name(self.player_state).lower()]
+        )
+
+
+def sweep_points(fire_mode: FireMode) -> List[SweepPoint]:
+
+    if fire_mode.max_consecutive_shots <= 0 or not fire_mode.player_state_cone_of_fire:
+
+        return []
+
+    auto_burst_lengths: Tuple[Optional[int], ...] = (
+        SWEEP_AUTO_BURST_LENGTHS if fire_mode.fire_timing.is_automatic else (None,)
+    )
+
+    return [
+        SweepPoint(*p)
+        for p in itertools.product(
+            SWEEP_CONTROL_TIMES,
+            auto_burst_lengths,
+            SWEEP_RECOIL_COMPENSATIONS,
+            (
+                s
+                for s in SWEEP_PLAYER_STATES
+                if s in fire_mode.player_state_cone_of_fire
+            ),
+        )
+    ]
+
+
+@lru_cache(maxsize=None)
+def sweeps_version() -> str:
+
+    return hash_inputs(hash_files(__file__), version("ps2-analysis"))
+
+
+def fire_mode_input_hash(fire_mode: FireMode) -> str:
+
+    # Fields only, simulation paths being set on fire modes as pages are built
+    return content_hash({f.name: getattr(fire_mode, f.name) for f in fields(fire_mode)})
+
+
+def sweep_point_key(fire_mode_hash: str, point: SweepPoint) -> str:
+
+    return hash_inputs(
+        "sweep",
+        fire_mode_hash,
+        point,
+        SWEEP_RUNS,
+        SWEEP_TARGET_SIZES,
+        SWEEP_RANGES,
+        sweeps_version(),
+    )
+
+
+def evaluate_sweep_point(fire_mode: FireMode, point: SweepPoint) -> dict:
+
+    pellets: List[Tuple[float, float]] = []
+
+    for _ in range(SWEEP_RUNS):
+
+        pellets_coors: List[Tuple[float, float]]
+        for _, _, pellets_coors, _, _, _ in fire_mode.simulate_shots(
+            shots=fire_mode.max_consecutive_shots,
+            control_time=point.control_time,
+            auto_burst_length=point.auto_burst_length,
+            recoil_compensation=point.recoil_compensation,
+            player_state=point.player_state,
+        ):
+
+            pellets.extend(pellets_coors)
+
+    # Angles in degrees, from the aim point at the origin
+    coors: np.ndarray = np.array(pellets, dtype=float).reshape(-1, 2)  # (P, 2)
+    centroid: np.ndarray = coors.mean(axis=0)  # (2,)
+    distances: np.ndarray = np.hypot(coors[:, 0], coors[:, 1])  # (P,)
+
+    hit_probability: Dict[str, float] = {}
+
+    target: str
+    size: float
+    for target, size in SWEEP_TARGET_SIZES.items():
+
+        r: int
+        for r in SWEEP_RANGES:
+
+            radius: float = math.degrees(math.atan(size / 2 / r))
+
+            hit_probability[f"{target} {r}m"] = round(
+                float((distances <= radius).mean()), PRECISION_DECIMALS
+            )
+
+    return {
+        "spread_radius": round(
+            float(np.hypot(*(coors - centroid).T).mean()), PRECISION_DECIMALS
+        ),
+        "centroid_drift": round(float(np.hypot(*centroid)), PRECISION_DECIMALS),
+        "hit_probability": hit_probability,
+    }
+
+
+def _encoded_sweep_point(fire_mode: FireMode, point: SweepPoint) -> bytes:
+
+    return json.dumps(evaluate_sweep_point(fire_mode, point)).encode()
+
+
+def fire_mode_sweep(
+    fire_mode: FireMode, fire_mode_hash: Optional[str] = None
+) -> List[Tuple[SweepPoint, dict]]:
+
+    fire_mode_hash = fire_mode_hash or fire_mode_input_hash(fire_mode)
+
+    # Usually precomputed in parallel by the sweeps stage of the build
+    return [
+        (
+            point,
+            json.loads(
+                cached_artifact(
+                    key=sweep_point_key(fire_mode_hash, point),
+                    produce=partial(_encoded_sweep_point, fire_mode, point),
+                )
+            ),
+        )
+        for point in sweep_points(fire_mode)
+    ]
+
+
+def generate_sweep_simulation(
+    fire_group: FireGroup,
+) -> Tuple[Optional[dict], Dict[int, dict]]:
+
+    datapoints: List[dict] = []
+
+    fire_mode: FireMode
+    for fire_mode in fire_group.fire_modes:
+
+        firemode: str = f"{fire_mode_type_resolver[fire_mode.fire_mode_type]} {'ADS' if fire_mode.is_ads else 'Hipfire'} ({fire_mode.fire_mode_id})"
+
+        point: SweepPoint
+        metrics: dict
+        for point, metrics in fire_mode_sweep(fire_mode):
+
+            target: str
+            probability: float
+            for target, probability in metrics["hit_probability"].items():
+
+                datapoints.append(
+                    {
+                        "firemode": firemode,
+                        "parameters": point.label,
+                        "row": f"{firemode} {target}",
+                        "target": target,
+                        "hit_probability": probability,
+                        "spread_radius": metrics["spread_radius"],
+                        "centroid_drift": metrics["centroid_drift"],
+                    }
+                )
+
+    if not datapoints:
+
+        return (None, {})
+
+    # One matrix for the whole fire group, rather than a chart per grid point
+    fg_chart: dict = top_level_spec(
+        heatmap_chart_spec(
+            values=datapoints,
+            x_field="parameters",
+            x_title="control time, burst length, recoil compensation, stance",
+            y_field="row",
+            y_title="fire mode and target",
+            color_field="hit_probability",
+            color_title="hit probability",
+            tooltip=[
+                {"field": "firemode", "type": "nominal"},
+                {"field": "parameters", "type": "nominal"},
+                {"field": "target", "type": "nominal"},
+                {"field": "hit_probability", "type": "quantitative"},
+                {"field": "spread_radius", "type": "quantitative"},
+                {"field": "centroid_drift", "type": "quantitative"},
+            ],
+            title=f"{SWEEP_RUNS} magdumps per parameters, spread and drift in degrees",
+            color_domain=(0, 1),
+        )
+    )
+
+    return (fg_chart, {})
+
+
+def sweep_fire_mode_task(args: Tuple[dict, Dict[int, dict], int, int, str]) -> int:
+
+    # Weapons are parsed again by the workers, fire modes not being picklable
+    # once simulated
+    weapon_data: dict
+    fire_groups_data_id_idx: Dict[int, dict]
+    fire_group_id: int
+    fire_mode_id: int
+    fire_mode_hash: str
+    (
+        weapon_data,
+        fire_groups_data_id_idx,
+        fire_group_id,
+        fire_mode_id,
+        fire_mode_hash,
+    ) = args
+
+    fire_mode: FireMode = next(
+        fm
+        for fg in parse_infantry_weapon_data(
+            data=weapon_data, fire_groups_data_id_idx=fire_groups_data_id_idx
+        ).fire_groups
+        if fg.fire_group_id == fire_group_id
+        for fm in fg.fire_modes
+        if fm.fire_mode_id == fire_mode_id
+    )
+
+    return len(fire_mode_sweep(fire_mode, fire_mode_hash=fire_mode_hash))
@@ -0,0 +1,398 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from ps2_analysis.enums import DamageLocation, DamageTargetType
+from ps2_analysis.fire_groups.damage_profile import DamageProfile
+from ps2_analysis.fire_groups.fire_mode import FireMode
+from ps2_analysis.utils import (
+    float_range_list,
+    resolve_damage_resistance,
+    resolve_health_pool,
+)
+
+from .constants import TIME_TO_KILL_MAX_SHOTS
+
+DAMAGE_TARGET_TYPES: Tuple[DamageTargetType, ...] = tuple(DamageTargetType)
+DAMAGE_LOCATIONS: Tuple[DamageLocation, ...] = (
+    DamageLocation.HEAD,
+    DamageLocation.TORSO,
+)
+
+
+@dataclass
+class DamageProfileArrays:
+    present: np.ndarray  # (F,)
+    max_damage: np.ndarray  # (F,)
+    max_damage_range: np.ndarray  # (F,)
+    min_damage: np.ndarray  # (F,)
+    min_damage_range: np.ndarray  # (F,)
+    pellets_count: np.ndarray  # (F,)
+    resistance: np.ndarray  # (F, T, L)
+    location_multiplier: np.ndarray  # (F, L)
+
+
+@dataclass
+class ShotsToKillRanges:
+    # Step functions as columns, a row per step: shots to kill from its distance
+    # on, until the next step of the same fire mode, target and location
+    fire_modes: List[FireMode]
+    damage_target_types: Tuple[DamageTargetType, ...]  # (T,)
+    damage_locations: Tuple[DamageLocation, ...]  # (L,)
+    fire_mode_index: np.ndarray  # (N,)
+    damage_target_type_index: np.ndarray  # (N,)
+    damage_location_index: np.ndarray  # (N,)
+    distance: np.ndarray  # (N,)
+    shots_to_kill: np.ndarray  # (N,), -1 when unable to kill
+
+
+@dataclass
+class TimeToKillMatrix:
+    fire_modes: List[FireMode]
+    ranges: np.ndarray  # (R,)
+    damage_target_types: Tuple[DamageTargetType, ...]  # (T,)
+    damage_locations: Tuple[DamageLocation, ...]  # (L,)
+    damage_per_shot: np.ndarray  # (F, R, T, L)
+    shots_to_kill: np.ndarray  # (F, R, T, L), -1 when unable to kill
+    time_to_kill: np.ndarray  # (F, R, T, L), milliseconds, -1 when unable to kill
+    sustained_damage_per_second: np.ndarray  # (F, R, T, L)
+
+
+def _damage_profile_arrays(
+    profiles: Sequence[Optional[DamageProfile]],
+    damage_target_types: Sequence[DamageTargetType],
+    damage_locations: Sequence[DamageLocation],
+) -> DamageProfileArrays:
+
+    count: int = len(profiles)
+
+    arrays: DamageProfileArrays = DamageProfileArrays(
+        present=np.array([p is not None for p in profiles], dtype=bool),
+        max_damage=np.zeros(count),
+        max_damage_range=np.zeros(count),
+        min_damage=np.zeros(count),
+        min_damage_range=np.zeros(count),
+        pellets_count=np.zeros(count),
+        resistance=np.ones((count, len(damage_target_types), len(damage_locations))),
+        location_multiplier=np.ones((count, len(damage_locations))),
+    )
+
+    i: int
+    profile: Optional[DamageProfile]
+    for i, profile in enumerate(profiles):
+
+        if profile is None:
+
+            continue
+
+        arrays.max_damage[i] = profile.max_damage
+        arrays.max_damage_range[i] = profile.max_damage_range
+        arrays.min_damage[i] = profile.min_damage
+        arrays.min_damage_range[i] = profile.min_damage_range
+        arrays.pellets_count[i] = profile.pellets_count
+
+        j: int
+        k: int
+        damage_target_type: DamageTargetType
+        damage_location: DamageLocation
+        for k, damage_location in enumerate(damage_locations):
+
+            arrays.location_multiplier[i, k] = profile.location_multiplier.get(
+                damage_location, 1.0
+            )
+
+            for j, damage_target_type in enumerate(damage_target_types):
+
+                arrays.resistance[i, j, k] = resolve_damage_resistance(
+                    damage_target_type=damage_target_type,
+                    damage_location=damage_location,
+                    resist_type=profile.resist_type,
+                )
+
+    return arrays
+
+
+def falloff(arrays: DamageProfileArrays, ranges: np.ndarray) -> np.ndarray:
+
+    # Same arithmetic as ps2_analysis' locational_linear_falloff, over (F, R)
+    x: np.ndarray = ranges[np.newaxis, :]
+    x_0: np.ndarray = arrays.max_damage_range[:, np.newaxis]
+    y_0: np.ndarray = arrays.max_damage[:, np.newaxis]
+    x_1: np.ndarray = arrays.min_damage_range[:, np.newaxis]
+    y_1: np.ndarray = arrays.min_damage[:, np.newaxis]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+
+        interpolated: np.ndarray = y_1 * (1 - (x - x_1) / (x_0 - x_1)) + y_0 * (
+            (x - x_1) / (x_0 - x_1)
+        )
+
+    return np.where(
+        (y_0 == y_1) | (x <= x_0), y_0, np.where(x >= x_1, y_1, interpolated)
+    )
+
+
+def damage_per_shot_array(
+    arrays: DamageProfileArrays, ranges: np.ndarray
+) -> np.ndarray:
+
+    # Damage degradation due to range is rounded down
+    damage: np.ndarray = np.floor(falloff(arrays=arrays, ranges=ranges))  # (F, R)
+
+    # Location multiplier, then resistance, both rounded up
+    located: np.ndarray = np.ceil(
+        damage[:, :, np.newaxis] * arrays.location_multiplier[:, np.newaxis, :]
+    )  # (F, R, L)
+
+    resisted: np.ndarray = np.ceil(
+        located[:, :, np.newaxis, :]
+        * (1 - arrays.resistance[:, np.newaxis, :, :])  # (F, R, T, L)
+    )
+
+    resisted = np.where(arrays.resistance[:, np.newaxis, :, :] < 1.0, resisted, 0.0)
+
+    return np.where(
+        arrays.present[:, np.newaxis, np.newaxis, np.newaxis],
+        resisted * arrays.pellets_count[:, np.newaxis, np.newaxis, np.newaxis],
+        0.0,
+    )
+
+
+def shot_timings_array(fire_modes: Sequence[FireMode], shots: int) -> np.ndarray:
+
+    # Time at which each of the first shots is fired, reloads included, (F, S)
+    timings: np.ndarray = np.full((len(fire_modes), shots), -1, dtype=np.int64)
+
+    i: int
+    fm: FireMode
+    for i, fm in enumerate(fire_modes):
+
+        fm_timings: List[int]
+
+        if fm.max_consecutive_shots == 0:
+
+            continue
+
+        # Unlimited consecutive shots
+        elif fm.max_consecutive_shots < 0:
+
+            fm_timings = [t for t, _ in fm.fire_timing.generate_shot_timings(shots)]
+
+        # No way to reload, only the first magazine
+        elif fm.reload_time < 0:
+
+            fm_timings = [
+                t
+                for t, _ in fm.fire_timing.generate_shot_timings(
+                    min(shots, fm.max_consecutive_shots)
+                )
+            ]
+
+        else:
+
+            fm_timings = [t for t, _ in fm.generate_real_shot_timings(shots=shots)]
+
+        timings[i, : len(fm_timings)] = fm_timings[:shots]
+
+    return timings
+
+
+def shots_to_kill_array(
+    fire_modes: Sequence[FireMode],
+    ranges: np.ndarray,
+    damage_target_types: Sequence[DamageTargetType] = DAMAGE_TARGET_TYPES,
+    damage_locations: Sequence[DamageLocation] = DAMAGE_LOCATIONS,
+) -> Tuple[np.ndarray, np.ndarray]:
+
+    direct: DamageProfileArrays = _damage_profile_arrays(
+        profiles=[fm.direct_damage_profile for fm in fire_modes],
+        damage_target_types=damage_target_types,
+        damage_locations=damage_locations,
+    )
+
+    indirect: DamageProfileArrays = _damage_profile_arrays(
+        profiles=[fm.indirect_damage_profile for fm in fire_modes],
+        damage_target_types=damage_target_types,
+        damage_locations=damage_locations,
+    )
+
+    # Indirect damage is always applied as if at point blank
+    damage_per_shot: np.ndarray = damage_per_shot_array(
+        arrays=direct, ranges=ranges
+    ) + damage_per_shot_array(arrays=indirect, ranges=np.zeros(1))
+
+    health: np.ndarray = np.array(
+        [resolve_health_pool(damage_target_type=t) for t in damage_target_types],
+        dtype=float,
+    )[np.newaxis, np.newaxis, :, np.newaxis]
+
+    with np.errstate(divide="ignore"):
+
+        shots_to_kill: np.ndarray = np.where(
+            damage_per_shot > 0, np.ceil(health / damage_per_shot), -1
+        ).astype(np.int64)
+
+    # Both (F, R, T, L), shots to kill being -1 when unable to kill
+    return (damage_per_shot, shots_to_kill)
+
+
+def compute_time_to_kill_matrix(
+    fire_modes: List[FireMode],
+    ranges: np.ndarray,
+    damage_target_types: Tuple[DamageTargetType, ...] = DAMAGE_TARGET_TYPES,
+    damage_locations: Tuple[DamageLocation, ...] = DAMAGE_LOCATIONS,
+    max_shots: int = TIME_TO_KILL_MAX_SHOTS,
+) -> TimeToKillMatrix:
+
+    damage_per_shot: np.ndarray
+    shots_to_kill: np.ndarray
+    damage_per_shot, shots_to_kill = shots_to_kill_array(
+        fire_modes=fire_modes,
+        ranges=ranges,
+        damage_target_types=damage_target_types,
+        damage_locations=damage_locations,
+    )
+
+    # Time to kill from the shot timings table, shots beyond it are left unknown
+    timings: np.ndarray = shot_timings_array(fire_modes=fire_modes, shots=max_shots)
+
+    known: np.ndarray = (shots_to_kill > 0) & (shots_to_kill <= max_shots)
+
+    shot_index: np.ndarray = np.clip(shots_to_kill - 1, 0, max_shots - 1)
+
+    time_to_kill: np.ndarray = np.where(
+        known,
+        np.take_along_axis(
+            timings[:, np.newaxis, np.newaxis, np.newaxis, :],
+            shot_index[..., np.newaxis],
+            axis=-1,
+        )[..., 0],
+        -1,
+    )
+
+    # Sustained damage per second over a whole magazine and reload cycle
+    magazine: np.ndarray = np.array(
+        [fm.max_consecutive_shots for fm in fire_modes], dtype=float
+    )
+    reload_time: np.ndarray = np.array(
+        [fm.reload_time for fm in fire_modes], dtype=float
+    )
+    shots_per_minute: np.ndarray = np.array(
+        [fm.fire_timing.shots_per_minute for fm in fire_modes], dtype=float
+    )
+    magazine_time: np.ndarray = np.array(
+        [
+            fm.fire_timing.time_to_fire_shots(shots=fm.max_consecutive_shots)
+            if fm.max_consecutive_shots > 0
+            else 0
+            for fm in fire_modes
+        ],
+        dtype=float,
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+
+        shots_per_second: np.ndarray = np.where(
+            (magazine > 0) & (reload_time >= 0),
+            magazine * 1_000 / (magazine_time + reload_time),
+            shots_per_minute / 60,
+        )
+
+    shots_per_second = np.nan_to_num(shots_per_second, nan=0.0, posinf=0.0)
+
+    sustained_damage_per_second: np.ndarray = (
+        damage_per_shot * shots_per_second[:, np.newaxis, np.newaxis, np.newaxis]
+    )
+
+    return TimeToKillMatrix(
+        fire_modes=fire_modes,
+        ranges=ranges,
+        damage_target_types=damage_target_types,
+        damage_locations=damage_locations,
+        damage_per_shot=damage_per_shot.astype(np.int64),
+        shots_to_kill=shots_to_kill,
+        time_to_kill=time_to_kill,
+        sustained_damage_per_second=sustained_damage_per_second,
+    )
+
+
+def compute_shots_to_kill_ranges(
+    fire_modes: List[FireMode],
+    damage_target_types: Tuple[DamageTargetType, ...] = DAMAGE_TARGET_TYPES,
+    damage_locations: Tuple[DamageLocation, ...] = DAMAGE_LOCATIONS,
+    step: float = 0.1,
+    precision_decimals: int = 2,
+) -> ShotsToKillRanges:
+
+    # Shots to kill only change between the falloff breakpoints, so each fire mode
+    # is sampled up to its min damage range, on the analysis library's grid
+    lengths: np.ndarray = np.zeros(len(fire_modes), dtype=np.int64)
+    grid: List[float] = [0.0]
+
+    i: int
+    fm: FireMode
+    for i, fm in enumerate(fire_modes):
+
+        profile: Optional[DamageProfile] = fm.direct_damage_profile
+
+        if profile is not None and profile.damage_range_delta > 0:
+
+            fm_grid: List[float] = float_range_list(
+                0.0, profile.min_damage_range + step, step, precision_decimals
+            )
+
+            # Grids all start at 0 with the same step, the longest covers them all
+            if len(fm_grid) > len(grid):
+
+                grid = fm_grid
+
+            lengths[i] = len(fm_grid)
+
+        # Constant damage, from point blank on
+        elif profile is not None or fm.indirect_damage_profile is not None:
+
+            lengths[i] = 1
+
+    ranges: np.ndarray = np.array(grid)
+
+    shots_to_kill: np.ndarray
+    _, shots_to_kill = shots_to_kill_array(
+        fire_modes=fire_modes,
+        ranges=ranges,
+        damage_target_types=damage_target_types,
+        damage_locations=damage_locations,
+    )  # (F, R, T, L)
+
+    # Every step function at once, a step starting wherever shots to kill change
+    steps: np.ndarray = np.ones(shots_to_kill.shape, dtype=bool)
+    steps[:, 1:] = shots_to_kill[:, 1:] != shots_to_kill[:, :-1]
+    steps &= (np.arange(len(grid))[np.newaxis, :] < lengths[:, np.newaxis])[
+        :, :, np.newaxis, np.newaxis
+    ]
+
+    f: np.ndarray
+    r: np.ndarray
+    t: np.ndarray
+    loc: np.ndarray
+    f, r, t, loc = np.nonzero(steps)
+
+    # Placed one sample early, and rounded half up, as by the analysis library
+    p: int = 10 ** precision_decimals
+
+    distance: np.ndarray = np.where(
+        r > 0, np.floor((ranges[r] - step) * p + 0.5) / p, ranges[r]
+    )
+
+    # Ordered by fire mode, target and location, then by distance
+    order: np.ndarray = np.lexsort((distance, loc, t, f))
+
+    return ShotsToKillRanges(
+        fire_modes=fire_modes,
+        damage_target_types=damage_target_types,
+        damage_locations=damage_locations,
+        fire_mode_index=f[order],
+        damage_target_type_index=t[order],
+        damage_location_index=loc[order],
+        distance=distance[order],
+        shots_to_kill=shots_to_kill[f, r, t, loc][order],
+    )
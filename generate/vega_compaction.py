@@ -0,0 +1,140 @@
+import hashlib
+import itertools
+import json
+import string
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from .constants import PRECISION_DECIMALS
+
+
+def _short_names(reserved: Iterable[str]) -> Iterator[str]:
+
+    excluded: set = set(reserved)
+
+    size: int = 1
+    while True:
+
+        letters: Tuple[str, ...]
+        for letters in itertools.product(string.ascii_lowercase, repeat=size):
+
+            name: str = "".join(letters)
+
+            if name not in excluded:
+
+                yield name
+
+        size += 1
+
+
+def _compact_value(value: Any) -> Any:
+
+    if isinstance(value, float):
+
+        # Builtin round is idempotent over already rounded values, fastround isn't
+        value = round(value, PRECISION_DECIMALS)
+
+        if value.is_integer():
+
+            return int(value)
+
+    return value
+
+
+def compact_values(values: List[dict]) -> Tuple[List[dict], List[dict]]:
+
+    # Records with short keys and categories as indexes, and the transforms that
+    # restore the original records
+    fields: Dict[str, None] = {}
+
+    record: dict
+    for record in values:
+
+        fields.update(dict.fromkeys(record))
+
+    names: Dict[str, str] = dict(zip(fields, _short_names(fields)))
+
+    categories: Dict[str, Dict[str, int]] = {}
+
+    field: str
+    for field in fields:
+
+        field_values: List[Any] = [r[field] for r in values if field in r]
+
+        if all(isinstance(v, str) for v in field_values):
+
+            distinct: Dict[str, None] = dict.fromkeys(field_values)
+
+            if len(distinct) < len(field_values):
+
+                categories[field] = {v: i for i, v in enumerate(distinct)}
+
+    records: List[dict] = [
+        {
+            names[f]: categories[f][v] if f in categories else _compact_value(v)
+            for f, v in r.items()
+        }
+        for r in values
+    ]
+
+    transform: List[dict] = [
+        {
+            "calculate": f"{json.dumps(list(categories[f]), separators=(',', ':'))}"
+            f"[datum.{names[f]}]"
+            if f in categories
+            else f"datum.{names[f]}",
+            "as": f,
+        }
+        for f in fields
+    ]
+
+    return (records, transform)
+
+
+def compact_spec(spec: dict) -> dict:
+
+    # Inline data become named datasets, identical ones being stored once
+    datasets: Dict[str, List[dict]] = {}
+    dataset_names: Dict[str, str] = {}
+
+    def compact(node: Any) -> Any:
+
+        if isinstance(node, list):
+
+            return [compact(n) for n in node]
+
+        if not isinstance(node, dict):
+
+            return node
+
+        data: Any = node.get("data")
+
+        if isinstance(data, dict) and "values" in data:
+
+            records: List[dict]
+            transform: List[dict]
+            records, transform = compact_values(data["values"])
+
+            digest: str = hashlib.sha1(
+                json.dumps(records, separators=(",", ":")).encode()
+            ).hexdigest()
+
+            if digest not in dataset_names:
+
+                dataset_names[digest] = f"d{len(dataset_names)}"
+                datasets[dataset_names[digest]] = records
+
+            node = {
+                **node,
+                "data": {"name": dataset_names[digest]},
+                "transform": transform + node.get("transform", []),
+            }
+
+        return {k: compact(v) for k, v in node.items()}
+
+    compacted: dict = compact(spec)
+
+    if datasets:
+
+        compacted["datasets"] = {**compacted.get("datasets", {}), **datasets}
+
+    return compacted
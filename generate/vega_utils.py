@@ -0,0 +1,308 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from ps2_census.enums import Faction
+
+from .constants import CURSOR, PELLET
+
+# Plain Vega-Lite specs, built without altair objects nor schema validation
+VEGA_LITE_SCHEMA: str = "https://vega.github.io/schema/vega-lite/v4.17.0.json"
+
+# Axis
+X: str = "x"
+Y: str = "y"
+
+# Dark theme
+_LIGHT_COLOR: str = "#fff"
+_MEDIUM_COLOR: str = "#888"
+
+DARK_THEME_CONFIG: dict = {
+    "background": "#343c3d",
+    "title": {"color": _LIGHT_COLOR},
+    "style": {
+        "guide-label": {"fill": _LIGHT_COLOR},
+        "guide-title": {"fill": _LIGHT_COLOR},
+    },
+    "axis": {
+        "domainColor": _LIGHT_COLOR,
+        "gridColor": _MEDIUM_COLOR,
+        "tickColor": _LIGHT_COLOR,
+    },
+}
+
+
+def selection_multi(field: str) -> dict:
+
+    return {"type": "multi", "fields": [field]}
+
+
+def selection_color(selection: str, field: str, scale: dict) -> dict:
+
+    return {
+        "condition": {
+            "selection": selection,
+            "field": field,
+            "type": "nominal",
+            "scale": scale,
+            "legend": None,
+        },
+        "value": "lightgray",
+    }
+
+
+def selection_opacity(selection: str) -> dict:
+
+    return {"condition": {"selection": selection, "value": 0.8}, "value": 0.1}
+
+
+# Faction color
+_FACTION_COLOR_DOMAIN: List[str] = [
+    Faction.TERRAN_REPUBLIC.name,
+    Faction.VANU_SOVEREIGNTY.name,
+    Faction.NEW_CONGLOMERATE.name,
+    Faction.NONE.name,
+]
+_FACTION_COLOR_RANGE: List[str] = ["red", "purple", "blue", "green"]
+
+FACTION_SELECTION: str = "faction"
+FACTION_COLOR: dict = selection_color(
+    FACTION_SELECTION,
+    "Faction",
+    {"domain": _FACTION_COLOR_DOMAIN, "range": _FACTION_COLOR_RANGE},
+)
+
+# Simulation point type color
+_SIMULATION_POINT_TYPE_COLOR_DOMAIN: List[str] = [CURSOR, PELLET]
+_SIMULATION_POINT_TYPE_COLOR_RANGE: List[str] = ["red", "green"]
+
+SIMULATION_POINT_TYPE_FIELD: str = "type"
+SIMULATION_POINT_TYPE_SELECTION: str = "point_type"
+SIMULATION_POINT_TYPE_COLOR: dict = selection_color(
+    SIMULATION_POINT_TYPE_SELECTION,
+    SIMULATION_POINT_TYPE_FIELD,
+    {
+        "domain": _SIMULATION_POINT_TYPE_COLOR_DOMAIN,
+        "range": _SIMULATION_POINT_TYPE_COLOR_RANGE,
+    },
+)
+SIMULATION_POINT_TYPE_OPACITY: dict = selection_opacity(SIMULATION_POINT_TYPE_SELECTION)
+
+# Simulation fire mode color
+SIMULATION_FIRE_MODE_FIELD: str = "firemode"
+SIMULATION_FIRE_MODE_SELECTION: str = "fire_mode"
+SIMULATION_FIRE_MODE_COLOR: dict = selection_color(
+    SIMULATION_FIRE_MODE_SELECTION, SIMULATION_FIRE_MODE_FIELD, {"scheme": "dark2"}
+)
+SIMULATION_FIRE_MODE_OPACITY: dict = selection_opacity(SIMULATION_FIRE_MODE_SELECTION)
+
+# Simulation STK
+SIMULATION_STK_FIELD: str = "target"
+SIMULATION_STK_SELECTION: str = "target"
+SIMULATION_STK_COLOR: dict = selection_color(
+    SIMULATION_STK_SELECTION, SIMULATION_STK_FIELD, {"scheme": "dark2"}
+)
+SIMULATION_STK_OPACITY: dict = selection_opacity(SIMULATION_STK_SELECTION)
+
+# Simulation stance color
+SIMULATION_STANCE_FIELD: str = "stance"
+SIMULATION_STANCE_SELECTION: str = "stance"
+SIMULATION_STANCE_COLOR: dict = selection_color(
+    SIMULATION_STANCE_SELECTION, SIMULATION_STANCE_FIELD, {"scheme": "category10"}
+)
+SIMULATION_STANCE_OPACITY: dict = selection_opacity(SIMULATION_STANCE_SELECTION)
+
+
+def quantitative_axis(
+    field: str, title: str, domain: Tuple[float, float]
+) -> Dict[str, Any]:
+
+    return {
+        "field": field,
+        "type": "quantitative",
+        "axis": {"title": title},
+        "scale": {"domain": list(domain)},
+    }
+
+
+def interactive(spec: dict, name: str) -> dict:
+
+    # Same as altair's .interactive(), pan and zoom bound to the scales
+    spec["selection"] = {
+        name: {"type": "interval", "bind": "scales", "encodings": [X, Y]}
+    }
+
+    return spec
+
+
+def legend_chart_spec(field: str, color: dict, selection: str) -> dict:
+
+    return {
+        "mark": "point",
+        "encoding": {
+            "y": {"field": field, "type": "nominal", "axis": {"orient": "right"}},
+            "color": color,
+        },
+        "selection": {selection: selection_multi(field)},
+    }
+
+
+def with_legend_spec(
+    chart: dict, values: List[dict], field: str, color: dict, selection: str,
+) -> dict:
+
+    return {
+        "hconcat": [chart, legend_chart_spec(field, color, selection)],
+        "data": {"values": values},
+    }
+
+
+def top_level_spec(spec: dict) -> dict:
+
+    return {"$schema": VEGA_LITE_SCHEMA, "config": DARK_THEME_CONFIG, **spec}
+
+
+def scatter_chart_spec(
+    x_domain: Tuple[float, float],
+    y_domain: Tuple[float, float],
+    color: dict,
+    opacity: dict,
+    width: int,
+    height: int,
+    title: str,
+    tooltip: Optional[List[dict]] = None,
+) -> dict:
+
+    return interactive(
+        {
+            "mark": "point",
+            "encoding": {
+                "x": quantitative_axis(X, "horizontal angle (degrees)", x_domain),
+                "y": quantitative_axis(Y, "vertical angle (degrees)", y_domain),
+                "color": color,
+                "opacity": opacity,
+                "tooltip": tooltip
+                or [
+                    {"field": "time", "type": "quantitative"},
+                    {"field": X, "type": "quantitative"},
+                    {"field": Y, "type": "quantitative"},
+                ],
+            },
+            "width": width,
+            "height": height,
+            "title": title,
+        },
+        "grid",
+    )
+
+
+def step_chart_spec(
+    x_domain: Tuple[float, float],
+    y_domain: Tuple[float, float],
+    title: str,
+    name: str,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+) -> dict:
+
+    spec: dict = {
+        "mark": {
+            "type": "line",
+            "interpolate": "step-after",
+            "strokeOpacity": 0.5,
+            "strokeWidth": 10,
+        },
+        "encoding": {
+            "x": quantitative_axis(X, "range (meters)", x_domain),
+            "y": quantitative_axis(Y, "shots to kill", y_domain),
+            "color": SIMULATION_STK_COLOR,
+            "opacity": SIMULATION_STK_OPACITY,
+            "tooltip": [
+                {"field": SIMULATION_STK_FIELD, "type": "nominal"},
+                {"field": X, "type": "quantitative"},
+                {"field": Y, "type": "quantitative"},
+            ],
+        },
+        "title": title,
+    }
+
+    if width:
+        spec["width"] = width
+    else:
+        spec["height"] = height
+
+    # Concatenated charts each need their own scales selection
+    return interactive(spec, f"grid_{name}")
+
+
+def heatmap_chart_spec(
+    values: List[dict],
+    x_field: str,
+    x_title: str,
+    y_field: str,
+    y_title: str,
+    color_field: str,
+    color_title: str,
+    tooltip: List[dict],
+    title: str,
+    color_domain: Optional[Tuple[float, float]] = None,
+) -> dict:
+
+    # Rows and columns in the order of the values, sized by the default steps
+    return {
+        "data": {"values": values},
+        "mark": "rect",
+        "encoding": {
+            "x": {
+                "field": x_field,
+                "type": "ordinal",
+                "sort": None,
+                "axis": {"title": x_title, "labelAngle": -45},
+            },
+            "y": {
+                "field": y_field,
+                "type": "ordinal",
+                "sort": None,
+                "axis": {"title": y_title},
+            },
+            "color": {
+                "field": color_field,
+                "type": "quantitative",
+                "scale": {
+                    "scheme": "viridis",
+                    **({"domain": list(color_domain)} if color_domain else {}),
+                },
+                "legend": {"title": color_title},
+            },
+            "tooltip": tooltip,
+        },
+        "title": title,
+    }
+
+
+def line_chart_spec(
+    x_domain: Tuple[float, float],
+    y_domain: Tuple[float, float],
+    x_title: str,
+    y_title: str,
+    color: dict,
+    opacity: dict,
+    tooltip: List[dict],
+    title: str,
+    width: int,
+    interpolate: str = "linear",
+) -> dict:
+
+    return interactive(
+        {
+            "mark": {"type": "line", "interpolate": interpolate, "strokeWidth": 3},
+            "encoding": {
+                "x": quantitative_axis(X, x_title, x_domain),
+                "y": quantitative_axis(Y, y_title, y_domain),
+                "color": color,
+                "opacity": opacity,
+                "tooltip": tooltip,
+            },
+            "width": width,
+            "title": title,
+        },
+        "grid",
+    )
@@ -0,0 +1,353 @@
+from enum import Enum
+from typing import Any, Dict, List, Optional, Union
+
+from ps2_analysis.fire_groups.ammo import Ammo
+from ps2_analysis.fire_groups.cone_of_fire import ConeOfFire
+from ps2_analysis.fire_groups.damage_profile import DamageProfile
+from ps2_analysis.fire_groups.fire_group import FireGroup
+from ps2_analysis.fire_groups.fire_mode import FireMode
+from ps2_analysis.fire_groups.fire_timing import FireTiming
+from ps2_analysis.fire_groups.heat import Heat
+from ps2_analysis.fire_groups.lock_on import LockOn
+from ps2_analysis.fire_groups.projectile import Projectile
+from ps2_analysis.fire_groups.recoil import Recoil
+from ps2_analysis.weapons.attachment import Attachment
+from ps2_analysis.weapons.infantry.infantry_weapon import InfantryWeapon
+from ps2_analysis.weapons.vehicle.vehicle_weapon import VehicleWeapon
+from ps2_census.enums import PlayerState
+
+from .constants import PRECISION_DECIMALS, SIMULATIONS, VEHICLE_SIMULATIONS
+from .enum_resolvers import enum_name
+
+# Views are plain dicts of preformatted values, rendered without filters nor
+# method calls, and hashed as they are by the fragment cache
+
+
+def _value(value: Any) -> Any:
+
+    if isinstance(value, Enum):
+
+        return enum_name(value)
+
+    elif isinstance(value, float):
+
+        return round(value, PRECISION_DECIMALS)
+
+    return value
+
+
+def _values(target: Any, *names: str) -> dict:
+
+    return {name: _value(getattr(target, name)) for name in names}
+
+
+def ammo_view(ammo: Optional[Ammo]) -> Optional[dict]:
+
+    if ammo is None:
+
+        return None
+
+    return _values(
+        ammo,
+        "clip_size",
+        "total_capacity",
+        "ammo_per_shot",
+        "shots_per_clip",
+        "short_reload_time",
+        "long_reload_time",
+        "block_auto",
+        "continuous",
+        "loop_start_time",
+        "loop_end_time",
+    )
+
+
+def heat_view(heat: Optional[Heat]) -> Optional[dict]:
+
+    if heat is None:
+
+        return None
+
+    return _values(
+        heat,
+        "total_capacity",
+        "heat_per_shot",
+        "shots_before_overheat",
+        "shots_to_overheat",
+        "recovery_rate",
+        "full_recovery_time",
+        "overheat_recovery_time",
+        "overheat_penalty_time",
+    )
+
+
+def damage_profile_view(damage_profile: Optional[DamageProfile]) -> Optional[dict]:
+
+    if damage_profile is None:
+
+        return None
+
+    return {
+        **_values(
+            damage_profile,
+            "pellets_count",
+            "max_damage",
+            "max_damage_range",
+            "min_damage",
+            "min_damage_range",
+            "resist_type",
+        ),
+        "constant": damage_profile.damage_range_delta == 0
+        and damage_profile.damage_delta == 0,
+        "max_range_damage_per_shot": _value(
+            damage_profile.damage_per_shot(damage_profile.max_damage_range)
+        ),
+        "min_range_damage_per_shot": _value(
+            damage_profile.damage_per_shot(damage_profile.min_damage_range)
+        ),
+        "location_multiplier": [
+            (enum_name(location), _value(multiplier))
+            for location, multiplier in damage_profile.location_multiplier.items()
+        ],
+        "effect": [(k, _value(v)) for k, v in damage_profile.effect.items()],
+    }
+
+
+def projectile_view(projectile: Optional[Projectile]) -> Optional[dict]:
+
+    if projectile is None:
+
+        return None
+
+    return _values(
+        projectile,
+        "flight_type",
+        "speed",
+        "acceleration",
+        "max_speed",
+        "gravity",
+        "life_time",
+        "max_range",
+        "drag",
+        "turn_rate",
+    )
+
+
+def lock_on_view(lock_on: Optional[LockOn]) -> Optional[dict]:
+
+    if lock_on is None:
+
+        return None
+
+    return _values(
+        lock_on, "required", "maintain", "seek_in_flight", "turn_rate", "life_time"
+    )
+
+
+def fire_timing_view(fire_timing: Optional[FireTiming]) -> Optional[dict]:
+
+    if fire_timing is None:
+
+        return None
+
+    return _values(
+        fire_timing,
+        "is_automatic",
+        "burst_length",
+        "burst_refire_time",
+        "chamber_time",
+        "shots_per_minute",
+        "refire_time",
+        "fire_duration",
+        "delay",
+        "charge_up_time",
+        "spool_up_time",
+        "spool_up_initial_refire_time",
+    )
+
+
+def recoil_view(recoil: Optional[Recoil]) -> Optional[dict]:
+
+    if recoil is None:
+
+        return None
+
+    return _values(
+        recoil,
+        "min_angle",
+        "max_angle",
+        "min_vertical",
+        "max_vertical",
+        "vertical_increase",
+        "vertical_crouched_increase",
+        "first_shot_multiplier",
+        "min_horizontal",
+        "max_horizontal",
+        "min_horizontal_increase",
+        "max_horizontal_increase",
+        "horizontal_tolerance",
+        "max_horizontal_deviation",
+        "recovery_rate",
+        "recovery_delay",
+        "max_total_magnitude",
+    )
+
+
+def cone_of_fire_view(player_state: PlayerState, cone_of_fire: ConeOfFire) -> dict:
+
+    return {
+        "player_state": enum_name(player_state),
+        **_values(
+            cone_of_fire,
+            "min_angle",
+            "max_angle",
+            "multiplier",
+            "moving_multiplier",
+            "pellet_spread",
+            "bloom",
+            "recovery_rate",
+            "recovery_delay",
+            "grow_rate",
+        ),
+        "standing_min_angle": _value(cone_of_fire.min_cof_angle(moving=False)),
+        "standing_max_angle": _value(cone_of_fire.max_cof_angle(moving=False)),
+        "moving_min_angle": _value(cone_of_fire.min_cof_angle(moving=True)),
+        "moving_max_angle": _value(cone_of_fire.max_cof_angle(moving=True)),
+    }
+
+
+def _characteristics_view(
+    target: Union[InfantryWeapon, VehicleWeapon, Attachment, FireGroup, FireMode]
+) -> dict:
+
+    # Shared by weapons, attachments, fire groups and fire modes, the first
+    # three only having them when all of their fire modes agree
+    player_state_cone_of_fire: Optional[
+        Dict[PlayerState, ConeOfFire]
+    ] = target.player_state_cone_of_fire
+
+    return {
+        "ammo": ammo_view(target.ammo),
+        "heat": heat_view(target.heat),
+        "direct_damage_profile": damage_profile_view(target.direct_damage_profile),
+        "indirect_damage_profile": damage_profile_view(target.indirect_damage_profile),
+        "projectile": projectile_view(target.projectile),
+        "lock_on": lock_on_view(target.lock_on),
+        "fire_timing": fire_timing_view(target.fire_timing),
+        "recoil": recoil_view(target.recoil),
+        "player_state_cone_of_fire": [
+            cone_of_fire_view(player_state, cone_of_fire)
+            for player_state, cone_of_fire in player_state_cone_of_fire.items()
+        ]
+        if player_state_cone_of_fire
+        else [],
+    }
+
+
+def _simulations_view(target: Union[FireGroup, FireMode]) -> dict:
+
+    # Set on the fire groups and fire modes which have simulations
+    return {
+        f"{simulation}_simulation_{attribute}": getattr(
+            target, f"{simulation}_simulation_{attribute}", None
+        )
+        for simulation in SIMULATIONS + VEHICLE_SIMULATIONS
+        for attribute in ("base_path", "image")
+    }
+
+
+def _fire_groups_simulations_view(fire_groups: List[FireGroup]) -> Dict[int, dict]:
+
+    # Named after the weapon, out of the fire group and fire mode views so that
+    # their fragments are shared by all the weapons having them
+    return {
+        fg.fire_group_id: {
+            **_simulations_view(fg),
+            "fire_modes": {
+                fm.fire_mode_id: _simulations_view(fm) for fm in fg.fire_modes
+            },
+        }
+        for fg in fire_groups
+    }
+
+
+def fire_mode_view(fire_mode: FireMode) -> dict:
+
+    return {
+        **_values(
+            fire_mode,
+            "fire_mode_id",
+            "fire_mode_type",
+            "is_ads",
+            "detect_range",
+            "move_multiplier",
+            "turn_multiplier",
+            "zoom",
+            "max_consecutive_shots",
+            "reload_time",
+        ),
+        **_characteristics_view(fire_mode),
+    }
+
+
+def fire_group_view(fire_group: FireGroup) -> dict:
+
+    return {
+        **_values(fire_group, "fire_group_id", "description", "transition_time"),
+        # Set on vehicle weapons fire groups only
+        "sustained_fire": getattr(fire_group, "sustained_fire", None),
+        **_characteristics_view(fire_group),
+        "fire_modes": [fire_mode_view(fm) for fm in fire_group.fire_modes],
+    }
+
+
+def attachment_view(attachment: Attachment) -> dict:
+
+    return {
+        **_values(
+            attachment,
+            "attachment_item_id",
+            "name",
+            "description",
+            "is_default",
+            "image_path",
+        ),
+        "effects": [[(k, _value(v)) for k, v in e.items()] for e in attachment.effects],
+        **_characteristics_view(attachment),
+        "fire_groups": [fire_group_view(fg) for fg in attachment.fire_groups],
+        "simulations": _fire_groups_simulations_view(attachment.fire_groups),
+    }
+
+
+def weapon_view(weapon: Union[InfantryWeapon, VehicleWeapon]) -> dict:
+
+    attachments: List[dict] = [attachment_view(a) for a in weapon.attachments]
+
+    return {
+        **_values(
+            weapon,
+            "item_id",
+            "weapon_id",
+            "name",
+            "description",
+            "slug",
+            "faction",
+            "category",
+            "move_multiplier",
+            "turn_multiplier",
+            "equip_time",
+            "unequip_time",
+            "to_ads_time",
+            "from_ads_time",
+            "sprint_recovery_time",
+            "image_path",
+        ),
+        **_characteristics_view(weapon),
+        "fire_groups": [fire_group_view(fg) for fg in weapon.fire_groups],
+        "simulations": _fire_groups_simulations_view(weapon.fire_groups),
+        "attachments": attachments,
+        # Attachments which have fire groups, already part of their view
+        "attachment_fire_groups": [
+            (a, a["fire_groups"]) for a in attachments if a["fire_groups"]
+        ],
+    }
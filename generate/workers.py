@@ -0,0 +1,629 @@
+import multiprocessing
+import os
+import queue
+import resource
+import threading
+import time
+import traceback
+import tracemalloc
+from concurrent.futures import Future
+from contextlib import contextmanager
+from multiprocessing import Process, Queue, Value, cpu_count
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+from multiprocessing.sharedctypes import Synchronized
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .constants import BUILD_TASK_MEMORY, BUILD_WORKER_MAX_RSS, BUILD_WORKER_MAX_TASKS
+from .progress import progress_stage, report_progress
+
+# Pool workers are started from a server process, rather than forked from a build
+# process running threads which may hold locks at that point
+_forkserver: BaseContext = multiprocessing.get_context("forkserver")
+
+
+class WorkerPolicy(NamedTuple):
+    processes: int
+    max_tasks_per_child: Optional[int] = BUILD_WORKER_MAX_TASKS
+    max_rss: Optional[int] = BUILD_WORKER_MAX_RSS
+    trace_memory: bool = False
+    # Workers of each pipeline stage, overriding the default sizing
+    stage_workers: Optional[Dict[str, int]] = None
+
+
+class TaskStats(NamedTuple):
+    duration: float
+    rss: int
+    rss_delta: int
+    peak_rss: int
+    traced_peak: Optional[int]
+    # Total duration of each step timed by the task itself
+    timings: Optional[Dict[str, float]] = None
+
+
+_timings: Dict[str, float] = {}
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+
+    start: float = time.perf_counter()
+
+    try:
+
+        yield
+
+    finally:
+
+        _timings[name] = _timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def current_rss() -> int:
+
+    try:
+
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    except OSError:
+
+        return peak_rss()
+
+
+def peak_rss() -> int:
+
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def available_memory() -> Optional[int]:
+
+    try:
+
+        with open("/proc/meminfo") as f:
+
+            for line in f:
+
+                if line.startswith("MemAvailable:"):
+
+                    return int(line.split()[1]) * 1024
+
+    except OSError:
+
+        pass
+
+    try:
+
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+    except (ValueError, OSError):
+
+        return None
+
+
+def memory_bounded_processes(
+    task_memory: int = BUILD_TASK_MEMORY, processes: Optional[int] = None
+) -> int:
+
+    processes = processes or cpu_count()
+
+    available: Optional[int] = available_memory()
+
+    if available is None:
+
+        return processes
+
+    return max(1, min(processes, available // task_memory))
+
+
+def default_worker_policy(
+    task_memory: int = BUILD_TASK_MEMORY, processes: Optional[int] = None, **kwargs
+) -> WorkerPolicy:
+
+    return WorkerPolicy(
+        processes=memory_bounded_processes(
+            task_memory=task_memory, processes=processes
+        ),
+        **kwargs,
+    )
+
+
+def _worker(
+    function: Callable[[Any], Any],
+    policy: WorkerPolicy,
+    tasks: Queue,
+    results: Queue,
+    running: Synchronized,
+    stage: Optional[str] = None,
+):
+
+    completed: int = 0
+
+    while True:
+
+        item: Optional[Tuple[int, Any, str]] = tasks.get()
+
+        if item is None:
+
+            break
+
+        index: int
+        arg: Any
+        key: str
+        index, arg, key = item
+
+        # Shared memory rather than the queue, still readable if the worker dies
+        running.value = index
+
+        if stage is not None:
+
+            report_progress("task_start", stage, key)
+
+        _timings.clear()
+
+        rss_before: int = current_rss()
+        start: float = time.perf_counter()
+
+        if policy.trace_memory:
+
+            tracemalloc.start()
+
+        value: Any = None
+        error: Optional[str] = None
+
+        try:
+
+            value = function(arg)
+
+        except Exception:
+
+            error = traceback.format_exc()
+
+        traced_peak: Optional[int] = None
+
+        if policy.trace_memory:
+
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        rss: int = current_rss()
+
+        stats: TaskStats = TaskStats(
+            duration=time.perf_counter() - start,
+            rss=rss,
+            rss_delta=rss - rss_before,
+            peak_rss=peak_rss(),
+            traced_peak=traced_peak,
+            timings=dict(_timings),
+        )
+
+        completed += 1
+
+        if stage is not None:
+
+            report_progress(
+                "task_done" if error is None else "task_failed",
+                stage,
+                key,
+                duration=stats.duration,
+                rss=stats.rss,
+                error=error.strip().splitlines()[-1] if error is not None else None,
+            )
+
+        # Memory held by the worker is only given back to the OS when it exits
+        retire: bool = (
+            policy.max_tasks_per_child is not None
+            and completed >= policy.max_tasks_per_child
+        ) or (policy.max_rss is not None and rss >= policy.max_rss)
+
+        results.put((os.getpid(), index, value, error, stats, retire))
+
+        running.value = -1
+
+        if retire:
+
+            break
+
+
+def imap_recycling(
+    function: Callable[[Any], Any],
+    args: Iterable[Any],
+    policy: WorkerPolicy,
+    stage: Optional[str] = None,
+    task_key: Callable[[Any], str] = str,
+) -> Iterator[Tuple[int, Any, Optional[str], TaskStats]]:
+
+    # Index, value or error, and stats of each task, as they complete; workers
+    # report progress of the stage, if any, under the key of each task
+    tasks: Queue = Queue()
+    results: Queue = Queue()
+
+    keys: List[str] = []
+
+    arg: Any
+    for arg in args:
+
+        keys.append(task_key(arg) if stage is not None else "")
+
+        tasks.put((len(keys) - 1, arg, keys[-1]))
+
+    count: int = len(keys)
+
+    if count == 0:
+
+        return
+
+    if stage is not None:
+
+        with progress_stage(stage, total=count):
+
+            yield from _imap_workers(
+                function, policy, tasks, results, count, stage, keys
+            )
+
+    else:
+
+        yield from _imap_workers(function, policy, tasks, results, count, stage, keys)
+
+
+def _imap_workers(
+    function: Callable[[Any], Any],
+    policy: WorkerPolicy,
+    tasks: Queue,
+    results: Queue,
+    count: int,
+    stage: Optional[str],
+    keys: List[str],
+) -> Iterator[Tuple[int, Any, Optional[str], TaskStats]]:
+
+    workers: Dict[int, Tuple[Process, Synchronized]] = {}
+
+    def spawn():
+
+        running: Synchronized = Value("q", -1)
+
+        process: Process = Process(
+            target=_worker,
+            args=(function, policy, tasks, results, running, stage),
+            daemon=True,
+        )
+        process.start()
+
+        workers[process.pid] = (process, running)
+
+    for _ in range(min(policy.processes, count)):
+
+        spawn()
+
+    remaining: int = count
+    # A worker dying between sending its result and starting another task would
+    # otherwise have that task counted twice
+    done: Set[int] = set()
+
+    try:
+
+        while remaining > 0:
+
+            try:
+
+                message: Tuple[
+                    int, int, Any, Optional[str], TaskStats, bool
+                ] = results.get(timeout=1)
+
+            except queue.Empty:
+
+                # A worker that died mid-task loses that task, and is replaced
+                pid: int
+                process: Process
+                running: Synchronized
+                for pid, (process, running) in list(workers.items()):
+
+                    if not process.is_alive():
+
+                        workers.pop(pid)
+                        process.join()
+
+                        if running.value >= 0 and running.value not in done:
+
+                            done.add(running.value)
+                            remaining -= 1
+
+                            if stage is not None:
+
+                                report_progress(
+                                    "task_failed",
+                                    stage,
+                                    keys[running.value],
+                                    duration=0.0,
+                                    error=f"Worker exited with code {process.exitcode}",
+                                )
+
+                            yield (
+                                running.value,
+                                None,
+                                f"Worker exited with code {process.exitcode}",
+                                TaskStats(0.0, 0, 0, 0, None),
+                            )
+
+                        if remaining > len(workers):
+
+                            spawn()
+
+                continue
+
+            message_pid: int
+            index: int
+            value: Any
+            error: Optional[str]
+            stats: TaskStats
+            retire: bool
+            message_pid, index, value, error, stats, retire = message
+
+            # Already failed when its worker died right after the task
+            failed: bool = index in done
+
+            if not failed:
+
+                done.add(index)
+                remaining -= 1
+
+            if retire:
+
+                # Unless already reaped, having exited since
+                retired: Optional[Tuple[Process, Synchronized]] = workers.pop(
+                    message_pid, None
+                )
+
+                if retired is not None:
+
+                    retired[0].join()
+
+                if remaining > len(workers):
+
+                    spawn()
+
+            if not failed:
+
+                yield (index, value, error, stats)
+
+    finally:
+
+        for _ in workers:
+
+            tasks.put(None)
+
+        for process, _ in workers.values():
+
+            process.join(timeout=5)
+
+            if process.is_alive():
+
+                process.terminate()
+
+
+def _forkserver_worker(environ: Dict[str, str], *args: Any):
+
+    # Started with the environment of the server, not the one of the build
+    os.environ.clear()
+    os.environ.update(environ)
+
+    _worker(*args)
+
+
+class TaskError(Exception):
+    def __init__(self, error: str):
+
+        super().__init__(error)
+
+        # Traceback of the task, or how its worker exited
+        self.error: str = error
+
+
+class WorkerPool:
+    def __init__(
+        self, function: Callable[[Any], Any], policy: WorkerPolicy, processes: int
+    ):
+
+        # Tasks submitted one at a time, to workers recycled as by imap_recycling;
+        # futures resolve to the value and stats of each task
+        self.function: Callable[[Any], Any] = function
+        self.policy: WorkerPolicy = policy
+        self.processes: int = processes
+
+        # Workers all start with the module of the function imported, once the
+        # server is started by the first of them
+        _forkserver.set_forkserver_preload([function.__module__])
+
+        self._tasks: Queue = _forkserver.Queue()
+        self._results: Queue = _forkserver.Queue()
+        self._futures: Dict[int, Future] = {}
+        self._workers: Dict[int, Tuple[BaseProcess, Synchronized]] = {}
+        self._submitted: int = 0
+
+        self._lock: threading.Lock = threading.Lock()
+        self._stopping: threading.Event = threading.Event()
+        self._collector: threading.Thread = threading.Thread(
+            target=self._collect, daemon=True
+        )
+        self._collector.start()
+
+    def _spawn(self):
+
+        running: Synchronized = _forkserver.Value("q", -1)
+
+        process: BaseProcess = _forkserver.Process(
+            target=_forkserver_worker,
+            args=(
+                dict(os.environ),
+                self.function,
+                self.policy,
+                self._tasks,
+                self._results,
+                running,
+            ),
+            daemon=True,
+        )
+        process.start()
+
+        self._workers[process.pid] = (process, running)
+
+    def maintain(self):
+
+        # Workers retired or dead are replaced here, by the thread submitting tasks
+        # rather than by the collector
+        with self._lock:
+
+            for _ in range(
+                min(self.processes, len(self._futures)) - len(self._workers)
+            ):
+
+                self._spawn()
+
+    def submit(self, arg: Any) -> Future:
+
+        future: Future = Future()
+
+        with self._lock:
+
+            index: int = self._submitted
+            self._submitted += 1
+
+            self._futures[index] = future
+
+        self._tasks.put((index, arg, ""))
+
+        self.maintain()
+
+        return future
+
+    def _reap(self):
+
+        # A worker that died mid-task only fails that task
+        failed: List[Tuple[Future, str]] = []
+
+        with self._lock:
+
+            pid: int
+            process: BaseProcess
+            running: Synchronized
+            for pid, (process, running) in list(self._workers.items()):
+
+                if process.is_alive():
+
+                    continue
+
+                self._workers.pop(pid)
+                process.join()
+
+                future: Optional[Future] = self._futures.pop(running.value, None)
+
+                if running.value >= 0 and future is not None:
+
+                    failed.append(
+                        (future, f"Worker exited with code {process.exitcode}")
+                    )
+
+        error: str
+        for future, error in failed:
+
+            future.set_exception(TaskError(error))
+
+    def _collect(self):
+
+        reaped: float = time.monotonic()
+
+        while not self._stopping.is_set():
+
+            try:
+
+                message: Optional[
+                    Tuple[int, int, Any, Optional[str], TaskStats, bool]
+                ] = self._results.get(timeout=1)
+
+            except queue.Empty:
+
+                message = None
+
+            if message is None or time.monotonic() - reaped >= 1:
+
+                self._reap()
+
+                reaped = time.monotonic()
+
+            if message is None:
+
+                continue
+
+            pid: int
+            index: int
+            value: Any
+            error: Optional[str]
+            stats: TaskStats
+            retire: bool
+            pid, index, value, error, stats, retire = message
+
+            with self._lock:
+
+                # Already failed when its worker died right after the task
+                future: Optional[Future] = self._futures.pop(index, None)
+
+                # Gone before its task resolves, for a replacement to be spawned
+                retired: Optional[Tuple[BaseProcess, Synchronized]] = (
+                    self._workers.pop(pid, None) if retire else None
+                )
+
+            if retired is not None:
+
+                retired[0].join()
+
+            if future is None:
+
+                continue
+
+            if error is None:
+
+                future.set_result((value, stats))
+
+            else:
+
+                future.set_exception(TaskError(error))
+
+    def shutdown(self):
+
+        self._stopping.set()
+        self._collector.join()
+
+        with self._lock:
+
+            for _ in self._workers:
+
+                self._tasks.put(None)
+
+            process: BaseProcess
+            for process, _ in self._workers.values():
+
+                process.join(timeout=5)
+
+                if process.is_alive():
+
+                    process.terminate()
+
+            self._workers.clear()
+
+            future: Future
+            for future in self._futures.values():
+
+                future.cancel()
+
+            self._futures.clear()
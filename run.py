@@ -1,17 +1,39 @@
+import hashlib
 import webbrowser
 from threading import Timer
+from typing import Optional, Tuple
 
-from flask import Flask, send_from_directory
+from flask import Flask, request
 
 from generate.constants import SITE_DIRECTORY
+from generate.serving import conditional_response, send_site_file
 
 app = Flask(__name__)
-app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 0
+app.config["PREVIEW_RENDERER"] = None
 
 
 @app.route("/<path:path>")
 def local(path):
-    return send_from_directory(SITE_DIRECTORY, path)
+
+    if app.config["PREVIEW_RENDERER"] is not None:
+
+        rendered: Optional[Tuple[bytes, str]] = app.config["PREVIEW_RENDERER"].render(
+            path
+        )
+
+        if rendered is not None:
+
+            content: bytes
+            content, _ = rendered
+
+            return conditional_response(
+                request=request,
+                content=content,
+                path=path,
+                etag=hashlib.sha1(content).hexdigest(),
+            )
+
+    return send_site_file(request=request, directory=SITE_DIRECTORY, path=path)
 
 
 def open_browser(port):
@@ -26,12 +48,27 @@ if __name__ == "__main__":
 
     parser.add_argument("--port", type=int, default=8080)
     parser.add_argument("--open", action="store_true")
+    parser.add_argument("--preview", action="store_true")
+    parser.add_argument("--preview-processes", type=int, default=None)
+    parser.add_argument("--preview-cache-size", type=int, default=256)
 
     args = parser.parse_args()
 
     port: int = args.port
 
+    if args.preview is True:
+
+        from multiprocessing import cpu_count
+
+        from generate.preview import PreviewRenderer
+
+        app.config["PREVIEW_RENDERER"] = PreviewRenderer(
+            processes=args.preview_processes or cpu_count(),
+            cache_size=args.preview_cache_size,
+        )
+
     if args.open is True:
         Timer(1, lambda: open_browser(port=port)).start()
 
-    app.run(host="127.0.0.1", port=port)
+    # Threaded so that pages with many assets are served in parallel
+    app.run(host="127.0.0.1", port=port, threaded=True)
@@ -0,0 +1,103 @@
+// Client side weapon search over the sharded index generated in search/weapons/
+(function () {
+    "use strict";
+
+    const indexBase = "/search/weapons/";
+    const tokenPattern = /[a-z0-9]+/g;
+    const cache = {};
+
+    function fetchJSON(name) {
+        if (!(name in cache)) {
+            cache[name] = fetch(indexBase + name + ".json").then((r) => r.json());
+        }
+        return cache[name];
+    }
+
+    function queryKeys(query, marker) {
+        const keys = [];
+        (query.toLowerCase().match(tokenPattern) || []).forEach((token) => {
+            if (token.length < 3) {
+                keys.push(marker + token);
+            } else {
+                for (let i = 0; i < token.length - 2; i++) {
+                    keys.push(token.slice(i, i + 3));
+                }
+            }
+        });
+        return keys;
+    }
+
+    function shardName(key, marker) {
+        const c = key.replace(marker, "")[0];
+        return /[a-z0-9]/.test(c) ? c : "_";
+    }
+
+    async function search(query) {
+        const index = await fetchJSON("index");
+        const keys = queryKeys(query, index.prefix_marker);
+
+        if (keys.length === 0) {
+            return [];
+        }
+
+        // Intersect postings, only loading the shards holding the query keys
+        let ids = null;
+        for (const key of keys) {
+            const shard = shardName(key, index.prefix_marker);
+            const postings = index.grams_shards.includes(shard)
+                ? (await fetchJSON("grams-" + shard))[key] || []
+                : [];
+            ids = ids === null ? new Set(postings) : new Set(postings.filter((x) => ids.has(x)));
+            if (ids.size === 0) {
+                return [];
+            }
+        }
+
+        const results = [];
+        for (const id of Array.from(ids).sort((a, b) => a - b)) {
+            const shard = Math.floor(id / index.documents_shard_size);
+            const row = (await fetchJSON("documents-" + shard))[id % index.documents_shard_size];
+            const document = {};
+            index.fields.forEach((field, i) => (document[field] = row[i]));
+            results.push(document);
+        }
+        return results;
+    }
+
+    function render(container, documents) {
+        container.innerHTML = "";
+        documents.forEach((d) => {
+            const item = document.createElement("li");
+            const link = document.createElement("a");
+            link.href = "/stats/weapons/" + d.type + "/" + d.slug + "-" + d.item_id + ".html";
+            link.textContent = d.name;
+            item.appendChild(link);
+
+            const details = [d.faction, d.category];
+            if (d.damage !== null) details.push(d.damage + " damage");
+            if (d.rpm !== null) details.push(d.rpm + " RPM");
+            if (d.magazine !== null && d.magazine > 0) details.push(d.magazine + " shots");
+            item.appendChild(document.createTextNode(" (" + details.join(", ") + ")"));
+
+            container.appendChild(item);
+        });
+    }
+
+    document.addEventListener("DOMContentLoaded", () => {
+        const input = document.getElementById("weapon-search");
+        const container = document.getElementById("weapon-search-results");
+
+        if (!input || !container) {
+            return;
+        }
+
+        let latest = 0;
+        input.addEventListener("input", async () => {
+            const current = ++latest;
+            const documents = await search(input.value);
+            if (current === latest) {
+                render(container, documents);
+            }
+        });
+    });
+})();
@@ -0,0 +1,153 @@
+import os
+import threading
+import urllib.error
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from generate.artifacts import (
+    HTTPArtifactCache,
+    LayeredArtifactCache,
+    LocalArtifactCache,
+    artifact_cache_server,
+)
+
+KEYS = ["a" * 64, "b" * 64, "c" * 64]
+
+
+@pytest.fixture
+def remote_directory(tmp_path: Path) -> Path:
+
+    return tmp_path.joinpath("remote")
+
+
+@pytest.fixture
+def server_url(remote_directory: Path) -> Iterator[str]:
+
+    # On an ephemeral port, served by a thread of the test
+    server: ThreadingHTTPServer = artifact_cache_server(
+        port=0, directory=str(remote_directory)
+    )
+
+    thread: threading.Thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    try:
+
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+
+    finally:
+
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def test_local_put_get(tmp_path: Path):
+
+    cache: LocalArtifactCache = LocalArtifactCache(directory=str(tmp_path))
+
+    assert cache.get(KEYS[0]) is None
+
+    cache.put(KEYS[0], b"content")
+
+    assert cache.get(KEYS[0]) == b"content"
+    assert not list(tmp_path.glob("*/.*"))
+
+
+def test_local_evict_least_recently_used(tmp_path: Path):
+
+    cache: LocalArtifactCache = LocalArtifactCache(
+        directory=str(tmp_path), max_size=1000
+    )
+
+    key: str
+    for key in KEYS:
+
+        cache.put(key, b"0123456789")
+
+    # Put in order, then the oldest one used again
+    index: int
+    for index, key in enumerate(KEYS):
+
+        os.utime(tmp_path.joinpath(key[:2], key), (index, index))
+
+    assert cache.get(KEYS[0]) is not None
+
+    cache.max_size = 25
+
+    assert cache.evict() == 1
+
+    assert cache.get(KEYS[0]) is not None
+    assert cache.get(KEYS[1]) is None
+    assert cache.get(KEYS[2]) is not None
+
+
+def test_http_get_put(server_url: str):
+
+    cache: HTTPArtifactCache = HTTPArtifactCache(server_url)
+
+    assert cache.get(KEYS[0]) is None
+
+    cache.put(KEYS[0], b"content")
+
+    assert cache.get(KEYS[0]) == b"content"
+
+
+def test_http_bad_key(server_url: str):
+
+    cache: HTTPArtifactCache = HTTPArtifactCache(server_url)
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+
+        cache.get("../artifact")
+
+    assert error.value.code == 400
+
+
+def test_layered_back_fills_local(
+    tmp_path: Path, remote_directory: Path, server_url: str
+):
+
+    LocalArtifactCache(directory=str(remote_directory)).put(KEYS[0], b"content")
+
+    local: LocalArtifactCache = LocalArtifactCache(
+        directory=str(tmp_path.joinpath("local"))
+    )
+    cache: LayeredArtifactCache = LayeredArtifactCache(
+        local=local, remote=HTTPArtifactCache(server_url)
+    )
+
+    assert local.get(KEYS[0]) is None
+    assert cache.get(KEYS[0]) == b"content"
+    assert local.get(KEYS[0]) == b"content"
+
+    cache.put(KEYS[1], b"other")
+
+    assert HTTPArtifactCache(server_url).get(KEYS[1]) == b"other"
+
+
+def test_layered_disables_unreachable_remote(tmp_path: Path):
+
+    # Closed, connections to its port being refused
+    server: ThreadingHTTPServer = artifact_cache_server(
+        port=0, directory=str(tmp_path.joinpath("remote"))
+    )
+    server.server_close()
+
+    local: LocalArtifactCache = LocalArtifactCache(
+        directory=str(tmp_path.joinpath("local"))
+    )
+    cache: LayeredArtifactCache = LayeredArtifactCache(
+        local=local,
+        remote=HTTPArtifactCache(f"http://127.0.0.1:{server.server_address[1]}"),
+    )
+
+    assert cache.get(KEYS[0]) is None
+    assert not cache.remote_enabled
+
+    cache.put(KEYS[0], b"content")
+
+    assert local.get(KEYS[0]) == b"content"
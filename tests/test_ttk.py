@@ -0,0 +1,162 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pytest
+from ps2_analysis.enums import DamageLocation
+from ps2_analysis.fire_groups.ammo import Ammo
+from ps2_analysis.fire_groups.damage_profile import DamageProfile
+from ps2_analysis.fire_groups.fire_mode import FireMode
+from ps2_analysis.fire_groups.fire_timing import FireTiming
+from ps2_analysis.fire_groups.recoil import Recoil
+from ps2_census.enums import FireModeType, ResistType
+
+from generate.ttk import (
+    DAMAGE_TARGET_TYPES,
+    ShotsToKillRanges,
+    compute_shots_to_kill_ranges,
+)
+
+DAMAGE_LOCATIONS: Tuple[DamageLocation, ...] = (
+    DamageLocation.TORSO,
+    DamageLocation.HEAD,
+    DamageLocation.LEGS,
+)
+
+
+def _damage_profile(
+    max_damage: int,
+    min_damage: int,
+    max_damage_range: float = 10.0,
+    min_damage_range: float = 65.0,
+    pellets_count: int = 1,
+    resist_type: ResistType = ResistType.SMALL_ARM,
+    location_multiplier: Optional[Dict[DamageLocation, float]] = None,
+) -> DamageProfile:
+
+    return DamageProfile(
+        max_damage=max_damage,
+        max_damage_range=max_damage_range,
+        min_damage=min_damage,
+        min_damage_range=min_damage_range,
+        pellets_count=pellets_count,
+        resist_type=resist_type,
+        location_multiplier=location_multiplier
+        if location_multiplier is not None
+        else {DamageLocation.HEAD: 2.0, DamageLocation.LEGS: 0.9},
+    )
+
+
+def _fire_mode(fire_mode_id: int, **kwargs) -> FireMode:
+
+    return FireMode(
+        fire_mode_id=fire_mode_id,
+        fire_mode_type=FireModeType.PROJECTILE,
+        description="",
+        is_ads=False,
+        detect_range=50.0,
+        move_multiplier=1.0,
+        turn_multiplier=1.0,
+        zoom=1.0,
+        fire_timing=FireTiming(
+            is_automatic=True,
+            refire_time=100,
+            fire_duration=0,
+            delay=0,
+            charge_up_time=0,
+        ),
+        recoil=Recoil(
+            max_angle=10.0,
+            min_angle=-5.0,
+            max_vertical=0.35,
+            min_vertical=0.3,
+            vertical_increase=0.0,
+            vertical_crouched_increase=0.0,
+            max_horizontal=0.2,
+            min_horizontal=0.15,
+            max_horizontal_increase=0.0,
+            min_horizontal_increase=0.0,
+            recovery_delay=100,
+            recovery_rate=20.0,
+            first_shot_multiplier=2.0,
+        ),
+        ammo=Ammo(
+            clip_size=30,
+            total_capacity=210,
+            ammo_per_shot=1,
+            short_reload_time=2000,
+            reload_chamber_time=500,
+        ),
+        **kwargs,
+    )
+
+
+# Falloff within and beyond the grid, pellets, flat damage, a range off the grid,
+# indirect damage alone and on top of direct damage
+FIRE_MODES: List[FireMode] = [
+    _fire_mode(1, direct_damage_profile=_damage_profile(143, 125)),
+    _fire_mode(2, direct_damage_profile=_damage_profile(90, 40, pellets_count=6)),
+    _fire_mode(3, direct_damage_profile=_damage_profile(200, 200)),
+    _fire_mode(
+        4, direct_damage_profile=_damage_profile(334, 150, min_damage_range=137.3)
+    ),
+    _fire_mode(
+        5,
+        indirect_damage_profile=_damage_profile(
+            500,
+            50,
+            max_damage_range=1.0,
+            min_damage_range=5.0,
+            resist_type=ResistType.EXPLOSIVE,
+            location_multiplier={},
+        ),
+    ),
+    _fire_mode(
+        6,
+        direct_damage_profile=_damage_profile(143, 125),
+        indirect_damage_profile=_damage_profile(
+            50,
+            10,
+            max_damage_range=1.0,
+            min_damage_range=5.0,
+            resist_type=ResistType.EXPLOSIVE,
+            location_multiplier={},
+        ),
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def ranges() -> ShotsToKillRanges:
+
+    # Computed once over all fire modes, as for a fire group
+    return compute_shots_to_kill_ranges(FIRE_MODES, damage_locations=DAMAGE_LOCATIONS)
+
+
+@pytest.mark.parametrize("index", range(len(FIRE_MODES)))
+def test_shots_to_kill_ranges_match_fire_mode(ranges: ShotsToKillRanges, index: int):
+
+    fire_mode: FireMode = FIRE_MODES[index]
+
+    target_index: int
+    location_index: int
+    for target_index, damage_target_type in enumerate(DAMAGE_TARGET_TYPES):
+
+        for location_index, damage_location in enumerate(DAMAGE_LOCATIONS):
+
+            rows: np.ndarray = (
+                (ranges.fire_mode_index == index)
+                & (ranges.damage_target_type_index == target_index)
+                & (ranges.damage_location_index == location_index)
+            )
+
+            assert list(
+                zip(ranges.distance[rows].tolist(), ranges.shots_to_kill[rows].tolist())
+            ) == list(
+                fire_mode.shots_to_kill_ranges(
+                    damage_target_type=damage_target_type,
+                    damage_location=damage_location,
+                )
+            ), (
+                damage_target_type,
+                damage_location,
+            )
@@ -1,16 +1,37 @@
+import atexit
 import os
+import shutil
+from pathlib import Path
 from typing import Optional
 
+# Light imports only, the rendering, analysis and cloud stacks being imported by
+# the commands that use them
 from generate import (
-    clean_bucket,
     clean_site,
     copy_misc,
     copy_statics,
+    create_staging_directory,
+    default_worker_policy,
     generate_css,
     generate_pages,
+    merge_shards,
+    parse_shard,
+    publish_staging_directory,
+    staged_output,
     update_all_data_files,
-    upload_to_bucket,
 )
+from generate.artifacts import ARTIFACT_CACHE_ENVVAR
+from generate.constants import (
+    BUILD_TASK_MEMORY,
+    BUILD_WORKER_MAX_RSS,
+    BUILD_WORKER_MAX_TASKS,
+    SHARD_MANIFEST_FILENAME,
+)
+from generate.import_times import record_import_times, write_import_times_report
+from generate.pipeline import parse_stage_workers
+from generate.progress import ProgressMonitor
+from generate.streaming import StreamingUploader
+from generate.workers import WorkerPolicy
 
 BUCKET_NAME = "ps2.liquidwarp.net"
 
@@ -23,6 +44,8 @@ if not CENSUS_SERVICE_ID:
 if __name__ == "__main__":
     import argparse
 
+    record_import_times()
+
     parser = argparse.ArgumentParser()
 
     # Main
@@ -31,6 +54,9 @@ if __name__ == "__main__":
     action_group.add_argument("--upload", action="store_true")
 
     action_group.add_argument("--generate", action="store_true")
+    action_group.add_argument(
+        "--merge", nargs="+", type=Path, metavar="SHARD_DIRECTORY"
+    )
     action_group.add_argument("--copy-statics", action="store_true")
     action_group.add_argument("--copy-misc", action="store_true")
     action_group.add_argument("--generate-css", action="store_true")
@@ -38,39 +64,244 @@ if __name__ == "__main__":
     action_group.add_argument("--clean-local", action="store_true")
     action_group.add_argument("--clean-remote", action="store_true")
 
+    # Daemon, rebuilding the site in place on changes
+    action_group.add_argument("--daemon", action="store_true")
+    action_group.add_argument("--daemon-command", type=str, metavar="COMMAND")
+
+    # Versioned data files, as snapshot identifiers
+    action_group.add_argument(
+        "--diff-snapshots", nargs=2, type=str, metavar=("OLD", "NEW")
+    )
+    action_group.add_argument("--restore-snapshot", type=str, metavar="SNAPSHOT")
+
+    # Simulation artifacts shared over HTTP, from the local cache directory
+    action_group.add_argument("--serve-artifact-cache", type=int, metavar="PORT")
+
     # Other
     parser.add_argument("--no-simulations", action="store_true")
     parser.add_argument("--upload-prefix", type=str, default="")
+    parser.add_argument("--stream-upload", action="store_true")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--no-data-update", action="store_true")
+
+    # Progress events as JSON lines, by default only when not run on a terminal
+    parser.add_argument("--progress-log", type=str, default=None)
+
+    # Shared simulation artifacts, as a directory, an http(s):// URL or a
+    # gs://bucket/prefix URL, layered over the local cache directory
+    parser.add_argument(
+        "--artifact-cache", type=str, default=os.environ.get(ARTIFACT_CACHE_ENVVAR)
+    )
+
+    # Shards, as INDEX/COUNT with an index from 1 to COUNT
+    parser.add_argument("--shard", type=parse_shard, default=None)
+
+    # Workers
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--task-memory", type=int, default=BUILD_TASK_MEMORY // 2 ** 20)
+    parser.add_argument(
+        "--max-tasks-per-child", type=int, default=BUILD_WORKER_MAX_TASKS
+    )
+    parser.add_argument(
+        "--max-worker-rss", type=int, default=BUILD_WORKER_MAX_RSS // 2 ** 20
+    )
+    parser.add_argument("--trace-memory", action="store_true")
+
+    # Workers of a weapon pages pipeline stage, as STAGE=COUNT, repeated per stage
+    parser.add_argument(
+        "--stage-workers", type=parse_stage_workers, action="append", default=[]
+    )
 
     # Parse
     args = parser.parse_args()
 
+    if args.shard is not None and not args.generate:
+
+        parser.error("--shard requires --generate")
+
+    if args.stream_upload and not args.update:
+
+        parser.error("--stream-upload requires --update")
+
+    # Sizes in megabytes, worker count bounded by available memory
+    worker_policy: WorkerPolicy = default_worker_policy(
+        task_memory=args.task_memory * 2 ** 20,
+        processes=args.processes,
+        max_tasks_per_child=args.max_tasks_per_child or None,
+        max_rss=args.max_worker_rss * 2 ** 20 or None,
+        trace_memory=args.trace_memory,
+        stage_workers=dict(args.stage_workers) or None,
+    )
+
+    # Inherited by workers
+    if args.artifact_cache:
+
+        os.environ[ARTIFACT_CACHE_ENVVAR] = args.artifact_cache
+
+    # Live progress of the build stages, reported by the workers
+    if args.update or args.generate or args.merge or args.upload or args.copy_statics:
+
+        progress_monitor: ProgressMonitor = ProgressMonitor(log_path=args.progress_log)
+        progress_monitor.start()
+
+        atexit.register(progress_monitor.stop)
+
+    # Outputs uploaded as the build completes them, rather than after it
+    uploader: Optional[StreamingUploader] = None
+
+    if args.stream_upload:
+
+        uploader = StreamingUploader(bucket_name=BUCKET_NAME, prefix=args.upload_prefix)
+        uploader.start()
+
+        atexit.register(uploader.stop)
+
+    # Resuming keeps the data files of the interrupted build
+    update_data_files: bool = not (args.resume or args.no_data_update)
+
     # Run
-    if args.update or args.clean_local:
+    if args.clean_local:
 
         clean_site()
 
-    if args.update or args.generate or args.generate_css:
+    if args.daemon_command:
+
+        from generate import send_daemon_command
+
+        print(send_daemon_command(args.daemon_command))
+
+    if args.diff_snapshots:
+
+        from generate import diff_snapshots, write_data_changes
+
+        write_data_changes(diff_snapshots(*args.diff_snapshots))
+
+    if args.restore_snapshot:
+
+        from generate import restore_snapshot
+
+        restore_snapshot(args.restore_snapshot)
+
+    if args.serve_artifact_cache:
+
+        from generate import serve_artifact_cache
+
+        serve_artifact_cache(port=args.serve_artifact_cache)
+
+    if (
+        args.update
+        or args.daemon
+        or args.generate_css
+        or args.merge
+        or (args.generate and not args.shard)
+    ):
 
         generate_css()
 
-    if args.update or args.generate:
+    # Weapon pages of a shard only, to be merged with the other shards afterwards
+    if args.generate and args.shard is not None:
+
+        from generate import generate_dynamic_pages
+
+        shard_dir: Path = args.shard.directory
+
+        if shard_dir.exists() and not args.resume:
+
+            shutil.rmtree(shard_dir)
+
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        shard_dir.joinpath(SHARD_MANIFEST_FILENAME).unlink(missing_ok=True)
+
+        with staged_output(shard_dir):
+
+            if update_data_files:
+
+                update_all_data_files(census_service_id=CENSUS_SERVICE_ID)
+
+            generate_dynamic_pages(
+                update_simulations=not args.no_simulations,
+                rebuild=args.rebuild,
+                worker_policy=worker_policy,
+                shard=args.shard,
+            )
+
+    # Built in a staging directory then swapped into place, so that the site is
+    # never seen partially built
+    elif args.update or args.generate or args.merge:
+
+        staging_dir: Path = create_staging_directory(resume=args.resume)
+
+        with staged_output(staging_dir):
+
+            if args.merge:
+
+                from generate import generate_predefined_pages
 
-        update_all_data_files(census_service_id=CENSUS_SERVICE_ID)
-        generate_pages(update_simulations=not args.no_simulations)
+                # List pages are rendered once, over the merged weapon pages
+                merge_shards(shard_dirs=args.merge)
+                generate_predefined_pages(update_simulations=not args.no_simulations)
 
-    if args.update or args.generate or args.copy_statics:
+            else:
+
+                if update_data_files:
+
+                    update_all_data_files(census_service_id=CENSUS_SERVICE_ID)
+
+                generate_pages(
+                    update_simulations=not args.no_simulations,
+                    rebuild=args.rebuild,
+                    worker_policy=worker_policy,
+                )
+
+            copy_statics()
+            copy_misc()
+
+        # Whatever was not streamed is uploaded before the staging directory moves
+        if uploader is not None:
+
+            uploader.finish(str(staging_dir))
+
+        publish_staging_directory(staging_dir)
+
+    if args.update or args.generate or args.merge:
+
+        write_import_times_report()
+
+    # Until stopped, with the data, templates and modules kept loaded
+    if args.daemon:
+
+        from generate import run_daemon
+
+        run_daemon(
+            bucket_name=BUCKET_NAME,
+            worker_policy=worker_policy,
+            update_simulations=not args.no_simulations,
+            upload_prefix=args.upload_prefix,
+        )
+
+    if args.copy_statics:
 
         copy_statics()
 
-    if args.update or args.generate or args.copy_misc:
+    if args.copy_misc:
 
         copy_misc()
 
     if args.clean_remote:
 
+        from generate import clean_bucket
+
         clean_bucket(bucket_name=BUCKET_NAME)
 
-    if args.update or args.upload:
+    if uploader is not None:
+
+        # Final consistency pass over the published site
+        uploader.finish()
+        uploader.stop()
+
+    elif args.update or args.upload:
+
+        from generate import upload_to_bucket
 
         upload_to_bucket(bucket_name=BUCKET_NAME, prefix=args.upload_prefix)